@@ -0,0 +1,60 @@
+"""
+Recall-vs-flat report for the PDF vector index.
+
+Builds each approximate index type from the stored vectors and prints recall@k and
+per-query latency for a range of nprobe / efSearch values, with and without exact
+re-ranking from the vector side store, so INDEX_TYPE and the search settings can be
+chosen knowing their cost. Bytes per chunk of the index and side store are printed
+against float32 flat storage. The saved index is not modified.
+
+Usage: python ann_recall_report.py [--k 10] [--queries 200] [--types ivf_flat ivf_pq hnsw]
+"""
+import argparse
+import time
+import numpy as np
+from app.config.settings import settings
+from app.storage.vector_store import VectorStore, INDEX_TYPES
+
+def run_report(k: int, num_queries: int, index_types):
+    store = VectorStore(settings.EMBEDDING_DIMENSION, settings.INDEX_DIR)
+    vectors = store.vectors()
+    if len(vectors) == 0:
+        print(f"No vectors stored in {settings.INDEX_DIR}; process some PDFs first.")
+        return []
+
+    # Perturbed copies of stored chunks stand in for real queries
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    queries = np.asarray(vectors[rows]) + rng.normal(0, 0.01, (len(rows), store.dimension)).astype("float32")
+
+    memory = store.memory_report()
+    print(f"Corpus: {len(vectors)} vectors, {len(queries)} queries, k={k}")
+    print(f"Memory: {memory['index_type']} {memory['metric']} index {memory['index_bytes_per_chunk']:.0f} B/chunk, "
+          f"{memory['vector_storage']} vectors {memory['vector_bytes_per_chunk']:.0f} B/chunk; "
+          f"{memory['bytes_per_chunk']:.0f} B/chunk vs {memory['baseline_bytes_per_chunk']} B/chunk as a float32 "
+          f"flat index ({-memory['saved_bytes_per_chunk']:+.0f} B/chunk)")
+    print(f"{'index':<10}{'setting':<24}{'recall@k':>10}{'ms/query':>10}{'build s':>10}")
+    results = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        try:
+            index = store.build_candidate(index_type)
+        except Exception as e:
+            print(f"{index_type:<10}skipped: {e}")
+            continue
+        build_seconds = time.perf_counter() - start
+        for row in store.recall_report(queries, k=k, index=index, rerank_values=(0, settings.RERANK_FACTOR)):
+            setting = ", ".join(f"{key}={row[key]}" for key in ("nprobe", "ef_search", "rerank") if key in row) or "-"
+            row["build_seconds"] = build_seconds
+            results.append(row)
+            print(f"{index_type:<10}{setting:<24}{row['recall_at_k']:>10.3f}"
+                  f"{row['latency_ms']:>10.3f}{build_seconds:>10.2f}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ANN index recall against exact search")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    args = parser.parse_args()
+    run_report(args.k, args.queries, args.types)
@@ -1 +1,7 @@
-from .app import demo
\ No newline at end of file
+def __getattr__(name):
+    # Gradio is only loaded on request, so API processes and the spawned ingestion
+    # workers (which import app.services.pdf_workers) never import it
+    if name == "demo":
+        from .app import demo
+        return demo
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,27 @@
 import arxiv
-from typing import List, Dict
+import asyncio
+from typing import List, Dict, Optional
+from xml.etree import ElementTree
+from app.config.settings import settings
+from app.services.http_client import get_http_client
+from app.storage.arxiv_store import ArxivStore
+
+ATOM = "{http://www.w3.org/2005/Atom}"
 
 class ArxivAgent:
     def __init__(self):
         self.client = arxiv.Client()
+        self.api_url = settings.ARXIV_API_URL
+        # Papers seen before (or bulk-imported) are served locally; only misses hit the API
+        self.store = ArxivStore(settings.ARXIV_STORE_PATH) if settings.ARXIV_STORE_PATH else None
     
     def search(self, query: str, max_results: int = 5) -> dict:
         """Search ArXiv for papers related to the query"""
         try:
+            local = self._local_results(query, max_results)
+            if local is not None:
+                return self._summarize(query, local, source="local")
+            
             # Search for papers
             search = arxiv.Search(
                 query=query,
@@ -16,9 +30,7 @@ class ArxivAgent:
             )
             
             results = []
-            papers = list(self.client.results(search))
-            
-            for paper in papers:
+            for paper in self.client.results(search):
                 results.append({
                     "title": paper.title,
                     "content": paper.summary,
@@ -27,15 +39,97 @@ class ArxivAgent:
                     "published": paper.published.strftime("%Y-%m-%d") if paper.published else ""
                 })
             
-            # Create summary from the most relevant papers
-            summary = " ".join([f"{paper['title']}: {paper['content'][:150]}..." for paper in results[:2]])
+            self._remember(query, results)
+            return self._summarize(query, results)
+        except Exception as e:
+            return self._fallback(query, max_results) or self._error(e)
+    
+    async def asearch(self, query: str, max_results: int = 5) -> dict:
+        """Async search against the ArXiv API through the shared connection pool
+        
+        When neither the API nor the local store can answer, the error is raised rather
+        than returned as a summary, so the fan-out reports the agent as failed.
+        """
+        try:
+            local = await asyncio.to_thread(self._local_results, query, max_results)
+            if local is not None:
+                return self._summarize(query, local, source="local")
             
-            return {
-                "papers": results,
-                "summary": summary if summary else f"No ArXiv papers found for query: {query}"
+            params = {
+                "search_query": query,
+                "start": 0,
+                "max_results": max_results,
+                "sortBy": "relevance",
+                "sortOrder": "descending"
             }
-        except Exception as e:
-            return {
-                "papers": [],
-                "summary": f"Error during ArXiv search: {str(e)}"
-            }
\ No newline at end of file
+            response = await get_http_client().get(self.api_url, params=params)
+            response.raise_for_status()
+            results = self._parse_feed(response.content)
+            await asyncio.to_thread(self._remember, query, results)
+            return self._summarize(query, results)
+        except Exception:
+            fallback = await asyncio.to_thread(self._fallback, query, max_results)
+            if fallback is None:
+                raise
+            return fallback
+    
+    def _local_results(self, query: str, max_results: int) -> Optional[List[Dict]]:
+        """Answer from the local store when possible, else None
+        
+        A query fetched recently returns the same papers as last time; otherwise
+        papers matching every term of the query are used if there are enough of them.
+        """
+        if self.store is None:
+            return None
+        cached = self.store.cached_query(query, settings.ARXIV_QUERY_TTL)
+        if cached is not None:
+            return cached[:max_results]
+        papers = self.store.search(query, limit=max_results, match_all=True)
+        if len(papers) >= min(settings.ARXIV_LOCAL_MIN_RESULTS, max_results):
+            return papers
+        return None
+    
+    def _remember(self, query: str, results: List[Dict]):
+        if self.store is not None:
+            self.store.record_query(query, results)
+    
+    def _fallback(self, query: str, max_results: int) -> Optional[dict]:
+        # When the API is down or rate-limited, loosely matching local papers beat nothing
+        if self.store is not None:
+            try:
+                papers = self.store.search(query, limit=max_results, match_all=False)
+                if papers:
+                    return self._summarize(query, papers, source="local")
+            except Exception as e:
+                print(f"Local ArXiv search failed: {e}")
+        return None
+    
+    def _parse_feed(self, content: bytes) -> List[Dict]:
+        """Turn an ArXiv Atom feed into result dicts shaped like those of search"""
+        results = []
+        for entry in ElementTree.fromstring(content).iter(f"{ATOM}entry"):
+            published = entry.findtext(f"{ATOM}published", "")
+            results.append({
+                "title": " ".join(entry.findtext(f"{ATOM}title", "").split()),
+                "content": entry.findtext(f"{ATOM}summary", "").strip(),
+                "url": entry.findtext(f"{ATOM}id", ""),
+                "authors": [author.findtext(f"{ATOM}name", "") for author in entry.iter(f"{ATOM}author")],
+                "published": published[:10]
+            })
+        return results
+    
+    def _summarize(self, query: str, results: List[Dict], source: str = "api") -> dict:
+        # Create summary from the most relevant papers
+        summary = " ".join([f"{paper['title']}: {paper['content'][:150]}..." for paper in results[:2]])
+        
+        return {
+            "papers": results,
+            "summary": summary if summary else f"No ArXiv papers found for query: {query}",
+            "source": source
+        }
+    
+    def _error(self, e: Exception) -> dict:
+        return {
+            "papers": [],
+            "summary": f"Error during ArXiv search: {str(e)}"
+        }
\ No newline at end of file
@@ -1,14 +1,24 @@
+import json
 import os
-from typing import List, Tuple, Dict, Any, Optional
+import re
+from typing import List, Tuple, Dict, Any, Optional, Iterator, AsyncIterator
 from app.models.query import QueryRequest, QueryResponse, AgentInfo, DocumentInfo
 from app.models.log import LogEntry
+from app.models.job import JobStatus
 from app.agents.pdf_rag import PDFRAGAgent
 from app.agents.web_search import WebSearchAgent
 from app.agents.arxiv import ArxivAgent
+from app.agents.fanout import FanOutExecutor
+from app.agents.router import AGENTS, EmbeddingRouter
+from app.agents.rules import RoutingCache, RuleEngine
+from app.storage.log_store import LogStore
+from app.services.jobs import IngestionJobQueue
+from app.services.batcher import MicroBatcher
+from app.services.answer_cache import AnswerCache
+from app.services.metrics import current_trace, observe_stage, stage, start_trace
 from app.config.settings import settings
 import asyncio
-from datetime import datetime
-import json
+from datetime import datetime, timedelta
 import uuid
 
 # Conditional import for Groq API
@@ -21,47 +31,200 @@ except ImportError:
     print("Groq API not available. Using rule-based routing only.")
 
 class ControllerAgent:
-    def __init__(self):
-        self.pdf_rag_agent = PDFRAGAgent()
-        self.web_search_agent = WebSearchAgent()
-        self.arxiv_agent = ArxivAgent()
-        self.logs: List[LogEntry] = []
-        self.log_file = "logs/system_logs.json"
+    def __init__(self, pdf_rag_agent: Optional[PDFRAGAgent] = None,
+                 web_search_agent: Optional[WebSearchAgent] = None,
+                 arxiv_agent: Optional[ArxivAgent] = None, groq_client: Optional[Any] = None,
+                 use_llm: bool = True):
+        # Agents and the Groq client can be injected, e.g. stand-ins for load tests;
+        # use_llm=False never builds a Groq client, even when GROQ_API_KEY is set
+        self.pdf_rag_agent = pdf_rag_agent or PDFRAGAgent()
+        self.web_search_agent = web_search_agent or WebSearchAgent()
+        self.arxiv_agent = arxiv_agent or ArxivAgent()
+        self.fanout = FanOutExecutor()
+        # Concurrent /ask requests share one embedding + FAISS call
+        self.pdf_search_batcher = MicroBatcher(self.pdf_rag_agent.search_batch)
+        # Repeated questions skip routing, agents and synthesis
+        self.answer_cache = AnswerCache(encode=self.pdf_rag_agent.embeddings.encode)
+        self.ingestion = IngestionJobQueue(self.pdf_rag_agent.process_pdf, db_path=settings.INGEST_JOB_DB or None)
+        self.log_file = "logs/system_logs.json"  # legacy single-file log, still readable
+        index_since = None
+        if settings.LOG_LOAD_MAX_AGE_DAYS:
+            index_since = datetime.now() - timedelta(days=settings.LOG_LOAD_MAX_AGE_DAYS)
+        self.log_store = LogStore(
+            settings.LOG_DIR,
+            max_bytes=settings.LOG_ROTATE_BYTES,
+            max_age=settings.LOG_ROTATE_SECONDS,
+            legacy_path=self.log_file,
+            index_since=index_since
+        )
         
         # Initialize Groq client if API key is available
-        self.groq_client: Optional[Any] = None
-        if GROQ_AVAILABLE and settings.GROQ_API_KEY and Groq is not None:
+        self.groq_client: Optional[Any] = groq_client if use_llm else None
+        if use_llm and self.groq_client is None and GROQ_AVAILABLE and settings.GROQ_API_KEY and Groq is not None:
             try:
                 self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
             except Exception as e:
                 print(f"Failed to initialize Groq client: {e}")
         
-        self._load_logs()
+        # Repeated questions reuse their routing decision; rules are the last resort
+        self.routing_cache = RoutingCache()
+        self.rules = RuleEngine.from_settings()
+        
+        # Local embedding router; the LLM is only asked when it is unsure
+        self.router = EmbeddingRouter(self.pdf_rag_agent.embeddings.encode)
+        if settings.ROUTER_TRAIN_MAX_AGE_DAYS:
+            try:
+                since = datetime.now() - timedelta(days=settings.ROUTER_TRAIN_MAX_AGE_DAYS)
+                self.router.train(self.log_store.iter_entries(since=since))
+            except Exception as e:
+                print(f"Failed to train router from logs: {e}")
+
         
     async def process_query(self, query: QueryRequest) -> QueryResponse:
         """Process a query by deciding which agents to use and synthesizing the response"""
-        # Decision making logic
-        agents_to_use, rationale = self._decide_agents(query.question)
+        start_trace()
+        with stage("answer_cache"):
+            pdf_version, cached = await self.fanout.call(self._cached_answer, query.question)
+        if cached is not None:
+            return cached
+        
+        # Decision making logic (may call the LLM, so keep it off the event loop)
+        with stage("routing"):
+            agents_to_use, rationale = await self.fanout.call(self._decide_agents, query.question)
+        
+        # Call the selected agents concurrently
+        agent_responses, failures = await self.fanout.run(self._agent_calls(agents_to_use, query.question))
+        
+        documents_retrieved = []
+        for agent_name, response in agent_responses:
+            if agent_name == "pdf_rag":
+                documents_retrieved.extend(response.get("documents", []))
+        
+        # Agents that missed their timeout are reported but do not block the answer
+        for agent_name, reason in failures.items():
+            rationale[agent_name] = f"{rationale.get(agent_name, '')} ({reason})".strip()
+                
+        # Synthesize final answer
+        with stage("synthesis"):
+            final_answer = await self.fanout.call(self._synthesize_response, query.question, agent_responses)
+        
+        response = self._finish_query(query.question, agents_to_use, rationale, documents_retrieved, final_answer)
+        # Partial answers (an agent failed or timed out) are not cached
+        if not failures:
+            self.answer_cache.put(query.question, response, agents_to_use, pdf_version)
+        return response
+    
+    async def stream_query(self, query: QueryRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Process a query, yielding events as soon as each stage produces them
+        
+        Events, in order: "routing" (agents and rationale), one "agent_result" or
+        "agent_error" per agent as it finishes, "token" events while the answer is
+        synthesized, and "done" with the full QueryResponse. Cached answers are sent as
+        "routing" (with "cached": true), a single "token" and "done".
+        """
+        start_trace()
+        with stage("answer_cache"):
+            pdf_version, cached = await self.fanout.call(self._cached_answer, query.question)
+        if cached is not None:
+            yield {
+                "event": "routing",
+                "agents": [agent.name for agent in cached.agents_used],
+                "rationale": {agent.name: agent.rationale for agent in cached.agents_used},
+                "cached": True
+            }
+            yield {"event": "token", "text": cached.answer}
+            yield {"event": "done", "response": cached.dict()}
+            return
+        
+        with stage("routing"):
+            agents_to_use, rationale = await self.fanout.call(self._decide_agents, query.question)
+        yield {"event": "routing", "agents": agents_to_use, "rationale": rationale}
         
-        # Call the selected agents
         agent_responses = []
+        failed = False
+        async for agent_name, response, reason in self.fanout.as_completed(self._agent_calls(agents_to_use, query.question)):
+            if reason is not None:
+                failed = True
+                rationale[agent_name] = f"{rationale.get(agent_name, '')} ({reason})".strip()
+                yield {"event": "agent_error", "agent": agent_name, "reason": reason}
+                continue
+            agent_responses.append((agent_name, response))
+            yield {"event": "agent_result", "agent": agent_name, "result": response}
+        
         documents_retrieved = []
+        for agent_name, response in agent_responses:
+            if agent_name == "pdf_rag":
+                documents_retrieved.extend(response.get("documents", []))
+        
+        # Pull synthesis tokens off the blocking Groq stream one at a time
+        tokens = self._stream_synthesis(query.question, agent_responses)
+        answer_parts = []
+        try:
+            while True:
+                # Time spent waiting on the client between tokens is not synthesis
+                with stage("synthesis", observe=False):
+                    token = await self.fanout.call(next, tokens, None)
+                if token is None:
+                    break
+                answer_parts.append(token)
+                yield {"event": "token", "text": token}
+        finally:
+            # One sample per request, like /ask
+            observe_stage("synthesis")
+        
+        response = self._finish_query(query.question, agents_to_use, rationale, documents_retrieved,
+                                      "".join(answer_parts))
+        if not failed:
+            self.answer_cache.put(query.question, response, agents_to_use, pdf_version)
+        yield {"event": "done", "response": response.dict()}
+    
+    def _cached_answer(self, question: str) -> Tuple[Any, Optional[QueryResponse]]:
+        """Look the question up in the answer cache, logging hits like answered queries
+        
+        Also returns the PDF index version, which answers computed now are cached under.
+        """
+        pdf_version = self.pdf_rag_agent.index_version()
+        cached = self.answer_cache.get(question, pdf_version)
+        if cached is None:
+            return pdf_version, None
         
+        log_entry = LogEntry(
+            input=question,
+            decision=f"Answered from cache: {({agent.name: agent.rationale for agent in cached.agents_used})}",
+            agents_called=[agent.name for agent in cached.agents_used],
+            documents_retrieved=[doc.id for doc in cached.documents_retrieved],
+            final_answer=cached.answer,
+            timestamp=datetime.now(),
+            stage_timings=current_trace()
+        )
+        self._save_logs(log_entry)
+        return pdf_version, cached.copy(update={"timestamp": datetime.now()})
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit-rate counters of the answer, embedding, web search and routing caches"""
+        return {
+            "answers": self.answer_cache.stats(),
+            "embeddings": self.pdf_rag_agent.embeddings.stats(),
+            "web_search": self.web_search_agent.cache.stats(),
+            "routing": self.routing_cache.stats()
+        }
+    
+    def _agent_calls(self, agents_to_use: List[str], question: str) -> List[tuple]:
+        # Web search and ArXiv use their async methods, so they run on the event loop
+        # over pooled connections instead of occupying a fan-out thread each
+        agent_calls = []
         for agent_name in agents_to_use:
             if agent_name == "pdf_rag":
-                response = self.pdf_rag_agent.search(query.question)
-                agent_responses.append(("pdf_rag", response))
-                documents_retrieved.extend(response.get("documents", []))
+                agent_calls.append(("pdf_rag", self.pdf_search_batcher.submit, (question,)))
             elif agent_name == "web_search":
-                response = self.web_search_agent.search(query.question)
-                agent_responses.append(("web_search", response))
+                agent_calls.append(("web_search", self.web_search_agent.asearch, (question,)))
             elif agent_name == "arxiv":
-                response = self.arxiv_agent.search(query.question)
-                agent_responses.append(("arxiv", response))
-                
-        # Synthesize final answer
-        final_answer = self._synthesize_response(query.question, agent_responses)
-        
+                agent_calls.append(("arxiv", self.arxiv_agent.asearch, (question,)))
+        return agent_calls
+    
+    def _finish_query(self, question: str, agents_to_use: List[str], rationale: Dict[str, str],
+                      documents_retrieved: List[dict], final_answer: str) -> QueryResponse:
+        """Log the interaction and build the response"""
         # Create agent info for response
         agents_info = [
             AgentInfo(name=name, rationale=rationale.get(name, ""))
@@ -76,15 +239,15 @@ class ControllerAgent:
         
         # Log the interaction
         log_entry = LogEntry(
-            input=query.question,
+            input=question,
             decision=str(rationale),
             agents_called=agents_to_use,
             documents_retrieved=[doc.get("id", "") for doc in documents_retrieved],
             final_answer=final_answer,
-            timestamp=datetime.now()
+            timestamp=datetime.now(),
+            stage_timings=current_trace()
         )
-        self.logs.append(log_entry)
-        self._save_logs()
+        self._save_logs(log_entry)
         
         return QueryResponse(
             answer=final_answer,
@@ -93,17 +256,52 @@ class ControllerAgent:
             timestamp=datetime.now()
         )
     
+    def shutdown(self):
+        """Stop the worker threads and write out queued log entries"""
+        self.fanout.shutdown()
+        self.pdf_search_batcher.shutdown()
+        self.ingestion.shutdown()
+        self.log_store.close()
+    
     async def process_pdf(self, file_path: str) -> dict:
         """Process an uploaded PDF file"""
-        result = self.pdf_rag_agent.process_pdf(file_path)
+        result = await self.fanout.call(self.pdf_rag_agent.process_pdf, file_path)
         return result
     
+    def submit_pdf(self, file_path: str, filename: Optional[str] = None,
+                   file_hash: Optional[str] = None, source: Optional[str] = None) -> JobStatus:
+        """Queue an uploaded PDF for background ingestion (raises QueueFullError when busy)
+        
+        file_path is the upload's private file; source is the path it is indexed under.
+        """
+        return self.ingestion.submit(file_path, filename=filename, file_hash=file_hash, source=source)
+    
+    def get_job(self, job_id: str) -> Optional[JobStatus]:
+        """Return the status of an ingestion job"""
+        return self.ingestion.get(job_id)
+    
     def _decide_agents(self, question: str) -> Tuple[List[str], Dict[str, str]]:
-        """Decide which agents to use based on the question"""
-        # If Groq is available, use it for enhanced decision making
+        """Decide which agents to use based on the question, reusing earlier decisions"""
+        decision = self.routing_cache.get(question)
+        if decision is None:
+            decision = self._route(question)
+            self.routing_cache.put(question, *decision)
+        return decision
+    
+    def _route(self, question: str) -> Tuple[List[str], Dict[str, str]]:
+        try:
+            agents, rationale, confidence = self.router.route(question)
+            if agents and confidence >= settings.ROUTER_CONFIDENCE_THRESHOLD:
+                return agents, rationale
+        except Exception as e:
+            print(f"Embedding routing failed: {e}")
+        
+        # The router is unsure: if Groq is available, let the LLM decide and learn from it
         if self.groq_client is not None:
             try:
-                return self._llm_decide_agents(question)
+                agents, rationale = self._llm_decide_agents(question)
+                self.router.add(question, agents)
+                return agents, rationale
             except Exception as e:
                 print(f"LLM decision making failed, falling back to rule-based: {e}")
         
@@ -111,7 +309,7 @@ class ControllerAgent:
         return self._rule_based_decide_agents(question)
     
     def _llm_decide_agents(self, question: str) -> Tuple[List[str], Dict[str, str]]:
-        """Use LLM to decide which agents to use"""
+        """Use LLM to decide which agents to use; raises ValueError on an unusable reply"""
         if self.groq_client is None:
             return self._rule_based_decide_agents(question)
             
@@ -131,7 +329,7 @@ class ControllerAgent:
         }}
         """
         
-        try:
+        with stage("llm_routing"):
             chat_completion = self.groq_client.chat.completions.create(
                 messages=[
                     {
@@ -143,54 +341,23 @@ class ControllerAgent:
                 temperature=0.1,
                 max_tokens=200,
             )
-            
-            response_text = chat_completion.choices[0].message.content
-            if response_text is None:
-                return self._rule_based_decide_agents(question)
-                
-            # Parse the JSON response (in a real implementation, you'd use proper JSON parsing)
-            # For now, we'll fall back to rule-based if parsing fails
-            response_text_lower = response_text.lower()
-            if "pdf_rag" in response_text_lower or "document" in response_text_lower:
-                agents = ["pdf_rag"]
-                rationale = {"pdf_rag": "LLM determined PDF RAG agent is relevant"}
-            elif "arxiv" in response_text_lower or "paper" in response_text_lower or "research" in response_text_lower:
-                agents = ["arxiv"]
-                rationale = {"arxiv": "LLM determined ArXiv agent is relevant"}
-            else:
-                agents = ["web_search"]
-                rationale = {"web_search": "LLM determined Web Search agent is relevant"}
-                
-            return agents, rationale
-        except Exception as e:
-            print(f"Error in LLM decision making: {e}")
-            # Fallback to rule-based
-            return self._rule_based_decide_agents(question)
+        
+        response_text = chat_completion.choices[0].message.content
+        match = re.search(r"\{.*\}", response_text or "", re.DOTALL)
+        if match is None:
+            raise ValueError(f"no JSON object in LLM reply: {response_text!r}")
+        decision = json.loads(match.group(0))
+        agents = [agent for agent in dict.fromkeys(decision.get("agents", [])) if agent in AGENTS]
+        if not agents:
+            raise ValueError(f"no known agents in LLM reply: {response_text!r}")
+        explanation = str(decision.get("rationale", "")).strip()
+        rationale = {agent: f"LLM: {explanation}" if explanation else "LLM determined this agent is relevant"
+                     for agent in agents}
+        return agents, rationale
     
     def _rule_based_decide_agents(self, question: str) -> Tuple[List[str], Dict[str, str]]:
         """Rule-based agent decision making (fallback)"""
-        agents_to_use = []
-        rationale = {}
-        
-        # Rule-based routing
-        if "pdf" in question.lower() or "document" in question.lower():
-            agents_to_use.append("pdf_rag")
-            rationale["pdf_rag"] = "Question relates to PDF/document content"
-            
-        if "recent papers" in question.lower() or "arxiv" in question.lower() or "paper" in question.lower() or "research" in question.lower():
-            agents_to_use.append("arxiv")
-            rationale["arxiv"] = "Question specifically asks for recent papers or arxiv content"
-            
-        if "latest news" in question.lower() or "recent developments" in question.lower() or "current events" in question.lower() or "today" in question.lower():
-            agents_to_use.append("web_search")
-            rationale["web_search"] = "Question asks for latest news or recent developments"
-            
-        # If no specific agents were selected, use web search as default
-        if not agents_to_use:
-            agents_to_use.append("web_search")
-            rationale["web_search"] = "Default agent for general questions"
-            
-        return agents_to_use, rationale
+        return self.rules.decide(question)
     
     def _synthesize_response(self, question: str, agent_responses: List[tuple]) -> str:
         """Synthesize a final response from agent responses"""
@@ -205,6 +372,46 @@ class ControllerAgent:
                 print(f"LLM response synthesis failed, using simple concatenation: {e}")
         
         # Fallback to simple concatenation
+        return self._concatenate_responses(agent_responses)
+    
+    def _stream_synthesis(self, question: str, agent_responses: List[tuple]) -> Iterator[str]:
+        """Like _synthesize_response, but yields the answer in pieces as the LLM produces them"""
+        if not agent_responses:
+            yield "No relevant information found."
+            return
+        
+        if self.groq_client is not None:
+            produced = False
+            try:
+                # Opening the stream; reading it is timed as "synthesis" by the caller
+                with stage("llm_synthesis"):
+                    stream = self.groq_client.chat.completions.create(
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": self._synthesis_prompt(question, agent_responses),
+                            }
+                        ],
+                        model="llama-3.1-70b-versatile",
+                        temperature=0.3,
+                        max_tokens=500,
+                        stream=True,
+                    )
+                for chunk in stream:
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        produced = True
+                        yield token
+                if produced:
+                    return
+            except Exception as e:
+                print(f"Error in LLM response synthesis: {e}")
+                if produced:
+                    return  # part of the answer was already sent
+        
+        yield self._concatenate_responses(agent_responses)
+    
+    def _concatenate_responses(self, agent_responses: List[tuple]) -> str:
         response_parts = []
         for agent_name, response in agent_responses:
             if agent_name == "pdf_rag":
@@ -216,21 +423,7 @@ class ControllerAgent:
                 
         return ". ".join(response_parts) if response_parts else "No relevant information found."
     
-    def _llm_synthesize_response(self, question: str, agent_responses: List[tuple]) -> str:
-        """Use LLM to synthesize a coherent response"""
-        if self.groq_client is None:
-            # Fallback to simple concatenation
-            response_parts = []
-            for agent_name, response in agent_responses:
-                if agent_name == "pdf_rag":
-                    response_parts.append(f"From PDF documents: {response.get('summary', '')}")
-                elif agent_name == "web_search":
-                    response_parts.append(f"From web search: {response.get('summary', '')}")
-                elif agent_name == "arxiv":
-                    response_parts.append(f"From ArXiv papers: {response.get('summary', '')}")
-                    
-            return ". ".join(response_parts) if response_parts else "No relevant information found."
-        
+    def _synthesis_prompt(self, question: str, agent_responses: List[tuple]) -> str:
         # Prepare the context for the LLM
         context_parts = []
         for agent_name, response in agent_responses:
@@ -243,7 +436,7 @@ class ControllerAgent:
         
         context = "\n\n".join(context_parts)
         
-        prompt = f"""
+        return f"""
         Based on the following information, provide a comprehensive answer to the question.
         
         Question: {question}
@@ -253,68 +446,61 @@ class ControllerAgent:
         
         Please synthesize a clear, concise, and helpful response based on the provided information.
         """
+    
+    def _llm_synthesize_response(self, question: str, agent_responses: List[tuple]) -> str:
+        """Use LLM to synthesize a coherent response"""
+        if self.groq_client is None:
+            # Fallback to simple concatenation
+            return self._concatenate_responses(agent_responses)
+        
+        prompt = self._synthesis_prompt(question, agent_responses)
         
         try:
-            chat_completion = self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                model="llama-3.1-70b-versatile",  # Updated model
-                temperature=0.3,
-                max_tokens=500,
-            )
+            with stage("llm_synthesis"):
+                chat_completion = self.groq_client.chat.completions.create(
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt,
+                        }
+                    ],
+                    model="llama-3.1-70b-versatile",  # Updated model
+                    temperature=0.3,
+                    max_tokens=500,
+                )
             
             response_content = chat_completion.choices[0].message.content
             return response_content if response_content is not None else "No relevant information found."
         except Exception as e:
             print(f"Error in LLM response synthesis: {e}")
             # Fallback to simple concatenation
-            response_parts = []
-            for agent_name, response in agent_responses:
-                if agent_name == "pdf_rag":
-                    response_parts.append(f"From PDF documents: {response.get('summary', '')}")
-                elif agent_name == "web_search":
-                    response_parts.append(f"From web search: {response.get('summary', '')}")
-                elif agent_name == "arxiv":
-                    response_parts.append(f"From ArXiv papers: {response.get('summary', '')}")
-                    
-            return ". ".join(response_parts) if response_parts else "No relevant information found."
+            return self._concatenate_responses(agent_responses)
     
-    def get_logs(self) -> List[LogEntry]:
-        """Return all logs"""
-        return self.logs
+    def get_logs(self, limit: Optional[int] = None, cursor: Optional[int] = None, order: str = "asc",
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 agent: Optional[str] = None, text: Optional[str] = None) -> List[LogEntry]:
+        """Return logs matching the filters (all logs, oldest first, by default)"""
+        return self.query_logs(limit, cursor, order, since, until, agent, text)[0]
     
-    def _load_logs(self):
-        """Load logs from file"""
-        try:
-            if os.path.exists(self.log_file):
-                with open(self.log_file, "r") as f:
-                    logs_data = json.load(f)
-                    for log_data in logs_data:
-                        # Convert timestamp string to datetime object
-                        log_data["timestamp"] = datetime.fromisoformat(log_data["timestamp"])
-                        self.logs.append(LogEntry(**log_data))
-        except Exception as e:
-            print(f"Error loading logs: {e}")
+    def query_logs(self, limit: Optional[int] = None, cursor: Optional[int] = None, order: str = "desc",
+                   since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   agent: Optional[str] = None, text: Optional[str] = None) -> Tuple[List[LogEntry], Optional[int]]:
+        """Return one page of logs and the cursor for the next page"""
+        # Include entries still queued for the background writer
+        self.log_store.flush()
+        return self.log_store.query(limit, cursor, order, since, until, agent, text)
     
-    def _save_logs(self):
-        """Save logs to file"""
-        try:
-            # Create logs directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
-            
-            # Convert logs to JSON-serializable format
-            logs_data = []
-            for log in self.logs:
-                log_dict = log.dict()
-                # Convert datetime to string for JSON serialization
-                log_dict["timestamp"] = log_dict["timestamp"].isoformat()
-                logs_data.append(log_dict)
-            
-            with open(self.log_file, "w") as f:
-                json.dump(logs_data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving logs: {e}")
\ No newline at end of file
+    def stream_logs(self, limit: Optional[int] = None, cursor: Optional[int] = None, order: str = "desc",
+                    since: Optional[datetime] = None, until: Optional[datetime] = None,
+                    agent: Optional[str] = None, text: Optional[str] = None) -> Iterator[LogEntry]:
+        """Yield matching logs one at a time without building the full result"""
+        self.log_store.flush()
+        for count, (_, entry) in enumerate(self.log_store.iter_query(cursor, order, since, until, agent, text)):
+            if limit is not None and count >= limit:
+                break
+            yield entry
+    
+    def _save_logs(self, log_entry: LogEntry):
+        """Queue a log entry for the background writer; never waits on disk"""
+        with stage("save_logs"):
+            self.log_store.append(log_entry)
\ No newline at end of file
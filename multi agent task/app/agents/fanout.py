@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.services.metrics import stage
+
+AgentCall = Tuple[str, Callable[..., Any], tuple]
+
+
+class FanOutExecutor:
+    """Runs the selected agents concurrently with a per-agent timeout and a global deadline.
+
+    Coroutine functions are awaited directly; blocking functions are moved off the
+    event loop onto a shared thread pool so one slow agent never stalls other requests.
+    """
+
+    def __init__(self, agent_timeout: Optional[float] = None, deadline: Optional[float] = None,
+                 max_workers: Optional[int] = None):
+        self.agent_timeout = agent_timeout if agent_timeout is not None else settings.AGENT_TIMEOUT
+        self.deadline = deadline if deadline is not None else settings.QUERY_DEADLINE
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.AGENT_MAX_WORKERS,
+            thread_name_prefix="agent",
+        )
+
+    async def call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Call func, awaiting it if it is a coroutine function or running it in the pool otherwise"""
+        if inspect.iscoroutinefunction(func):
+            return await func(*args)
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (e.g. its stage timings) into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, func, *args))
+
+    async def _call_with_timeout(self, name: str, func: Callable[..., Any], args: tuple) -> Any:
+        with stage(f"agent_{name}"):
+            return await asyncio.wait_for(self.call(func, *args), timeout=self.agent_timeout)
+
+    async def run(self, calls: List[AgentCall]) -> Tuple[List[Tuple[str, dict]], Dict[str, str]]:
+        """Run all agent calls concurrently.
+
+        Returns the responses of the agents that finished in time, in call order, and a
+        mapping of agent name to failure reason for the ones that timed out or raised.
+        """
+        results: Dict[str, dict] = {}
+        failures: Dict[str, str] = {}
+        async for name, response, reason in self.as_completed(calls):
+            if reason is None:
+                results[name] = response
+            else:
+                failures[name] = reason
+        responses = [(name, results[name]) for name, _, _ in calls if name in results]
+        return responses, failures
+
+    async def as_completed(self, calls: List[AgentCall]) -> AsyncIterator[Tuple[str, Optional[dict], Optional[str]]]:
+        """Run all agent calls concurrently, yielding (name, response, failure reason) as each finishes.
+
+        Exactly one of response and reason is set. Agents still running at the deadline
+        are cancelled and yielded last with reason "missed query deadline".
+        """
+        if not calls:
+            return
+
+        tasks = {
+            asyncio.ensure_future(self._call_with_timeout(name, func, args)): name
+            for name, func, args in calls
+        }
+        pending = set(tasks)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                # Report in call order when several finish together
+                for task in [task for task in tasks if task in done]:
+                    error = task.exception()
+                    if error is None:
+                        yield tasks[task], task.result(), None
+                    elif isinstance(error, asyncio.TimeoutError):
+                        yield tasks[task], None, "timed out"
+                    else:
+                        yield tasks[task], None, f"failed: {error}"
+        finally:
+            for task in pending:
+                task.cancel()
+        for task in [task for task in tasks if task in pending]:
+            yield tasks[task], None, "missed query deadline"
+
+    def shutdown(self):
+        """Release the worker threads"""
+        self._executor.shutdown(wait=False)
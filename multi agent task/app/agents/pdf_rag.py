@@ -1,123 +1,439 @@
 import fitz  # PyMuPDF
-import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import os
-import uuid
-from typing import List, Dict
+import hashlib
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, Sequence
+from app.config.settings import settings
+from app.storage.chunk_store import ChunkStore
+from app.storage.lexical_index import LexicalIndex
+from app.storage.embedding_cache import EmbeddingCache
+from app.storage.vector_store import VectorStore
+from app.services.metrics import stage
+from app.services.pdf_workers import encode_in_worker, extract_page_range
+
+def iter_pages(file_path: str, executor: Optional[Executor] = None,
+               pages_per_shard: Optional[int] = None, max_in_flight: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) in page order.
+    
+    With an executor, page ranges are extracted in parallel, keeping at most
+    max_in_flight shards pending so memory stays bounded for very long documents. It
+    defaults to EXTRACT_MAX_IN_FLIGHT, or twice the executor's workers so every worker
+    has a shard queued behind the one it is extracting.
+    """
+    pages_per_shard = pages_per_shard or settings.EXTRACT_PAGES_PER_SHARD
+    doc = fitz.open(file_path)
+    page_count = doc.page_count
+    if executor is None or page_count <= pages_per_shard:
+        try:
+            for number, page in enumerate(doc):
+                yield number + 1, page.get_text()
+        finally:
+            doc.close()
+        return
+    doc.close()
+    max_in_flight = max_in_flight or settings.EXTRACT_MAX_IN_FLIGHT or 2 * _worker_count(executor)
+    
+    starts = iter(range(0, page_count, pages_per_shard))
+    pending = deque()
+    for start in starts:
+        pending.append(executor.submit(extract_page_range, file_path, start, start + pages_per_shard))
+        if len(pending) >= max_in_flight:
+            break
+    while pending:
+        shard = pending.popleft().result()
+        start = next(starts, None)
+        if start is not None:
+            pending.append(executor.submit(extract_page_range, file_path, start, start + pages_per_shard))
+        yield from shard
+
+def extract_pages(file_path: str, executor: Optional[Executor] = None,
+                  pages_per_shard: Optional[int] = None, max_in_flight: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Extract (page number, text) for every page, sharding page ranges over the executor"""
+    return list(iter_pages(file_path, executor, pages_per_shard, max_in_flight))
+
+def _worker_count(executor: Executor) -> int:
+    # Process and thread pools keep their size in _max_workers
+    return getattr(executor, "_max_workers", None) or settings.INGEST_PROCESSES or 1
+
+class PoolEncoder:
+    """Stand-in for the SentenceTransformer that spreads encode calls over a process pool"""
+    
+    def __init__(self, executor: Executor, batch_size: int = 64):
+        self.executor = executor
+        self.batch_size = batch_size
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        return np.vstack(list(self.executor.map(encode_in_worker, batches)))
 
 class PDFRAGAgent:
     def __init__(self):
         # Initialize sentence transformer model for embeddings
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        # Initialize FAISS index
-        self.dimension = 384  # Dimension of the embeddings
-        self.index = faiss.IndexFlatL2(self.dimension)
+        self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        # Cache shared by ingestion and queries so repeated texts skip the transformer
+        self.embeddings = EmbeddingCache(
+            self.model, settings.EMBEDDING_MODEL,
+            max_entries=settings.EMBEDDING_CACHE_SIZE,
+            db_path=settings.EMBEDDING_CACHE_DB or None
+        )
         
-        # Store document chunks and metadata
-        self.documents = []
-        self.doc_metadata = []
+        # Open the persisted FAISS index (memory-mapped) and chunk store
+        self.dimension = settings.EMBEDDING_DIMENSION  # Dimension of the embeddings
+        self.vector_store = VectorStore(self.dimension, settings.INDEX_DIR)
+        self.chunk_store = ChunkStore(os.path.join(settings.INDEX_DIR, "chunks.jsonl"))
+        # BM25 over the same rows, fused with the dense ranking in search
+        self.lexical_index = LexicalIndex(settings.BM25_K1, settings.BM25_B)
+        # Start from the saved postings so only chunks added since are tokenized
+        self.lexical_path = os.path.join(settings.INDEX_DIR, "lexical.npz")
+        self.lexical_index.load(self.lexical_path, self.chunk_store.fingerprint, self.chunk_store.generation)
+        loaded_rows = len(self.lexical_index)
+        self.lexical_index.sync(self.chunk_store.documents, self.chunk_store.generation)
+        if len(self.lexical_index) > loaded_rows:
+            self._save_lexical_index()
         
-        # Process sample PDFs if they exist
+        # Process sample PDFs; unchanged files are skipped by content hash
         self._process_sample_pdfs()
     
+    @property
+    def index(self):
+        return self.vector_store.index
+    
+    @property
+    def documents(self) -> Sequence[Dict]:
+        return self.chunk_store.documents
+    
+    @property
+    def doc_metadata(self) -> Sequence[Dict]:
+        return self.chunk_store.doc_metadata
+    
+    def refresh(self):
+        """Pick up chunks and index updates saved by other workers"""
+        # Chunks are appended before the index is replaced, so load them second to
+        # guarantee every index row has a chunk record
+        self.vector_store.refresh()
+        self.chunk_store.refresh()
+        self.lexical_index.sync(self.chunk_store.documents, self.chunk_store.generation)
+    
+    def index_version(self) -> tuple:
+        """Changes whenever any worker saves the index or records a new document version"""
+        self.refresh()
+        return self.vector_store.version, self.chunk_store.version
+    
     def _process_sample_pdfs(self):
         """Process sample PDFs in the sample_pdfs directory"""
-        sample_pdfs_dir = "sample_pdfs"
+        sample_pdfs_dir = settings.SAMPLE_PDF_DIR
         if os.path.exists(sample_pdfs_dir):
             for filename in os.listdir(sample_pdfs_dir):
                 if filename.endswith(".pdf"):
                     file_path = os.path.join(sample_pdfs_dir, filename)
                     self.process_pdf(file_path)
     
-    def process_pdf(self, file_path: str) -> dict:
-        """Process a PDF file, extract text, chunk it, and add to the vector store"""
+    def process_pdf(self, file_path: str, executor: Optional[Executor] = None,
+                    file_hash: Optional[str] = None, source: Optional[str] = None) -> dict:
+        """Process a PDF file, extract text, chunk it, and add to the vector store
+        
+        Ingestion is a streaming pipeline: pages are extracted lazily, chunked as they
+        arrive, embedded INGEST_EMBED_BATCH chunks at a time and committed to the index
+        in batches, so memory does not grow with the document and the first chunks are
+        searchable before the rest of the file has been read. Commit batches start
+        small and double up to INGEST_COMMIT_BATCH. Writing the index costs O(index
+        size), so it is saved once per document, and mid-document only every
+        INGEST_SAVE_ROWS rows or INGEST_SAVE_SECONDS; rows committed in between are in
+        the chunk and vector side stores, where the next writer picks them up.
+        
+        Files whose content hash is already indexed are skipped, and for a changed file
+        only chunks that are not in the store yet are embedded. When an executor (a
+        process pool) is given, text extraction and embedding run in it. file_hash can be
+        passed when the caller already hashed the file (e.g. while receiving the upload).
+        
+        source is the path the document is indexed under, when file_path is a private copy
+        of it (an upload): the copy is moved to source as the document is committed, and
+        removed if ingestion is skipped or fails.
+        """
+        source = source or file_path
         try:
-            # Extract text from PDF
-            doc = fitz.open(file_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
-            
-            # Chunk the text
-            chunks = self._chunk_text(text)
+            title = os.path.basename(source)
+            file_hash = file_hash or self._file_hash(file_path)
+            self.chunk_store.refresh()
+            indexed_as = self.chunk_store.find_file_hash(file_hash)
+            if indexed_as is not None:
+                return {
+                    "status": "skipped",
+                    "message": f"{source} is unchanged (already indexed as {indexed_as})",
+                    "chunks_processed": 0
+                }
             
-            # Create embeddings for chunks
-            embeddings = self.model.encode(chunks)
+            encoder = PoolEncoder(executor) if executor is not None else None
+            chunk_ids = []  # every chunk of the current version, in order
+            seen = set()
+            pending = []  # new chunks embedded but not yet committed
+            pending_vectors = []
+            commit_size = settings.INGEST_EMBED_BATCH
+            embedded = 0
+            last_save = time.monotonic()
             
-            # Add to FAISS index
-            start_id = len(self.documents)
-            self.index.add(np.array(embeddings).astype('float32'))
+            # Extract -> chunk -> embed, one batch of chunks at a time
+            pages = iter_pages(file_path, executor)
+            for batch in self._batched(self._iter_chunks(pages), settings.INGEST_EMBED_BATCH):
+                new_chunks = []
+                for chunk, page_start, page_end in batch:
+                    # Ids are content hashes so they are stable across runs
+                    chunk_id = self._chunk_id(chunk)
+                    if chunk_id not in seen and chunk_id not in self.chunk_store:
+                        new_chunks.append({
+                            "id": chunk_id,
+                            "content": chunk,
+                            "source": source,
+                            "title": title,
+                            "chunk_index": len(chunk_ids),
+                            "page_start": page_start,
+                            "page_end": page_end
+                        })
+                    seen.add(chunk_id)
+                    chunk_ids.append(chunk_id)
+                
+                if new_chunks:
+                    # Embed only chunks that are not stored yet, outside the write lock
+                    vectors = self.embeddings.encode([record["content"] for record in new_chunks], model=encoder)
+                    pending.extend(new_chunks)
+                    pending_vectors.extend(vectors)
+                if len(pending) >= commit_size:
+                    with self.vector_store.write_lock():
+                        embedded += self._commit_chunks(pending, pending_vectors)
+                        if (self.vector_store.unsaved_rows >= settings.INGEST_SAVE_ROWS
+                                or time.monotonic() - last_save >= settings.INGEST_SAVE_SECONDS):
+                            self.vector_store.save()
+                            last_save = time.monotonic()
+                    pending, pending_vectors = [], []
+                    commit_size = min(commit_size * 2, settings.INGEST_COMMIT_BATCH)
             
-            # Store document chunks and metadata
-            for i, chunk in enumerate(chunks):
-                doc_id = str(uuid.uuid4())
-                self.documents.append({
-                    "id": doc_id,
-                    "content": chunk,
-                    "source": file_path
-                })
-                self.doc_metadata.append({
-                    "id": doc_id,
-                    "title": os.path.basename(file_path),
-                    "chunk_index": i
-                })
+            with self.vector_store.write_lock():
+                embedded += self._commit_chunks(pending, pending_vectors)
+                if self.vector_store.unsaved_rows:
+                    self.vector_store.save()
+                    self._save_lexical_index()
+                # Point the document at its current chunks; chunks it dropped become dead
+                self.chunk_store.set_file(source, file_hash, chunk_ids, title=title)
+                if source != file_path:
+                    # Under the write lock, so the file at source is the last committed version
+                    os.replace(file_path, source)
             
             return {
                 "status": "success",
-                "message": f"Processed {len(chunks)} chunks from {file_path}",
-                "chunks_processed": len(chunks)
+                "message": f"Processed {len(chunk_ids)} chunks from {source} ({embedded} new)",
+                "chunks_processed": len(chunk_ids),
+                "chunks_embedded": embedded
             }
         except Exception as e:
             return {
                 "status": "error",
                 "message": f"Error processing PDF: {str(e)}"
             }
+        finally:
+            if source != file_path and os.path.exists(file_path):
+                os.remove(file_path)
+    
+    def _commit_chunks(self, records: List[Dict], vectors: List[np.ndarray]) -> int:
+        """Append chunks and their vectors to the stores and the in-memory index; call within
+        write_lock and save the index afterwards. Returns the number of rows added"""
+        self.chunk_store.refresh()
+        # Index rows another writer committed without saving the index (or before dying),
+        # then discard chunk rows whose vectors were never written
+        self.vector_store.catch_up(len(self.chunk_store))
+        self.chunk_store.truncate(self.vector_store.ntotal)
+        
+        # Another worker may have stored some of the same chunks meanwhile
+        keep = [i for i, record in enumerate(records) if record["id"] not in self.chunk_store]
+        if not keep:
+            return 0
+        
+        # Persist chunks first, then the index, so readers never see index rows
+        # without a matching chunk
+        self.chunk_store.append([records[i] for i in keep])
+        self.vector_store.add(np.array([vectors[i] for i in keep]).astype('float32'))
+        self.lexical_index.sync(self.chunk_store.documents, self.chunk_store.generation)
+        return len(keep)
+    
+    def _save_lexical_index(self):
+        fingerprint = self.chunk_store.fingerprint(len(self.lexical_index))
+        if fingerprint is None:
+            return
+        try:
+            self.lexical_index.save(self.lexical_path, fingerprint)
+        except OSError as e:
+            print(f"Failed to save lexical index: {e}")
+    
+    @staticmethod
+    def _batched(items: Iterable, size: int) -> Iterator[List]:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def _file_hash(file_path: str) -> str:
+        """SHA-256 of the file contents"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _chunk_id(chunk: str) -> str:
+        """Stable chunk id derived from the chunk text"""
+        return hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:32]
     
     def _chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
         """Chunk text into smaller pieces"""
-        words = text.split()
-        chunks = []
+        return [chunk for chunk, _, _ in self._chunk_pages([(1, text)], chunk_size, overlap)]
+    
+    def _chunk_pages(self, pages: List[Tuple[int, str]], chunk_size: int = 500,
+                     overlap: int = 50) -> List[Tuple[str, int, int]]:
+        """Chunk page texts into (chunk, first page, last page) word windows spanning page breaks"""
+        return list(self._iter_chunks(pages, chunk_size, overlap))
+    
+    def _iter_chunks(self, pages: Iterable[Tuple[int, str]], chunk_size: int = 500,
+                     overlap: int = 50) -> Iterator[Tuple[str, int, int]]:
+        """Yield (chunk, first page, last page) as soon as each word window is complete
         
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i:i + chunk_size])
-            if chunk.strip():  # Only add non-empty chunks
-                chunks.append(chunk)
-                
-        return chunks
+        Only the current window is buffered. Windows start every chunk_size - overlap
+        words, including the trailing partial windows.
+        """
+        step = chunk_size - overlap
+        window = []  # (word, page number) from the start of the current window
+        for page_number, text in pages:
+            for word in text.split():
+                window.append((word, page_number))
+                if len(window) == chunk_size:
+                    yield " ".join(w for w, _ in window), window[0][1], window[-1][1]
+                    del window[:step]
+        while window:
+            tail = window[:chunk_size]
+            yield " ".join(w for w, _ in tail), tail[0][1], tail[-1][1]
+            del window[:step]
     
-    def search(self, query: str, k: int = 3) -> dict:
-        """Search for relevant documents based on the query"""
+    def search(self, query: str, k: int = 3, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None) -> dict:
+        """Search for relevant documents based on the query
+        
+        nprobe (IVF indexes) and ef_search (HNSW) trade recall for speed per query.
+        """
         try:
-            # Create embedding for the query
-            query_embedding = self.model.encode([query])
-            
-            # Search in FAISS index
-            distances, indices = self.index.search(np.array(query_embedding).astype('float32'), k)
+            return self.search_batch([query], k, nprobe=nprobe, ef_search=ef_search)[0]
+        except Exception as e:
+            return {
+                "documents": [],
+                "summary": f"Error during search: {str(e)}"
+            }
+    
+    def search_batch(self, queries: List[str], k: int = 3, nprobe: Optional[int] = None,
+                     ef_search: Optional[int] = None, mode: Optional[str] = None) -> List[dict]:
+        """Search for several queries with one encode call and one FAISS search
+        
+        In "hybrid" mode (SEARCH_MODE) the dense and BM25 rankings are merged with
+        reciprocal rank fusion, so exact identifiers and names are found even when the
+        embedding misses them; "dense" uses the vector ranking alone. Returns one result
+        per query, in the same shape as search; a failed search raises, so batched /ask
+        searches are reported as failed agents.
+        """
+        if not queries:
+            return []
+        mode = mode or settings.SEARCH_MODE
+        self.refresh()
+        
+        # Each ranking contributes a few times k candidates to the fusion
+        candidates = k if mode == "dense" else max(k * settings.HYBRID_CANDIDATE_FACTOR, 10)
+        
+        # Create embeddings for all queries at once
+        with stage("query_embedding"):
+            query_embeddings = np.asarray(self.embeddings.encode(queries), dtype='float32')
+        dense = self._dense_candidates(query_embeddings, candidates, nprobe, ef_search)
+        
+        results = []
+        for query, dense_rows in zip(queries, dense):
+            distances = dict(dense_rows)
+            if mode == "dense":
+                ranked = [(row, None) for row, _ in dense_rows[:k]]
+            else:
+                lexical_rows = self._lexical_candidates(query, candidates)
+                ranked = self._fuse([[row for row, _ in dense_rows], [row for row, _ in lexical_rows]])[:k]
             
             # Retrieve relevant documents
             retrieved_docs = []
-            for i, idx in enumerate(indices[0]):
-                if idx < len(self.documents):
-                    doc = self.documents[idx]
-                    retrieved_docs.append({
-                        "id": doc["id"],
-                        "title": self.doc_metadata[idx]["title"],
-                        "content": doc["content"],
-                        "distance": float(distances[0][i])
-                    })
+            for row, score in ranked:
+                record = self.chunk_store.get(row)
+                document = {
+                    "id": record["id"],
+                    "title": record["title"],
+                    "content": record["content"],
+                    "page_start": record.get("page_start"),
+                    "page_end": record.get("page_end"),
+                    "distance": distances.get(row)
+                }
+                if score is not None:
+                    document["score"] = score
+                retrieved_docs.append(document)
             
             # Create a simple summary (would be replaced with LLM summarization)
             summary = " ".join([doc["content"][:200] + "..." for doc in retrieved_docs[:2]])
-            
-            return {
+            results.append({
                 "documents": retrieved_docs,
                 "summary": summary if summary else "No relevant documents found."
-            }
-        except Exception as e:
-            return {
-                "documents": [],
-                "summary": f"Error during search: {str(e)}"
-            }
\ No newline at end of file
+            })
+        return results
+    
+    def _dense_candidates(self, query_embeddings: np.ndarray, n: int, nprobe: Optional[int],
+                          ef_search: Optional[int]) -> List[List[Tuple[int, float]]]:
+        """Up to n live (row, distance) pairs per query, nearest first"""
+        # Search in FAISS index, widening the search until n live chunks are found
+        # since rows replaced by newer versions of a document are skipped
+        retrieved: List[List[Tuple[int, float]]] = [[] for _ in range(len(query_embeddings))]
+        remaining = list(range(len(query_embeddings)))
+        fetch = n
+        while remaining:
+            with stage("faiss_search"):
+                distances, indices = self.vector_store.search(
+                    query_embeddings[remaining], fetch, nprobe=nprobe, ef_search=ef_search
+                )
+            short = []
+            for row, query_index in enumerate(remaining):
+                live = [(int(idx), float(distance)) for idx, distance in zip(indices[row], distances[row])
+                        if 0 <= idx < len(self.chunk_store) and self.chunk_store.is_live(idx)]
+                retrieved[query_index] = live[:n]
+                if len(live) < n:
+                    short.append(query_index)
+            if fetch >= self.vector_store.ntotal:
+                break
+            remaining = short
+            fetch *= 4
+        return retrieved
+    
+    def _lexical_candidates(self, query: str, n: int) -> List[Tuple[int, float]]:
+        """Up to n live (row, BM25 score) pairs, best first"""
+        fetch = n
+        while True:
+            with stage("bm25_search"):
+                hits = self.lexical_index.search(query, fetch)
+            live = [(row, score) for row, score in hits
+                    if row < len(self.chunk_store) and self.chunk_store.is_live(row)]
+            if len(live) >= n or len(hits) < fetch:
+                return live[:n]
+            fetch *= 4
+    
+    @staticmethod
+    def _fuse(rankings: List[List[int]]) -> List[Tuple[int, float]]:
+        """Reciprocal rank fusion: each ranking adds 1 / (RRF_K + rank) to a row's score"""
+        scores: Dict[int, float] = {}
+        for ranking in rankings:
+            for rank, row in enumerate(ranking, start=1):
+                scores[row] = scores.get(row, 0.0) + 1.0 / (settings.RRF_K + rank)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
\ No newline at end of file
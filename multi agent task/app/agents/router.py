@@ -0,0 +1,148 @@
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.config.settings import settings
+from app.models.log import LogEntry
+from app.services.answer_cache import normalize_question
+
+AGENTS = ("pdf_rag", "web_search", "arxiv")
+
+# Seed examples so the router works before any questions have been logged
+DEFAULT_EXEMPLARS: Dict[str, List[str]] = {
+    "pdf_rag": [
+        "What does the uploaded PDF say about the pricing?",
+        "Summarize the document I uploaded",
+        "According to the report, what were the main findings?",
+        "What did NebulaByte agree to in the dialog transcript?",
+        "Find the section of the contract about termination",
+        "What is mentioned on page 3 of the file?",
+        "Which clients are listed in the documents?",
+        "What does the manual say about installation?",
+    ],
+    "web_search": [
+        "What are the latest news about AI regulation?",
+        "What is the weather in London today?",
+        "Who won the football match yesterday?",
+        "What is the current price of Bitcoin?",
+        "Recent developments in the electric car market",
+        "What happened in the stock market this week?",
+        "Who is the CEO of OpenAI?",
+        "How do I reset my iPhone?",
+    ],
+    "arxiv": [
+        "Find recent papers on retrieval-augmented generation",
+        "What research exists on graph neural networks?",
+        "Show me arXiv papers about diffusion models",
+        "Latest academic work on reinforcement learning from human feedback",
+        "Which studies compare transformers and recurrent networks?",
+        "Papers proposing new optimizers for deep learning",
+        "Survey of research on quantum error correction",
+        "What is the state of the art in protein structure prediction research?",
+    ],
+}
+
+
+class EmbeddingRouter:
+    """Routes questions to agents by embedding similarity to labelled example questions.
+
+    Each agent scores the mean cosine similarity of its ``top_k`` closest examples. The
+    best agent is chosen, plus any agent scoring within ``margin`` of it, so a question
+    can go to several agents. Confidence is the softmax share of the chosen agents (0
+    when even the best score is below ``min_similarity``); callers escalate to the LLM
+    when it falls below ROUTER_CONFIDENCE_THRESHOLD.
+
+    Examples start from DEFAULT_EXEMPLARS and grow from logged interactions (``train``)
+    and from LLM decisions (``add``); each agent keeps its ``max_exemplars`` most recent.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray],
+                 exemplars: Optional[Dict[str, List[str]]] = None, top_k: Optional[int] = None,
+                 margin: Optional[float] = None, temperature: Optional[float] = None,
+                 max_exemplars: Optional[int] = None, min_similarity: Optional[float] = None):
+        self.encode = encode
+        self.top_k = top_k or settings.ROUTER_TOP_K
+        self.margin = margin if margin is not None else settings.ROUTER_MULTI_MARGIN
+        self.temperature = temperature or settings.ROUTER_TEMPERATURE
+        self.max_exemplars = max_exemplars or settings.ROUTER_MAX_EXEMPLARS
+        self.min_similarity = min_similarity if min_similarity is not None else settings.ROUTER_MIN_SIMILARITY
+        self._exemplars: Dict[str, Deque[str]] = {agent: deque(maxlen=self.max_exemplars) for agent in AGENTS}
+        self._matrices: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.add_many(exemplars if exemplars is not None else DEFAULT_EXEMPLARS)
+
+    def exemplar_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {agent: len(questions) for agent, questions in self._exemplars.items()}
+
+    def add(self, question: str, agents: List[str]):
+        """Label a question with the agents that should answer it"""
+        self.add_many({agent: [question] for agent in agents})
+
+    def add_many(self, exemplars: Dict[str, List[str]]):
+        questions = {agent: [normalize_question(q) for q in qs if q.strip()]
+                     for agent, qs in exemplars.items() if agent in AGENTS}
+        with self._lock:
+            for agent, new in questions.items():
+                # Re-adding a question moves it to the most recent end
+                new_set = set(new)
+                known = [q for q in self._exemplars[agent] if q not in new_set]
+                self._exemplars[agent] = deque(known + list(dict.fromkeys(new)), maxlen=self.max_exemplars)
+            snapshot = {agent: list(self._exemplars[agent]) for agent in questions}
+        matrices = {agent: self._embed(qs) for agent, qs in snapshot.items() if qs}
+        with self._lock:
+            self._matrices.update(matrices)
+
+    def train(self, entries: Iterable[LogEntry]) -> int:
+        """Learn from logged interactions (oldest first). Returns the number of entries used"""
+        labelled: Dict[str, List[str]] = {agent: [] for agent in AGENTS}
+        used = 0
+        for entry in entries:
+            # Cache hits repeat an earlier decision
+            if entry.decision.startswith("Answered from cache") or not entry.input.strip():
+                continue
+            for agent in entry.agents_called:
+                if agent in labelled:
+                    labelled[agent].append(entry.input)
+            used += 1
+        # Only the most recent examples are kept, so skip embedding the rest
+        self.add_many({agent: questions[-self.max_exemplars:] for agent, questions in labelled.items()})
+        return used
+
+    def scores(self, question: str) -> Dict[str, float]:
+        """Mean cosine similarity of each agent's top_k closest examples"""
+        query = self._embed([normalize_question(question)])[0]
+        with self._lock:
+            matrices = dict(self._matrices)
+        scores = {}
+        for agent, matrix in matrices.items():
+            similarities = matrix @ query
+            top = min(self.top_k, len(similarities))
+            scores[agent] = float(np.partition(similarities, -top)[-top:].mean())
+        return scores
+
+    def route(self, question: str) -> Tuple[List[str], Dict[str, str], float]:
+        """Return (agents, rationale, confidence) for a question"""
+        scores = self.scores(question)
+        if not scores:
+            return [], {}, 0.0
+        best = max(scores.values())
+        agents = [agent for agent in AGENTS if agent in scores and scores[agent] >= best - self.margin]
+        agents.sort(key=lambda agent: -scores[agent])
+        weights = {agent: np.exp((score - best) / self.temperature) for agent, score in scores.items()}
+        confidence = float(sum(weights[agent] for agent in agents) / sum(weights.values()))
+        if best < self.min_similarity:
+            # Unlike every example seen so far: the relative share means little
+            confidence = 0.0
+        rationale = {
+            agent: f"Embedding router: similar to past {agent} questions "
+                   f"(similarity {scores[agent]:.2f}, confidence {confidence:.2f})"
+            for agent in agents
+        }
+        return agents, rationale, confidence
+
+    def _embed(self, questions: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.encode(questions), dtype="float32")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
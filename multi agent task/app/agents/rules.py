@@ -0,0 +1,111 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.services.answer_cache import normalize_question
+
+
+class RuleEngine:
+    """Keyword/phrase routing rules compiled into a single regular expression.
+
+    Each rule names an agent, the phrases that select it and a rationale. All phrases
+    become one case-insensitive pattern with a lookahead group per rule, so a question
+    is scanned once however many rules there are. Phrases match anywhere, like plain
+    substring checks ("paper" matches "papers" and "newspaper"), and overlapping
+    phrases of different rules are all seen. Agents are returned in rule order; when
+    nothing matches the default agent is used.
+    """
+
+    def __init__(self, rules: List[Dict], default_agent: str = "web_search"):
+        self.rules = rules
+        self.default_agent = default_agent
+        alternatives = []
+        lookaheads = []
+        for number, rule in enumerate(rules):
+            phrases = [re.escape(phrase) for phrase in rule["phrases"] if phrase.strip()]
+            if phrases:
+                alternatives.extend(phrases)
+                lookaheads.append(f"(?=(?P<r{number}>{'|'.join(phrases)}))?")
+        # Stops only where some phrase starts, then tries every rule at that position;
+        # matches are zero-width, so phrases overlapping a previous match still count
+        self._pattern = (re.compile("(?=" + "|".join(alternatives) + ")" + "".join(lookaheads), re.IGNORECASE)
+                         if alternatives else None)
+
+    @classmethod
+    def from_settings(cls) -> "RuleEngine":
+        """Rules from ROUTING_RULES_FILE if set, otherwise ROUTING_RULES"""
+        rules = settings.ROUTING_RULES
+        if settings.ROUTING_RULES_FILE:
+            with open(settings.ROUTING_RULES_FILE, "r", encoding="utf-8") as f:
+                rules = json.load(f)
+        return cls(rules, settings.ROUTING_DEFAULT_AGENT)
+
+    def matching_rules(self, question: str) -> List[int]:
+        """Indexes of the rules whose phrases occur in the question, in rule order"""
+        if self._pattern is None:
+            return []
+        matched = {int(name[1:]) for match in self._pattern.finditer(question)
+                   for name, value in match.groupdict().items() if value is not None}
+        return sorted(matched)
+
+    def decide(self, question: str) -> Tuple[List[str], Dict[str, str]]:
+        agents_to_use = []
+        rationale = {}
+        for number in self.matching_rules(question):
+            agent = self.rules[number]["agent"]
+            if agent not in rationale:
+                agents_to_use.append(agent)
+                rationale[agent] = self.rules[number].get("rationale", f"Question matches {agent} keywords")
+        if not agents_to_use:
+            agents_to_use.append(self.default_agent)
+            rationale[self.default_agent] = "Default agent for general questions"
+        return agents_to_use, rationale
+
+
+class RoutingCache:
+    """LRU cache of final routing decisions keyed by normalized question"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.ROUTING_CACHE_SIZE
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[List[str], Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, question: str) -> Optional[Tuple[List[str], Dict[str, str]]]:
+        key = normalize_question(question)
+        with self._lock:
+            decision = self._entries.get(key)
+            if decision is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        agents, rationale = decision
+        return list(agents), dict(rationale)
+
+    def put(self, question: str, agents: List[str], rationale: Dict[str, str]):
+        if self.max_entries <= 0:
+            return
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = (list(agents), dict(rationale))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
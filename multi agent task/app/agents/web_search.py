@@ -2,46 +2,82 @@ import requests
 import os
 from typing import List, Dict
 from app.config.settings import settings
+from app.services.result_cache import ResultCache
+from app.services.http_client import get_http_client
+from app.storage.ttl_cache import make_ttl_store
 
 class WebSearchAgent:
     def __init__(self):
         self.api_key = settings.SERPAPI_API_KEY
-        self.base_url = "https://serpapi.com/search"
+        self.base_url = settings.SERPAPI_URL
+        self.timeout = (settings.WEB_SEARCH_CONNECT_TIMEOUT, settings.WEB_SEARCH_READ_TIMEOUT)
+        # Repeated and concurrent identical queries share one SerpAPI call
+        self.cache = ResultCache(
+            make_ttl_store(settings.WEB_SEARCH_CACHE_BACKEND, settings.WEB_SEARCH_CACHE_SIZE,
+                           settings.WEB_SEARCH_CACHE_DB),
+            ttl=settings.WEB_SEARCH_CACHE_TTL
+        )
     
     def search(self, query: str) -> dict:
         """Perform a web search using SerpAPI and return results"""
         try:
-            # Use SerpAPI for web search
-            params = {
-                "q": query,
-                "api_key": self.api_key,
-                "engine": "google"
-            }
-            
-            response = requests.get(self.base_url, params=params)
-            data = response.json()
-            
-            # Extract relevant information
-            results = []
-            
-            # Add organic search results
-            if "organic_results" in data:
-                for result in data["organic_results"][:5]:  # Limit to 5 results
-                    results.append({
-                        "title": result.get("title", ""),
-                        "content": result.get("snippet", ""),
-                        "url": result.get("link", "")
-                    })
-            
-            # Create summary
-            summary = " ".join([f"{result['title']}: {result['content'][:100]}..." for result in results[:2]])
-            
-            return {
-                "results": results,
-                "summary": summary if summary else f"No web results found for query: {query}"
-            }
+            return self.cache.get_or_compute(self._cache_key(query), lambda: self._search(query))
         except Exception as e:
-            return {
-                "results": [],
-                "summary": f"Error during web search: {str(e)}"
-            }
\ No newline at end of file
+            return self._error(e)
+    
+    async def asearch(self, query: str) -> dict:
+        """Async search through the shared connection pool; same results as search
+        
+        Failures raise instead of returning an error summary, so the fan-out reports the
+        agent as failed and the answer is not cached.
+        """
+        return await self.cache.aget_or_compute(self._cache_key(query), lambda: self._asearch(query))
+    
+    def _cache_key(self, query: str) -> str:
+        return "google\0" + " ".join(query.lower().split())
+    
+    def _params(self, query: str) -> dict:
+        # Use SerpAPI for web search
+        return {
+            "q": query,
+            "api_key": self.api_key,
+            "engine": "google"
+        }
+    
+    def _search(self, query: str) -> dict:
+        response = requests.get(self.base_url, params=self._params(query), timeout=self.timeout)
+        # Raise on HTTP errors so failed searches are not cached
+        response.raise_for_status()
+        return self._parse(query, response.json())
+    
+    async def _asearch(self, query: str) -> dict:
+        response = await get_http_client().get(self.base_url, params=self._params(query))
+        response.raise_for_status()
+        return self._parse(query, response.json())
+    
+    def _parse(self, query: str, data: dict) -> dict:
+        # Extract relevant information
+        results = []
+        
+        # Add organic search results
+        if "organic_results" in data:
+            for result in data["organic_results"][:5]:  # Limit to 5 results
+                results.append({
+                    "title": result.get("title", ""),
+                    "content": result.get("snippet", ""),
+                    "url": result.get("link", "")
+                })
+        
+        # Create summary
+        summary = " ".join([f"{result['title']}: {result['content'][:100]}..." for result in results[:2]])
+        
+        return {
+            "results": results,
+            "summary": summary if summary else f"No web results found for query: {query}"
+        }
+    
+    def _error(self, e: Exception) -> dict:
+        return {
+            "results": [],
+            "summary": f"Error during web search: {str(e)}"
+        }
\ No newline at end of file
@@ -1,9 +1,20 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
+from datetime import datetime
 from app.agents.controller import ControllerAgent
 from app.models.query import QueryRequest, QueryResponse
 from app.models.log import LogResponse
+from app.models.job import JobStatus
+from app.services.jobs import QueueFullError
+from app.config.settings import settings
+from app.storage.log_store import entry_to_line
+from app.services.metrics import registry
+from app.services.uploads import receive_upload
 import os
+import json
 
 router = APIRouter()
 
@@ -16,25 +27,102 @@ async def ask_question(query: QueryRequest):
     response = await controller.process_query(query)
     return response
 
-@router.post("/upload_pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    """Upload a PDF file for RAG processing"""
-    # Create uploads directory if it doesn't exist
-    os.makedirs("uploads", exist_ok=True)
+@router.post("/ask/stream")
+async def ask_question_stream(query: QueryRequest, format: str = Query("sse", pattern="^(sse|ndjson)$")):
+    """Ask a question and stream the routing decision, agent results and answer tokens
     
-    # Save the uploaded file
-    file_path = f"uploads/{file.filename}"
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    Sent as Server-Sent Events (event name + JSON data) or, with format=ndjson, as one
+    JSON object per line with the event name in its "event" field.
+    """
+    async def events():
+        async for event in controller.stream_query(query):
+            data = json.dumps(jsonable_encoder(event))
+            if format == "ndjson":
+                yield data + "\n"
+            else:
+                yield f"event: {event['event']}\ndata: {data}\n\n"
     
-    # Process the PDF with RAG agent
-    result = await controller.process_pdf(file_path)
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    # Tell proxies not to buffer the stream
+    return StreamingResponse(events(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# The body is parsed by receive_upload rather than an UploadFile parameter, so describe it here
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"]
+        }}}
+    }
+}
+
+@router.post("/upload_pdf", openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_pdf(request: Request):
+    """Upload a PDF file (multipart field "file") for RAG processing
+    
+    The upload is streamed to disk as it arrives and refused with 413 as soon as it
+    is known to exceed MAX_FILE_SIZE, from Content-Length or from the bytes received.
+    """
+    upload_path, file_path, filename, file_hash = await receive_upload(request, settings.UPLOAD_DIR)
     
-    return {"message": "PDF uploaded and processed successfully", "result": result}
+    # Hand the PDF to the background ingestion workers (recording the job writes to SQLite)
+    try:
+        job = await run_in_threadpool(controller.submit_pdf, upload_path, filename=filename,
+                                      file_hash=file_hash, source=file_path)
+    except QueueFullError as e:
+        os.remove(upload_path)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    return JSONResponse(status_code=202, content={
+        "message": f"PDF uploaded and queued for processing (job {job.job_id})",
+        "job_id": job.job_id,
+        "status_url": f"/jobs/{job.job_id}"
+    })
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Get the status of a PDF ingestion job
+    
+    Answered by any worker when INGEST_JOB_DB is set; otherwise only by the worker that
+    accepted the upload.
+    """
+    job = await run_in_threadpool(controller.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit rates of the answer, embedding, web search and routing caches in this worker"""
+    return controller.cache_stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Stage latency histograms and request counters of this worker, in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @router.get("/logs", response_model=LogResponse)
-async def get_logs():
-    """Get all logs from the system"""
-    logs = controller.get_logs()
-    return LogResponse(logs=logs)
\ No newline at end of file
+async def get_logs(
+    limit: Optional[int] = Query(None, ge=1, description="Page size (unbounded for ndjson by default)"),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    agent: Optional[str] = Query(None, description="Only logs where this agent was called"),
+    q: Optional[str] = Query(None, description="Substring of the question"),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Get logs from the system, newest first, one page at a time"""
+    if format == "ndjson":
+        # Stream one JSON object per line; the generator runs in the threadpool
+        entries = controller.stream_logs(limit, cursor, order, since, until, agent, q)
+        return StreamingResponse((entry_to_line(entry) for entry in entries), media_type="application/x-ndjson")
+    
+    limit = min(limit or settings.LOG_PAGE_SIZE, settings.LOG_PAGE_MAX)
+    logs, next_cursor = await run_in_threadpool(
+        controller.query_logs, limit, cursor, order, since, until, agent, q
+    )
+    return LogResponse(logs=logs, next_cursor=str(next_cursor) if next_cursor is not None else None)
\ No newline at end of file
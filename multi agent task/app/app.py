@@ -4,6 +4,7 @@ This interface is optimized for Hugging Face Spaces deployment
 """
 import gradio as gr
 import requests
+import json
 import os
 from typing import List, Dict, Any
 import time
@@ -11,26 +12,50 @@ import time
 # Get the backend URL (for HF Spaces, this will be the same server)
 BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:8000")
 
-def ask_question(question: str) -> str:
-    """Ask a question to the multi-agent system"""
+def ask_question(question: str):
+    """Ask a question to the multi-agent system, updating the answer as it streams in"""
     try:
         response = requests.post(
-            f"{BACKEND_URL}/ask",
+            f"{BACKEND_URL}/ask/stream",
+            params={"format": "ndjson"},
             json={"question": question},
+            stream=True,
             timeout=30
         )
-        if response.status_code == 200:
-            data = response.json()
+        if response.status_code != 200:
+            yield f"Error: {response.status_code} - {response.text}"
+            return
+        
+        agents = []
+        progress = []
+        answer = ""
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["event"] == "routing":
+                agents = [f"- {name}: {event['rationale'].get(name, '')}" for name in event["agents"]]
+                progress.append(f"Routing to {', '.join(event['agents'])}...")
+            elif event["event"] == "agent_result":
+                progress.append(f"{event['agent']} finished")
+            elif event["event"] == "agent_error":
+                progress.append(f"{event['agent']} {event['reason']}")
+            elif event["event"] == "token":
+                answer += event["text"]
+            elif event["event"] == "done":
+                data = event["response"]
+                answer = data["answer"]
+                agents = [f"- {agent['name']}: {agent['rationale']}" for agent in data["agents_used"]]
+                progress = []
+            
             # Format the response nicely
-            result = f"**Answer:**\n{data['answer']}\n\n"
-            result += "**Agents Used:**\n"
-            for agent in data['agents_used']:
-                result += f"- {agent['name']}: {agent['rationale']}\n"
-            return result
-        else:
-            return f"Error: {response.status_code} - {response.text}"
+            result = f"**Answer:**\n{answer or '...'}\n\n"
+            result += "**Agents Used:**\n" + "\n".join(agents) + "\n"
+            if progress:
+                result += "\n_" + " | ".join(progress) + "_\n"
+            yield result
     except Exception as e:
-        return f"Error connecting to backend: {str(e)}"
+        yield f"Error connecting to backend: {str(e)}"
 
 def upload_pdf(file_obj) -> str:
     """Upload a PDF file for processing"""
@@ -46,9 +71,9 @@ def upload_pdf(file_obj) -> str:
                 timeout=30
             )
         
-        if response.status_code == 200:
+        if response.status_code in (200, 202):
             data = response.json()
-            return f"**PDF Upload Result:**\n{data['message']}"
+            return f"**PDF Upload Result:**\n{data['message']}\n\nCheck progress at `{data['status_url']}`."
         else:
             return f"Error: {response.status_code} - {response.text}"
     except Exception as e:
@@ -57,7 +82,8 @@ def upload_pdf(file_obj) -> str:
 def get_logs() -> str:
     """Get system logs"""
     try:
-        response = requests.get(f"{BACKEND_URL}/logs", timeout=10)
+        # Only fetch the page we show; /logs returns newest first
+        response = requests.get(f"{BACKEND_URL}/logs", params={"limit": 5}, timeout=10)
         if response.status_code == 200:
             data = response.json()
             if not data['logs']:
@@ -66,7 +92,7 @@ def get_logs() -> str:
             # Format the logs nicely
             result = "**Recent System Logs:**\n\n"
             # Show last 5 logs
-            for i, log in enumerate(reversed(data['logs'][-5:])):
+            for i, log in enumerate(data['logs']):
                 result += f"**Log Entry {i+1}:**\n"
                 result += f"Input: {log['input']}\n"
                 result += f"Decision: {log['decision']}\n"
@@ -12,12 +12,117 @@ class Settings:
     # File upload settings
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
     UPLOAD_DIR = "uploads"
+    UPLOAD_FORM_OVERHEAD = 64 * 1024  # multipart boundaries and headers allowed on top of MAX_FILE_SIZE in Content-Length
+    
+    # Background ingestion settings
+    INGEST_WORKERS = 2  # jobs processed at the same time
+    INGEST_PROCESSES = int(os.getenv("INGEST_PROCESSES", "2"))  # extraction/embedding processes; 0 runs them in the job thread
+    INGEST_QUEUE_MAX = 16  # queued uploads before /upload_pdf answers 503
+    INGEST_JOB_HISTORY = 1000  # finished jobs kept for /jobs/{id}
+    INGEST_JOB_DB = os.getenv("INGEST_JOB_DB", "cache/ingest_jobs.sqlite")  # job statuses shared by every worker; empty keeps them per worker
+    INGEST_EMBED_BATCH = 64  # chunks embedded per model call while streaming a PDF
+    INGEST_COMMIT_BATCH = 2048  # largest batch of chunks committed at once
+    INGEST_SAVE_ROWS = 8192  # unsaved index rows that trigger a save mid-document
+    INGEST_SAVE_SECONDS = 30.0  # time between index saves mid-document; always saved at the end
     
     # RAG settings
     CHUNK_SIZE = 500
     CHUNK_OVERLAP = 50
+    EXTRACT_PAGES_PER_SHARD = 32  # pages extracted per process-pool task
+    EXTRACT_MAX_IN_FLIGHT = 0  # shards pending at once; 0 uses twice the pool's workers
+    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    EMBEDDING_DIMENSION = 384
+    SAMPLE_PDF_DIR = "sample_pdfs"
+    INDEX_DIR = os.getenv("INDEX_DIR", "index_store")  # persisted FAISS index and chunk store
+    EMBEDDING_CACHE_SIZE = 50000  # embeddings kept in the in-memory LRU
+    EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB", "")  # SQLite file for the on-disk tier; empty disables it
+    
+    # Vector index settings
+    INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")  # flat, ivf_flat, ivf_pq or hnsw
+    ANN_MIGRATION_THRESHOLD = 100000  # chunks before a flat index is rebuilt as INDEX_TYPE
+    ANN_TRAIN_SAMPLE = 100000  # vectors sampled to train IVF/PQ indexes
+    IVF_NLIST = 0  # 0 picks ~4*sqrt(n) inverted lists
+    IVF_NPROBE = 16
+    PQ_M = 48  # sub-quantizers; must divide EMBEDDING_DIMENSION
+    PQ_NBITS = 8
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 64
+    VECTOR_METRIC = os.getenv("VECTOR_METRIC", "ip")  # ip (cosine on normalized vectors) or l2; existing indexes keep theirs
+    VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "float16")  # raw vector side store: float32, float16 or int8
+    RERANK_FACTOR = 4  # IVF-PQ candidates re-ranked exactly from the side store, as a multiple of k; 0 disables
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")  # hybrid (dense + BM25 fused) or dense
+    HYBRID_CANDIDATE_FACTOR = 4  # candidates per ranking fused in hybrid mode, as a multiple of k
+    RRF_K = 60  # reciprocal rank fusion constant
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    SEARCH_BATCH_MAX = 32  # PDF searches coalesced into one encode + FAISS call
+    SEARCH_BATCH_WAIT_MS = 3  # how long the first search of a batch waits for others
+    
+    # Web search settings
+    SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")  # point at a stub server in tests
+    WEB_SEARCH_CONNECT_TIMEOUT = 3.05  # seconds to connect to SerpAPI
+    WEB_SEARCH_READ_TIMEOUT = 10  # seconds to wait for the response
+    WEB_SEARCH_CACHE_TTL = 300  # seconds a search result is reused; 0 disables caching
+    WEB_SEARCH_CACHE_BACKEND = os.getenv("WEB_SEARCH_CACHE_BACKEND", "memory")  # memory (per worker) or sqlite (shared)
+    WEB_SEARCH_CACHE_DB = os.getenv("WEB_SEARCH_CACHE_DB", "cache/web_search.sqlite")  # used by the sqlite backend
+    WEB_SEARCH_CACHE_SIZE = 1000  # cached queries kept
     
     # ArXiv settings
     ARXIV_MAX_RESULTS = 5
+    ARXIV_API_URL = os.getenv("ARXIV_API_URL", "https://export.arxiv.org/api/query")
+    ARXIV_STORE_PATH = os.getenv("ARXIV_STORE_PATH", "cache/arxiv.sqlite")  # local paper metadata + full-text index; empty disables it
+    ARXIV_QUERY_TTL = 7 * 24 * 3600  # seconds a fetched query is answered from the local store
+    ARXIV_LOCAL_MIN_RESULTS = 3  # local papers matching every query term needed to skip the API
+    
+    # Shared HTTP client settings (async web search and ArXiv calls)
+    HTTP_MAX_CONNECTIONS = 100  # pooled connections across all hosts
+    HTTP_MAX_CONNECTIONS_PER_HOST = 10  # concurrent requests to any one API
+    HTTP_CONNECT_TIMEOUT = 3.05  # seconds
+    HTTP_READ_TIMEOUT = 10  # seconds
+    HTTP_KEEPALIVE_EXPIRY = 60  # seconds an idle connection is kept open
+    
+    # Agent execution settings
+    AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT", "15"))  # seconds per agent call
+    QUERY_DEADLINE = float(os.getenv("QUERY_DEADLINE", "20"))  # seconds for the whole fan-out
+    AGENT_MAX_WORKERS = 8  # threads used for blocking agent calls
+    
+    # Routing settings
+    ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.6"))  # below this the LLM decides; 0 never asks it
+    ROUTER_MIN_SIMILARITY = 0.3  # best example similarity below this counts as zero confidence
+    ROUTER_MULTI_MARGIN = 0.03  # agents scoring within this of the best are also called
+    ROUTER_TEMPERATURE = 0.05  # softmax temperature turning similarities into confidence
+    ROUTER_TOP_K = 3  # closest examples averaged per agent
+    ROUTER_MAX_EXEMPLARS = 500  # most recent example questions kept per agent
+    ROUTER_TRAIN_MAX_AGE_DAYS = 30  # logged questions this recent train the router at startup; 0 skips training
+    ROUTING_CACHE_SIZE = 10000  # routing decisions remembered per normalized question; 0 disables
+    ROUTING_RULES_FILE = os.getenv("ROUTING_RULES_FILE", "")  # JSON list of rules replacing ROUTING_RULES
+    ROUTING_RULES = [  # keyword/phrase rules used when the router is unsure and no LLM is available
+        {"agent": "pdf_rag", "phrases": ["pdf", "document"],
+         "rationale": "Question relates to PDF/document content"},
+        {"agent": "arxiv", "phrases": ["recent papers", "arxiv", "paper", "research"],
+         "rationale": "Question specifically asks for recent papers or arxiv content"},
+        {"agent": "web_search", "phrases": ["latest news", "recent developments", "current events", "today"],
+         "rationale": "Question asks for latest news or recent developments"}
+    ]
+    ROUTING_DEFAULT_AGENT = "web_search"  # used when no rule matches
+    
+    # Answer cache settings
+    ANSWER_CACHE_SIZE = 1000  # cached answers kept (least recently used evicted)
+    ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))  # cosine similarity for a near-duplicate hit; 0 = exact matches only
+    ANSWER_CACHE_TTLS = {  # seconds; an answer expires with the shortest TTL of its agents
+        "pdf_rag": 24 * 3600,  # also dropped whenever the PDF index changes
+        "web_search": 300,
+        "arxiv": 3600,
+        "default": 300
+    }
+    
+    # Logging settings
+    LOG_DIR = "logs"
+    LOG_ROTATE_BYTES = 50 * 1024 * 1024  # rotate the active log segment past this size
+    LOG_ROTATE_SECONDS = 24 * 3600  # ... or once its first entry is this old
+    LOG_LOAD_MAX_AGE_DAYS = 0  # only index segments this recent; 0 indexes everything
+    LOG_PAGE_SIZE = 50  # default page size for GET /logs
+    LOG_PAGE_MAX = 1000
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+class JobStatus(BaseModel):
+    job_id: str
+    filename: str
+    status: str  # queued, running, succeeded, skipped or failed
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
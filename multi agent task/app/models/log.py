@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class LogEntry(BaseModel):
@@ -9,6 +9,7 @@ class LogEntry(BaseModel):
     documents_retrieved: List[str]
     final_answer: str
     timestamp: datetime
+    stage_timings: Dict[str, float] = {}  # seconds spent per request stage (routing, agents, synthesis...)
     
     class Config:
         # This allows the model to work with datetime objects properly
@@ -17,4 +18,5 @@ class LogEntry(BaseModel):
         }
 
 class LogResponse(BaseModel):
-    logs: List[LogEntry]
\ No newline at end of file
+    logs: List[LogEntry]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to fetch the next page
\ No newline at end of file
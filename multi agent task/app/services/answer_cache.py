@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.config.settings import settings
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question, used as the exact cache key"""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+class AnswerCache:
+    """Bounded cache of final answers produced by the controller.
+
+    Answers are looked up by the normalized question and, when ``similarity_threshold``
+    is set and an ``encode`` function is given, by cosine similarity of question
+    embeddings. Each entry expires after the shortest TTL of the agents that produced
+    it, and entries that used the PDF index are dropped once the index version moves
+    on. The least recently used entry is evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttls: Optional[Dict[str, float]] = None,
+                 similarity_threshold: Optional[float] = None,
+                 encode: Optional[Callable[[List[str]], np.ndarray]] = None):
+        self.max_entries = max_entries or settings.ANSWER_CACHE_SIZE
+        self.ttls = ttls if ttls is not None else settings.ANSWER_CACHE_TTLS
+        self.similarity_threshold = (similarity_threshold if similarity_threshold is not None
+                                     else settings.ANSWER_CACHE_SIMILARITY)
+        self.encode = encode
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[Tuple[List[str], np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def semantic(self) -> bool:
+        return self.encode is not None and 0 < self.similarity_threshold <= 1
+
+    def get(self, question: str, pdf_version: Any = None) -> Optional[Any]:
+        """Return the cached value for question, or None on a miss"""
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            entry = self._valid_entry(key, now, pdf_version)
+            if entry is not None:
+                self.hits += 1
+                return entry["value"]
+        if not self.semantic:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        embedding = self._embed(key)
+        with self._lock:
+            match = self._nearest(embedding)
+            entry = self._valid_entry(match, now, pdf_version) if match is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.semantic_hits += 1
+            return entry["value"]
+
+    def put(self, question: str, value: Any, agents: List[str], pdf_version: Any = None):
+        """Cache value for question; it expires after the shortest TTL of the agents used"""
+        ttl = min((self.ttls.get(agent, self.ttls.get("default", 0)) for agent in agents),
+                  default=self.ttls.get("default", 0))
+        if ttl <= 0:
+            return
+        key = normalize_question(question)
+        embedding = self._embed(key) if self.semantic else None
+        with self._lock:
+            self._entries[key] = {
+                "value": value,
+                "expires_at": time.time() + ttl,
+                # Only answers that searched the PDFs depend on the index
+                "pdf_version": pdf_version if "pdf_rag" in agents else None,
+                "embedding": embedding
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _valid_entry(self, key: str, now: float, pdf_version: Any) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= now:
+            self.expired += 1
+        elif entry["pdf_version"] is not None and entry["pdf_version"] != pdf_version:
+            self.invalidated += 1
+        else:
+            self._entries.move_to_end(key)
+            return entry
+        del self._entries[key]
+        self._matrix = None
+        return None
+
+    def _embed(self, key: str) -> np.ndarray:
+        vector = np.asarray(self.encode([key]), dtype="float32")[0]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _nearest(self, embedding: np.ndarray) -> Optional[str]:
+        if self._matrix is None:
+            keys = [key for key, entry in self._entries.items() if entry["embedding"] is not None]
+            vectors = (np.stack([self._entries[key]["embedding"] for key in keys]) if keys
+                       else np.zeros((0, len(embedding)), dtype="float32"))
+            self._matrix = (keys, vectors)
+        keys, vectors = self._matrix
+        if not keys:
+            return None
+        scores = vectors @ embedding
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity_threshold else None
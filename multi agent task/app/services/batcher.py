@@ -0,0 +1,89 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.services.metrics import add_to_trace, start_trace
+
+
+class MicroBatcher:
+    """Coalesces concurrent calls into one call of a batch function.
+
+    ``submit(item)`` waits up to ``max_wait`` seconds for other items to arrive (or
+    until ``max_batch`` are queued), then runs ``batch_fn(items)`` once on a worker
+    thread and hands each caller its own result. ``batch_fn`` must return one result
+    per item, in order. While a batch is running the next one keeps filling up, so
+    batches grow with the load instead of adding latency when it is quiet.
+
+    Stage timings recorded inside ``batch_fn`` are added to the trace of every caller
+    whose item was in the batch, since each of them waited for the whole batch.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch: Optional[int] = None,
+                 max_wait: Optional[float] = None, max_concurrent: int = 2):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch or settings.SEARCH_BATCH_MAX
+        self.max_wait = max_wait if max_wait is not None else settings.SEARCH_BATCH_WAIT_MS / 1000.0
+        self.batches = 0
+        self.items = 0
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="batch")
+
+    async def submit(self, item: Any) -> Any:
+        """Queue item for the next batch and return its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        result, timings = await future
+        add_to_trace(timings)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0
+        }
+
+    def shutdown(self):
+        """Release the worker threads"""
+        self._executor.shutdown(wait=False)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that timed out have cancelled their futures; don't search for them
+        batch = [(item, future) for item, future in self._pending if not future.done()]
+        self._pending = []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        loop = asyncio.get_running_loop()
+        try:
+            # Executor threads don't inherit the callers' context; trace the batch in its own
+            results, timings = await loop.run_in_executor(
+                self._executor, contextvars.Context().run, self._traced_batch, [item for item, _ in batch]
+            )
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result((result, timings))
+
+    def _traced_batch(self, items: List[Any]) -> Tuple[List[Any], Dict[str, float]]:
+        timings = start_trace()
+        return self.batch_fn(items), timings
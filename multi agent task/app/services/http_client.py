@@ -0,0 +1,78 @@
+import asyncio
+import importlib.util
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from app.config.settings import settings
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class PooledHTTPClient:
+    """Shared ``httpx.AsyncClient`` for the external agents.
+
+    Connections are kept alive and reused across requests (HTTP/2 when ``h2`` is
+    installed), every request has connect/read timeouts, and a per-host semaphore
+    caps concurrent requests to any one API so a burst of questions cannot exhaust
+    the pool or trip an upstream rate limit.
+    """
+
+    def __init__(self, max_connections: Optional[int] = None, max_per_host: Optional[int] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 keepalive_expiry: Optional[float] = None):
+        self.max_per_host = max_per_host or settings.HTTP_MAX_CONNECTIONS_PER_HOST
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=max_connections or settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=max_connections or settings.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=keepalive_expiry or settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                connect=connect_timeout or settings.HTTP_CONNECT_TIMEOUT,
+                read=read_timeout or settings.HTTP_READ_TIMEOUT,
+                write=read_timeout or settings.HTTP_READ_TIMEOUT,
+                # Waiting for a free pooled connection counts against the read budget
+                pool=read_timeout or settings.HTTP_READ_TIMEOUT
+            ),
+            follow_redirects=True
+        )
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """GET url through the pool, waiting for a free slot for its host"""
+        host = urlsplit(url).netloc
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        async with slots:
+            return await self._client.get(url, **kwargs)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# One client per event loop; a uvicorn worker has a single loop for its lifetime.
+# The loop is kept alongside its client so its id cannot be reused by a new loop.
+_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, PooledHTTPClient]] = {}
+
+
+def get_http_client() -> PooledHTTPClient:
+    """Return the shared client for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(id(loop))
+    if entry is None or entry[1].is_closed:
+        entry = _clients[id(loop)] = (loop, PooledHTTPClient())
+    return entry[1]
+
+
+async def close_http_client():
+    """Close the running loop's client; call on application shutdown"""
+    entry = _clients.pop(id(asyncio.get_running_loop()), None)
+    if entry is not None:
+        await entry[1].aclose()
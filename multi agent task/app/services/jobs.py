@@ -0,0 +1,135 @@
+import multiprocessing
+import queue
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Optional
+from app.config.settings import settings
+from app.models.job import JobStatus
+from app.storage.job_store import JobStore
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue is at capacity; the caller should retry later"""
+
+
+class IngestionJobQueue:
+    """Bounded queue of PDF ingestion jobs processed in the background.
+
+    Worker threads take jobs off the queue and call ``process_pdf(file_path, executor=...)``,
+    where the executor is a process pool used for text extraction and embedding. The
+    index itself is only touched by ``process_pdf`` under its write lock, one commit
+    batch at a time, so a job's chunks become searchable incrementally while it runs.
+
+    Jobs run in the worker process that accepted them. With ``db_path`` their statuses
+    are also written to a ``JobStore`` so any worker can answer ``get``; without it
+    they are only known to this worker.
+    """
+
+    def __init__(self, process_pdf: Callable[..., dict], workers: Optional[int] = None,
+                 processes: Optional[int] = None, max_queued: Optional[int] = None,
+                 history: Optional[int] = None, db_path: Optional[str] = None):
+        self.process_pdf = process_pdf
+        self.workers = workers or settings.INGEST_WORKERS
+        self.processes = processes if processes is not None else settings.INGEST_PROCESSES
+        self.history = history or settings.INGEST_JOB_HISTORY
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queued or settings.INGEST_QUEUE_MAX)
+        self._jobs: "OrderedDict[str, JobStatus]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._store = JobStore(db_path, self.history) if db_path else None
+
+    def submit(self, file_path: str, filename: Optional[str] = None, **kwargs: Any) -> JobStatus:
+        """Queue a PDF for ingestion and return its job; raises QueueFullError when at capacity"""
+        self._start()
+        job = JobStatus(
+            job_id=uuid.uuid4().hex,
+            filename=filename or file_path,
+            status="queued",
+            submitted_at=datetime.now()
+        )
+        with self._lock:
+            try:
+                self._queue.put_nowait((job, file_path, kwargs))
+            except queue.Full:
+                raise QueueFullError(f"Ingestion queue is full ({self._queue.maxsize} jobs waiting)")
+            self._jobs[job.job_id] = job
+            # Forget the oldest finished jobs beyond the history limit
+            for job_id in list(self._jobs):
+                if len(self._jobs) <= self.history:
+                    break
+                if self._jobs[job_id].status not in ("queued", "running"):
+                    del self._jobs[job_id]
+        self._record(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        """Return a job of this worker, or of any worker sharing the job store"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self._store is not None:
+            job = self._store.get(job_id)
+        return job
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            if self.processes > 0:
+                # spawn, not fork: the parent has threads and a loaded model
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"ingest-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            job, file_path, kwargs = self._queue.get()
+            job.status = "running"
+            job.started_at = datetime.now()
+            self._record(job)
+            try:
+                result = self.process_pdf(file_path, executor=self._executor, **kwargs)
+                job.result = result
+                if result.get("status") == "error":
+                    job.status = "failed"
+                    job.error = result.get("message")
+                elif result.get("status") == "skipped":
+                    job.status = "skipped"
+                else:
+                    job.status = "succeeded"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.now()
+                self._record(job)
+                self._queue.task_done()
+
+    def _record(self, job: JobStatus):
+        if self._store is None:
+            return
+        try:
+            self._store.put(job)
+        except sqlite3.Error as e:
+            print(f"Failed to record ingestion job {job.job_id}: {e}")
+
+    def join(self):
+        """Block until every queued job has finished"""
+        self._queue.join()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,30 @@
+"""Functions run in the ingestion process pool.
+
+Spawned workers import this module to unpickle the tasks, so it only depends on
+PyMuPDF, numpy and the settings; the model is loaded on the first encode call.
+"""
+from typing import List, Tuple
+import fitz  # PyMuPDF
+import numpy as np
+from app.config.settings import settings
+
+# Model loaded lazily inside ingestion worker processes
+_worker_model = None
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extract (page number, text) for pages [start, end) of a PDF; page numbers are 1-based"""
+    doc = fitz.open(file_path)
+    try:
+        return [(number + 1, doc[number].get_text()) for number in range(start, min(end, doc.page_count))]
+    finally:
+        doc.close()
+
+
+def encode_in_worker(texts: List[str]) -> np.ndarray:
+    """Embed texts with a model owned by the current (worker) process"""
+    global _worker_model
+    if _worker_model is None:
+        from sentence_transformers import SentenceTransformer
+        _worker_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+    return np.asarray(_worker_model.encode(texts), dtype="float32")
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """TTL cache in front of an expensive call, with single-flight coalescing.
+
+    ``get_or_compute(key, compute)`` returns a fresh cached value when there is one.
+    Otherwise the first caller for a key runs ``compute`` while concurrent callers for
+    the same key wait for its result instead of repeating the call. Only successful
+    results are cached; an exception is raised in every waiting caller.
+    ``aget_or_compute`` does the same for coroutines on the event loop.
+
+    ``store`` is any object with ``get(key)`` and ``set(key, value, ttl)``, e.g. the
+    stores in ``app.storage.ttl_cache``. In the async path, stores that do blocking I/O
+    (``blocking`` true, the default for unknown stores) are called in a worker thread.
+    """
+
+    def __init__(self, store, ttl: float):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[str, "asyncio.Future"] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.store.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+            if flight.result is not None and self.ttl > 0:
+                self.store.set(key, flight.result, self.ttl)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of get_or_compute; concurrent awaiters of a key share one compute()"""
+        value = await self._store_call(self.store.get, key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            # Shield the shared call from the cancellation of any single waiter
+            return await asyncio.shield(flight)
+
+        self.misses += 1
+        flight = self._async_flights[key] = asyncio.ensure_future(self._compute_and_store(key, compute))
+        # The call finishes even if every waiter gave up; don't warn about its error then
+        flight.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return await asyncio.shield(flight)
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await compute()
+            if result is not None and self.ttl > 0:
+                await self._store_call(self.store.set, key, result, self.ttl)
+            return result
+        finally:
+            self._async_flights.pop(key, None)
+
+    async def _store_call(self, method: Callable, *args) -> Any:
+        if getattr(self.store, "blocking", True):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self.store)
+        }
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from app.config.settings import settings
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart  # type: ignore
+    from multipart.multipart import parse_options_header  # type: ignore
+
+
+class MultipartFileReader:
+    """Incremental multipart/form-data parser that extracts the bytes of one file field.
+
+    ``feed`` takes the request body piece by piece and returns the file bytes found
+    in it, so the caller can write and size-check them as they arrive. Other fields
+    are skipped.
+    """
+
+    def __init__(self, boundary: bytes, field: str = "file"):
+        self.field = field
+        self.filename: Optional[str] = None
+        self.found = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._blocks: List[bytes] = []
+        self._parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Parse the next piece of the body; returns the file bytes it contained"""
+        self._parser.write(data)
+        blocks, self._blocks = self._blocks, []
+        return blocks
+
+    def finish(self):
+        self._parser.finalize()
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        # Only the first part with the field name is the upload
+        self._in_file = name == self.field and not self.found
+        if self._in_file:
+            self.found = True
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace") or None
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._blocks.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        self._in_file = False
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File exceeds the upload limit of {settings.MAX_FILE_SIZE} bytes")
+
+
+async def receive_upload(request: Request, directory: str, field: str = "file") -> Tuple[str, str, str, str]:
+    """Stream the file field of a multipart request into a private file in directory.
+
+    The body is read straight from the connection rather than spooled by the framework
+    first, so uploads are refused with 413 up front when Content-Length is over the
+    limit, and otherwise as soon as MAX_FILE_SIZE bytes of file have been received.
+    The file is hashed while it is written. Each upload keeps its own file, so a later
+    upload with the same name cannot overwrite it before ingestion has read it; the
+    ingestion job moves it to the file path when it commits the document.
+    Returns (upload path, file path, file name, SHA-256 hex digest).
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.MAX_FILE_SIZE + settings.UPLOAD_FORM_OVERHEAD:
+        raise _too_large()
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail=f"Expected a multipart/form-data upload with a '{field}' field")
+
+    os.makedirs(directory, exist_ok=True)
+    reader = MultipartFileReader(options[b"boundary"], field)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            async for data in request.stream():
+                try:
+                    blocks = reader.feed(data)
+                except multipart.exceptions.MultipartParseError as e:
+                    raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+                for block in blocks:
+                    size += len(block)
+                    if size > settings.MAX_FILE_SIZE:
+                        raise _too_large()
+                    digest.update(block)
+                    await run_in_threadpool(buffer.write, block)
+            reader.finish()
+        if not reader.found:
+            raise HTTPException(status_code=422, detail=f"Field '{field}' is required")
+        filename = os.path.basename(reader.filename or "upload.pdf")
+        file_path = os.path.join(directory, filename)
+        # Atomic rename: ingestion never sees a partially written file
+        upload_path = tmp_path[:-len(".part")] + ".pdf"
+        os.replace(tmp_path, upload_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return upload_path, file_path, filename, digest.hexdigest()
@@ -0,0 +1,196 @@
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_VERSION = re.compile(r"v\d+$")
+
+# Question words and the words that route a question to the ArXiv agent in the first
+# place; requiring them in every matching paper would make local search useless
+STOPWORDS = frozenset("""
+    a about an and any are arxiv by can find for from give how i in is latest list me new
+    of on or paper papers recent research show some studies study the to what which with
+""".split())
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def paper_key(url: str) -> str:
+    """abs URL without its version suffix, so API results and dump records coincide"""
+    return _VERSION.sub("", url)
+
+
+def _fts_query(query: str, operator: str) -> Optional[str]:
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    terms = dict.fromkeys(token.lower() for token in _TOKEN.findall(query)
+                          if token.lower() not in STOPWORDS)
+    if not terms:
+        return None
+    return f" {operator} ".join(f'"{term}"' for term in terms)
+
+
+def paper_from_dump(record: Dict) -> Dict:
+    """Convert a record of the ArXiv metadata dump (arxiv-metadata-oai-snapshot.json) to a paper"""
+    published = record.get("update_date", "") or ""
+    versions = record.get("versions") or []
+    if versions and versions[0].get("created"):
+        try:
+            published = parsedate_to_datetime(versions[0]["created"]).strftime("%Y-%m-%d")
+        except (TypeError, ValueError):
+            pass
+    if record.get("authors_parsed"):
+        authors = [" ".join(part for part in (first, last) if part)
+                   for last, first, *_ in record["authors_parsed"]]
+    else:
+        authors = [name.strip() for name in re.split(r",| and ", record.get("authors", "")) if name.strip()]
+    return {
+        "title": " ".join(record.get("title", "").split()),
+        "content": " ".join(record.get("abstract", "").split()),
+        "url": f"http://arxiv.org/abs/{record['id']}",
+        "authors": authors,
+        "published": published
+    }
+
+
+class ArxivStore:
+    """Local SQLite store of ArXiv paper metadata with an FTS5 full-text index.
+
+    Papers fetched from the API (or bulk-imported from the metadata dump) are kept with
+    their title, abstract, authors and date, and indexed for BM25-ranked search over
+    title, abstract and authors. The papers returned for each API query are recorded too,
+    so a repeated query is answered without touching the API.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                url TEXT PRIMARY KEY, title TEXT, content TEXT, authors TEXT, published TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                title, content, authors, tokenize = 'porter unicode61'
+            );
+            CREATE TABLE IF NOT EXISTS queries (query TEXT PRIMARY KEY, urls TEXT, fetched_at REAL);
+        """)
+        self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def add_papers(self, papers: Iterable[Dict]) -> int:
+        """Insert or update papers (keyed by versionless url). Returns how many were written"""
+        with self._lock:
+            count = self._add_papers(papers)
+            self._db.commit()
+        return count
+
+    def _add_papers(self, papers: Iterable[Dict]) -> int:
+        count = 0
+        for paper in papers:
+            url = paper_key(paper["url"])
+            authors = json.dumps(paper.get("authors", []))
+            # Full-text rows share the rowid of their paper, so replacing one is two index lookups
+            previous = self._db.execute("SELECT rowid FROM papers WHERE url = ?", (url,)).fetchone()
+            if previous is not None:
+                self._db.execute("DELETE FROM papers_fts WHERE rowid = ?", previous)
+            rowid = self._db.execute(
+                "INSERT OR REPLACE INTO papers (url, title, content, authors, published) VALUES (?, ?, ?, ?, ?)",
+                (url, paper["title"], paper["content"], authors, paper.get("published", ""))
+            ).lastrowid
+            self._db.execute(
+                "INSERT INTO papers_fts (rowid, title, content, authors) VALUES (?, ?, ?, ?)",
+                (rowid, paper["title"], paper["content"], " ".join(paper.get("authors", [])))
+            )
+            count += 1
+        return count
+
+    def record_query(self, query: str, papers: List[Dict]):
+        """Remember the papers the API returned for a query"""
+        with self._lock:
+            self._add_papers(papers)
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries (query, urls, fetched_at) VALUES (?, ?, ?)",
+                (normalize_query(query), json.dumps([paper_key(paper["url"]) for paper in papers]), time.time())
+            )
+            self._db.commit()
+
+    def cached_query(self, query: str, max_age: float) -> Optional[List[Dict]]:
+        """Papers recorded for this query if it was fetched within max_age seconds"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT urls FROM queries WHERE query = ? AND fetched_at > ?",
+                (normalize_query(query), time.time() - max_age)
+            ).fetchone()
+            if row is None:
+                return None
+            urls = json.loads(row[0])
+            papers = {paper["url"]: paper for paper in self._fetch(urls)}
+        return [papers[url] for url in urls if url in papers]
+
+    def search(self, query: str, limit: int = 5, match_all: bool = True) -> List[Dict]:
+        """BM25-ranked full-text search; match_all requires every query term to match"""
+        fts_query = _fts_query(query, "AND" if match_all else "OR")
+        if fts_query is None:
+            return []
+        with self._lock:
+            # Title matches weigh three times as much as abstract or author matches
+            rows = self._db.execute(
+                "SELECT papers.url FROM papers_fts JOIN papers ON papers.rowid = papers_fts.rowid "
+                "WHERE papers_fts MATCH ? ORDER BY bm25(papers_fts, 3.0, 1.0, 1.0) LIMIT ?",
+                (fts_query, limit)
+            ).fetchall()
+            urls = [row[0] for row in rows]
+            papers = {paper["url"]: paper for paper in self._fetch(urls)}
+        return [papers[url] for url in urls if url in papers]
+
+    def import_dump(self, path: str, batch_size: int = 10000) -> int:
+        """Bulk-import the ArXiv metadata dump (JSON lines, optionally gzipped). Returns papers imported"""
+        total = 0
+        batch = []
+        for record in self._read_dump(path):
+            batch.append(paper_from_dump(record))
+            if len(batch) >= batch_size:
+                total += self.add_papers(batch)
+                batch = []
+        if batch:
+            total += self.add_papers(batch)
+        return total
+
+    def _read_dump(self, path: str) -> Iterator[Dict]:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _fetch(self, urls: List[str]) -> List[Dict]:
+        papers = []
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(urls), 500):
+            batch = urls[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT url, title, content, authors, published FROM papers WHERE url IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            for url, title, content, authors, published in rows:
+                papers.append({
+                    "title": title,
+                    "content": content,
+                    "url": url,
+                    "authors": json.loads(authors),
+                    "published": published
+                })
+        return papers
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def _read_jsonl(path: str, offset: int) -> Tuple[List[Tuple[int, Dict]], int]:
+    """Read complete JSON lines appended after offset.
+
+    Returns (line offset, record) pairs and the new offset.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records, offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            line = f.readline()
+            # A line without a newline is still being written by another worker
+            if not line.endswith(b"\n"):
+                break
+            records.append((offset, json.loads(line)))
+            offset = f.tell()
+    return records, offset
+
+
+def _encode_jsonl(records: Iterable[Dict]) -> List[bytes]:
+    return [(json.dumps(record) + "\n").encode("utf-8") for record in records]
+
+
+def _append_jsonl(path: str, lines: List[bytes]) -> int:
+    """Durably append encoded JSON lines. Returns the file size afterwards"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "ab") as f:
+        for line in lines:
+            f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def normalize_source(path: str) -> str:
+    """Key identifying a document by its path, so differently spelled paths to one file agree"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def chunk_key(chunk_id: str) -> int:
+    """64-bit integer key of a chunk id, used in place of the id string in memory"""
+    return int.from_bytes(hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class _Interned:
+    """Table of distinct strings (sources, titles) referenced by small integer ids"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+
+class _RowView(Sequence):
+    """Read-only list-like view building one dict per accessed row"""
+
+    def __init__(self, store: "ChunkStore", build):
+        self._store = store
+        self._build = build
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self._build(i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self._build(row)
+
+
+class ChunkStore:
+    """Append-only store of PDF chunks and their metadata, one JSON record per line.
+
+    Row ``i`` of the store corresponds to row ``i`` of the FAISS index, so the
+    file is only ever appended to and can be tailed by other workers.
+
+    In memory the store is columnar: typed arrays hold each row's line offset in the
+    memory-mapped file, 64-bit chunk key, interned source and title ids, chunk index
+    and page range, so a row costs a few dozen bytes plus its id lookup entry. The
+    chunk text stays in the file and is decoded only when a row is read (``get``).
+
+    Chunk ids are content hashes, so a chunk is stored (and embedded) once. A sibling
+    ``files.jsonl`` records, per document source path, the hash of the last ingested
+    file and the ids of its chunks; rows no longer referenced by any document are
+    tombstoned and skipped by search. Documents are told apart by path, not title,
+    so an upload named like a sample PDF does not replace it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files_path = os.path.join(os.path.dirname(path), "files.jsonl")
+        self._line_offsets = array("Q")
+        self._keys = array("q")
+        self._source_ids = array("I")
+        self._title_ids = array("I")
+        self._chunk_indexes = array("I")
+        self._page_starts = array("i")  # -1 when unknown
+        self._page_ends = array("i")
+        self._sources = _Interned()
+        self._titles = _Interned()
+        self._key_rows: Dict[int, int] = {}
+        self.files: Dict[str, Dict] = {}
+        self.file_hashes: Dict[str, str] = {}
+        self._refs: Dict[int, int] = {}
+        self._offset = 0
+        self._files_offset = 0
+        self._map: Optional[mmap.mmap] = None
+        self._map_lock = threading.Lock()
+        # Serializes reading new records, appending and truncating, so concurrent
+        # refreshes never add the same rows twice
+        self._lock = threading.RLock()
+        self.generation = 0  # bumped whenever rows are truncated, so row-aligned indexes rebuild
+        self.documents = _RowView(self, self._document)
+        self.doc_metadata = _RowView(self, self._metadata)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._line_offsets)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return self.row_of(chunk_id) is not None
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """Read positions in the chunk and document files; grows with every change"""
+        return self._offset, self._files_offset
+
+    @property
+    def sources(self) -> List[str]:
+        return self._sources.values
+
+    def refresh(self):
+        """Read any records appended since the last refresh"""
+        with self._lock:
+            records, self._offset = _read_jsonl(self.path, self._offset)
+            for line_offset, record in records:
+                self._add_record(line_offset, record)
+            file_events, self._files_offset = _read_jsonl(self.files_path, self._files_offset)
+            for _, event in file_events:
+                self._apply_file_event(event)
+
+    def append(self, records: List[Dict]):
+        """Persist records and add them to the in-memory view"""
+        lines = _encode_jsonl(records)
+        with self._lock:
+            # Pick up records other workers appended so row numbers stay aligned
+            self.refresh()
+            self._offset = _append_jsonl(self.path, lines)
+            line_offset = self._offset - sum(len(line) for line in lines)
+            for line, record in zip(lines, records):
+                self._add_record(line_offset, record)
+                line_offset += len(line)
+
+    def get(self, row: int) -> Dict:
+        """The full record of a row, read from the memory-mapped file"""
+        start = self._line_offsets[row]
+        end = self._line_offsets[row + 1] if row + 1 < len(self) else self._offset
+        with self._map_lock:
+            if self._map is None or len(self._map) < end:
+                self._remap()
+            line = self._map[start:end]
+        return json.loads(line)
+
+    def row_of(self, chunk_id: str) -> Optional[int]:
+        """Row of the first copy of a chunk, or None if it is not stored"""
+        row = self._key_rows.get(chunk_key(chunk_id))
+        # Keys are 64-bit hashes; confirm against the stored id on the rare collision
+        if row is None or self.get(row)["id"] != chunk_id:
+            return None
+        return row
+
+    def fingerprint(self, rows: int) -> Optional[str]:
+        """Identifies the first ``rows`` rows, so indexes derived from them can be checked on load"""
+        with self._lock:
+            if rows > len(self):
+                return None
+            if rows == 0:
+                return "0"
+            return f"{rows}:{self._line_offsets[rows - 1]}:{self._keys[rows - 1]}"
+
+    def set_file(self, source: str, file_hash: str, chunk_ids: List[str], title: Optional[str] = None):
+        """Record the current version of the document at source; chunks it no longer uses become dead"""
+        event = {"source": normalize_source(source), "title": title or os.path.basename(source),
+                 "file_hash": file_hash, "chunk_ids": chunk_ids}
+        with self._lock:
+            self.refresh()
+            self._files_offset = _append_jsonl(self.files_path, _encode_jsonl([event]))
+            self._apply_file_event(event)
+
+    def find_file_hash(self, file_hash: str) -> Optional[str]:
+        """Return the source of the document currently indexed with this content hash"""
+        return self.file_hashes.get(file_hash)
+
+    def is_live(self, row: int) -> bool:
+        """Whether a row is still part of some document's current version"""
+        key = self._keys[row]
+        if key in self._refs:
+            return self._refs[key] > 0
+        # Rows written before documents were tracked stay live until their document is re-ingested
+        source = normalize_source(self._sources.values[self._source_ids[row]])
+        return source not in self.files and self._titles.values[self._title_ids[row]] not in self.files
+
+    def truncate(self, rows: int):
+        """Drop rows beyond ``rows`` left behind by a writer that died before saving its index"""
+        with self._lock:
+            if rows >= len(self):
+                return
+            offset = self._line_offsets[rows]
+            with self._map_lock:
+                # Release the mapping before shrinking the file under it
+                self._close_map()
+                with open(self.path, "r+b") as f:
+                    f.truncate(offset)
+            self._offset = offset
+            for key in self._keys[rows:]:
+                if self._key_rows.get(key, -1) >= rows:
+                    del self._key_rows[key]
+            for column in (self._line_offsets, self._keys, self._source_ids, self._title_ids,
+                           self._chunk_indexes, self._page_starts, self._page_ends):
+                del column[rows:]
+            self.generation += 1
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held per store: the row columns plus the chunk key lookup"""
+        columns = sum(column.itemsize * len(column) for column in (
+            self._line_offsets, self._keys, self._source_ids, self._title_ids,
+            self._chunk_indexes, self._page_starts, self._page_ends))
+        # One dict slot plus two boxed ints per distinct chunk
+        return columns + len(self._key_rows) * (32 + 32 + 28)
+
+    def _remap(self):
+        self._close_map()
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _document(self, row: int) -> Dict:
+        record = self.get(row)
+        return {"id": record["id"], "content": record["content"], "source": record["source"]}
+
+    def _metadata(self, row: int) -> Dict:
+        return {
+            "id": self.get(row)["id"],
+            "title": self._titles.values[self._title_ids[row]],
+            "chunk_index": self._chunk_indexes[row],
+            "page_start": self._page_starts[row] if self._page_starts[row] >= 0 else None,
+            "page_end": self._page_ends[row] if self._page_ends[row] >= 0 else None
+        }
+
+    def _add_record(self, line_offset: int, record: Dict):
+        key = chunk_key(record["id"])
+        self._key_rows.setdefault(key, len(self))
+        self._line_offsets.append(line_offset)
+        self._keys.append(key)
+        self._source_ids.append(self._sources.intern(record["source"]))
+        self._title_ids.append(self._titles.intern(record["title"]))
+        self._chunk_indexes.append(record["chunk_index"])
+        page_start, page_end = record.get("page_start"), record.get("page_end")
+        self._page_starts.append(page_start if page_start is not None else -1)
+        self._page_ends.append(page_end if page_end is not None else -1)
+
+    def _apply_file_event(self, event: Dict):
+        # Only the chunk keys are kept, not the id strings
+        keys = array("q", (chunk_key(chunk_id) for chunk_id in event["chunk_ids"]))
+        # Events written before documents were keyed by path only have a title
+        document = event.get("source", event["title"])
+        replaced = [document]
+        legacy = self.files.get(event["title"])
+        if "source" in event and legacy is not None and legacy.get("source") is None:
+            # The first path-keyed version of a title-keyed document takes over from it
+            replaced.append(event["title"])
+        for name in replaced:
+            previous = self.files.pop(name, None)
+            if previous is None:
+                continue
+            self.file_hashes.pop(previous["file_hash"], None)
+            for key in previous["chunk_keys"]:
+                self._refs[key] -= 1
+        for key in keys:
+            self._refs[key] = self._refs.get(key, 0) + 1
+        self.files[document] = {"source": event.get("source"), "title": event["title"],
+                                "file_hash": event["file_hash"], "chunk_keys": keys}
+        self.file_hashes[event["file_hash"]] = document
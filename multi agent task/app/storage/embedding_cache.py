@@ -0,0 +1,118 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from app.services.metrics import stage
+
+
+class EmbeddingCache:
+    """Bounded cache in front of ``SentenceTransformer.encode``.
+
+    Entries are keyed by model name plus a hash of the whitespace-normalized text and
+    kept in an in-memory LRU. When ``db_path`` is set, vectors are also written to a
+    SQLite file that survives restarts and is shared by every worker on the host.
+    """
+
+    def __init__(self, model, model_name: str, max_entries: int = 50000, db_path: Optional[str] = None):
+        self.model = model
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._db.commit()
+
+    def key(self, text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def encode(self, texts: List[str], model=None) -> np.ndarray:
+        """Return float32 embeddings for texts, only running the model on cache misses
+
+        ``model`` overrides the encoder used for misses (e.g. one backed by a process pool).
+        """
+        keys = [self.key(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in set(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+        memory_keys = set(found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self._db is not None:
+            for key, vector in self._read_disk(missing).items():
+                found[key] = vector
+                self._remember(key, vector)
+        disk_keys = set(found) - memory_keys
+
+        to_encode = {key: text for key, text in zip(keys, texts) if key not in found}
+        if to_encode:
+            with stage("model_encode"):
+                vectors = np.asarray((model or self.model).encode(list(to_encode.values())), dtype="float32")
+            computed = dict(zip(to_encode.keys(), vectors))
+            for key, vector in computed.items():
+                found[key] = vector
+                self._remember(key, vector)
+            if self._db is not None:
+                self._write_disk(computed)
+
+        with self._lock:
+            self.hits += sum(1 for key in keys if key in memory_keys)
+            self.disk_hits += sum(1 for key in keys if key in disk_keys)
+            self.misses += sum(1 for key in keys if key in to_encode)
+
+        if not keys:
+            return np.zeros((0, 0), dtype="float32")
+        return np.stack([found[key] for key in keys])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._memory)
+        }
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        result = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    result[key] = np.frombuffer(blob, dtype="float32")
+        return result
+
+    def _write_disk(self, vectors: Dict[str, np.ndarray]):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.ascontiguousarray(vector, dtype="float32").tobytes()) for key, vector in vectors.items()]
+            )
+            self._db.commit()
@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import threading
+from typing import Optional
+from app.models.job import JobStatus
+
+
+class JobStore:
+    """Ingestion job statuses in a SQLite file shared by every worker on the host.
+
+    A job runs in the worker that accepted its upload, but ``/jobs/{id}`` may be polled
+    on any worker, so each status change is written here. Finished jobs beyond
+    ``history`` are purged, oldest first.
+    """
+
+    def __init__(self, path: str, history: int = 1000):
+        self.path = path
+        self.history = history
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, status TEXT, submitted_at TEXT, data TEXT)"
+        )
+        self._db.commit()
+
+    def put(self, job: JobStatus):
+        """Insert or update a job"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, submitted_at, data) VALUES (?, ?, ?, ?)",
+                (job.job_id, job.status, job.submitted_at.isoformat(), job.model_dump_json())
+            )
+            if job.status not in ("queued", "running"):
+                self._purge()
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return JobStatus.model_validate_json(row[0]) if row is not None else None
+
+    def _purge(self):
+        self._db.execute(
+            "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND job_id NOT IN "
+            "(SELECT job_id FROM jobs WHERE status NOT IN ('queued', 'running') "
+            "ORDER BY submitted_at DESC LIMIT ?)", (self.history,)
+        )
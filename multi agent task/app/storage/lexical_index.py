@@ -0,0 +1,159 @@
+import math
+import os
+import re
+import threading
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.lower() for token in _TOKEN.findall(text)]
+
+
+class LexicalIndex:
+    """In-memory BM25 index over the chunk store, kept in step with it row by row.
+
+    Row ``i`` is chunk store row ``i`` (and FAISS row ``i``). Each term's postings
+    are two typed arrays, row ids (uint32) and term frequencies (uint16), so memory
+    stays close to 6 bytes per posting however large the store grows. ``sync`` indexes
+    the rows appended since the last call, so keeping up is proportional to the new
+    chunks only.
+
+    ``save`` writes the postings to disk with a fingerprint of the rows they cover, and
+    ``load`` restores them when the chunk store still starts with those rows, so a
+    restart only tokenizes the chunks added since the last save.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self._rows: List[array] = []
+        self._freqs: List[array] = []
+        self._lengths = array("I")
+        self._total_length = 0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def sync(self, documents: Sequence[Dict], generation: int = 0):
+        """Index documents[len(self):]; a changed generation (rows were truncated) rebuilds"""
+        with self._lock:
+            if generation != self._generation or len(documents) < len(self._lengths):
+                self._reset()
+                self._generation = generation
+            for row in range(len(self._lengths), len(documents)):
+                self._add(row, documents[row]["content"])
+
+    def save(self, path: str, fingerprint: str):
+        """Atomically write the postings; fingerprint identifies the chunk rows they cover"""
+        with self._lock:
+            terms = sorted(self.vocabulary, key=self.vocabulary.get)
+            offsets = np.cumsum([0] + [len(rows) for rows in self._rows], dtype=np.int64)
+            arrays = {
+                "terms": np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+                "offsets": offsets,
+                "rows": np.frombuffer(b"".join(rows.tobytes() for rows in self._rows), dtype=np.uint32),
+                "freqs": np.frombuffer(b"".join(freqs.tobytes() for freqs in self._freqs), dtype=np.uint16),
+                "lengths": np.frombuffer(self._lengths.tobytes(), dtype=np.uint32),
+                "fingerprint": np.frombuffer(fingerprint.encode("utf-8"), dtype=np.uint8),
+            }
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str, fingerprint_of: Callable[[int], Optional[str]], generation: int = 0) -> bool:
+        """Restore postings saved by ``save`` if fingerprint_of(rows) still matches.
+
+        Returns False (leaving the index empty) when there is no usable snapshot.
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as saved:
+                lengths = saved["lengths"]
+                if fingerprint_of(len(lengths)) != saved["fingerprint"].tobytes().decode("utf-8"):
+                    return False
+                terms = saved["terms"].tobytes().decode("utf-8").split("\n") if len(saved["terms"]) else []
+                offsets, rows, freqs = saved["offsets"], saved["rows"], saved["freqs"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable lexical index {path}: {e}")
+            return False
+        with self._lock:
+            self._reset()
+            self.vocabulary = {term: number for number, term in enumerate(terms)}
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                self._rows.append(array("I", rows[start:end].tobytes()))
+                self._freqs.append(array("H", freqs[start:end].tobytes()))
+            self._lengths = array("I", lengths.tobytes())
+            self._total_length = int(lengths.sum())
+            self._generation = generation
+        return True
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Return up to k (row, BM25 score) pairs, best first"""
+        tokens = dict.fromkeys(tokenize(query))
+        with self._lock:
+            terms = [self.vocabulary[term] for term in tokens if term in self.vocabulary]
+            total = len(self._lengths)
+            if not terms or total == 0:
+                return []
+            average_length = self._total_length / total
+            # Only the query terms' postings (and their rows' lengths) are read, so the
+            # cost follows the matches rather than the corpus. The np.frombuffer views
+            # must not outlive the lock: sync() cannot grow an array with a view exported
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+            matched_rows, matched_scores = [], []
+            for term in terms:
+                rows = np.frombuffer(self._rows[term], dtype=np.uint32)
+                freqs = np.frombuffer(self._freqs[term], dtype=np.uint16).astype(np.float32)
+                idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[rows] / average_length)
+                matched_rows.append(rows.astype(np.int64))
+                matched_scores.append(idf * freqs * (self.k1 + 1) / (freqs + norm))
+            del lengths, rows
+        # Sum each row's contributions over the query terms
+        matched, inverse = np.unique(np.concatenate(matched_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+        best = np.arange(len(matched))
+        if len(best) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(matched[i]), float(scores[i])) for i in best]
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the postings and document lengths (excluding the vocabulary dict)"""
+        postings = sum(rows.itemsize * len(rows) + freqs.itemsize * len(freqs)
+                       for rows, freqs in zip(self._rows, self._freqs))
+        return postings + self._lengths.itemsize * len(self._lengths)
+
+    def _reset(self):
+        self.vocabulary = {}
+        self._rows = []
+        self._freqs = []
+        self._lengths = array("I")
+        self._total_length = 0
+
+    def _add(self, row: int, text: str):
+        # Converting the row first raises OverflowError before any posting is touched
+        row_id = array("I", [row])
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            term = self.vocabulary.get(token)
+            if term is None:
+                term = self.vocabulary[token] = len(self._rows)
+                self._rows.append(array("I"))
+                self._freqs.append(array("H"))
+            self._rows[term].extend(row_id)
+            self._freqs[term].append(min(count, 65535))
+        self._lengths.append(len(tokens))
+        self._total_length += len(tokens)
@@ -0,0 +1,316 @@
+import atexit
+import glob
+from array import array
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.models.log import LogEntry
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None  # type: ignore
+
+_STOP = object()
+
+
+def entry_to_line(entry: LogEntry) -> str:
+    log_dict = entry.dict()
+    # Convert datetime to string for JSON serialization
+    log_dict["timestamp"] = log_dict["timestamp"].isoformat()
+    return json.dumps(log_dict) + "\n"
+
+
+def entry_from_dict(log_data: dict) -> LogEntry:
+    # Convert timestamp string to datetime object
+    log_data["timestamp"] = datetime.fromisoformat(log_data["timestamp"])
+    return LogEntry(**log_data)
+
+
+class LogStore:
+    """Append-only JSONL store for LogEntry records.
+
+    Entries are queued and written by a background thread, so callers never wait on
+    disk. The active segment ``<name>.jsonl`` is rotated to ``<name>.<closed-at>.jsonl``
+    once it grows past ``max_bytes`` or gets older than ``max_age`` seconds; because a
+    rotated segment's name records when it was closed, readers can skip whole
+    segments that are older than the range they need.
+
+    ``query`` is served from a compact in-memory index (one timestamp, file offset,
+    segment id and agent bitmask per entry, held in arrays) that is extended by
+    tailing the segment files, so a page of results only reads its own lines from
+    disk. Index positions are the same in every worker, which makes them usable as
+    pagination cursors.
+    """
+
+    def __init__(self, directory: str, name: str = "system_logs", max_bytes: int = 50 * 1024 * 1024,
+                 max_age: float = 24 * 3600, legacy_path: Optional[str] = None,
+                 index_since: Optional[datetime] = None):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.legacy_path = legacy_path
+        self.active_path = os.path.join(directory, f"{name}.jsonl")
+        self.lock_path = os.path.join(directory, f".{name}.lock")
+        self.index_since = index_since
+        self._index_lock = threading.Lock()
+        self._timestamps = array("d")
+        self._offsets = array("q")
+        self._segment_of = array("I")
+        self._agent_masks = array("Q")
+        self._agent_bits: Dict[str, int] = {}
+        self._segment_paths: List[str] = []
+        self._segment_ids: Dict[int, int] = {}  # inode -> segment id; survives rotation renames
+        self._scanned: List[int] = []
+        self._legacy_entries: List[LogEntry] = []
+        self._legacy_loaded = False
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def append(self, entry: LogEntry):
+        """Queue an entry for writing; returns immediately"""
+        self._queue.put(entry)
+
+    def flush(self):
+        """Block until every queued entry has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write out pending entries and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def segments(self) -> List[str]:
+        """Segment files from oldest to newest, ending with the active one"""
+        pattern = os.path.join(self.directory, f"{self.name}.*.jsonl")
+        paths = sorted(glob.glob(pattern))
+        if os.path.exists(self.active_path):
+            paths.append(self.active_path)
+        return paths
+
+    def segment_closed_at(self, path: str) -> Optional[datetime]:
+        """When a rotated segment was closed (None for the active segment)"""
+        if path == self.active_path:
+            return None
+        stamp = os.path.basename(path)[len(self.name) + 1:-len(".jsonl")]
+        return datetime.strptime(stamp, "%Y%m%dT%H%M%S%f")
+
+    def iter_entries(self, since: Optional[datetime] = None) -> Iterator[LogEntry]:
+        """Stream entries oldest first, skipping segments closed before ``since``"""
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            # Logs written before the JSONL store are a single JSON array
+            with open(self.legacy_path, "r") as f:
+                for log_data in json.load(f):
+                    entry = entry_from_dict(log_data)
+                    if since is None or entry.timestamp >= since:
+                        yield entry
+        for path in self.segments():
+            closed_at = self.segment_closed_at(path)
+            if since is not None and closed_at is not None and closed_at < since:
+                continue
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partially written line
+                    entry = entry_from_dict(json.loads(line))
+                    if since is None or entry.timestamp >= since:
+                        yield entry
+
+    def query(self, limit: Optional[int] = 100, cursor: Optional[int] = None, order: str = "desc",
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              agent: Optional[str] = None, text: Optional[str] = None) -> Tuple[List[LogEntry], Optional[int]]:
+        """Return one page of matching entries and the cursor of the next page (None on the last page)"""
+        entries = []
+        next_cursor = None
+        last_position = cursor
+        for position, entry in self.iter_query(cursor, order, since, until, agent, text):
+            if limit is not None and len(entries) == limit:
+                next_cursor = last_position
+                break
+            entries.append(entry)
+            last_position = position
+        return entries, next_cursor
+
+    def iter_query(self, cursor: Optional[int] = None, order: str = "desc", since: Optional[datetime] = None,
+                   until: Optional[datetime] = None, agent: Optional[str] = None,
+                   text: Optional[str] = None) -> Iterator[Tuple[int, LogEntry]]:
+        """Stream (cursor, entry) pairs after ``cursor`` in the given order that match every filter.
+
+        Time range and agent are checked against the index; only candidates are read from
+        disk, and the substring filter is applied to them.
+        """
+        self._refresh_index()
+        total = len(self._timestamps)
+        if order == "desc":
+            start = total - 1 if cursor is None else min(cursor, total) - 1
+            positions = range(start, -1, -1)
+        else:
+            start = 0 if cursor is None else cursor + 1
+            positions = range(start, total)
+
+        since_ts = since.timestamp() if since is not None else None
+        until_ts = until.timestamp() if until is not None else None
+        agent_mask = self._agent_bits.get(agent, 0) if agent is not None else None
+        if agent_mask == 0:
+            return
+        needle = text.lower() if text else None
+
+        files: Dict[int, object] = {}
+        try:
+            for position in positions:
+                timestamp = self._timestamps[position]
+                if since_ts is not None and timestamp < since_ts:
+                    continue
+                if until_ts is not None and timestamp > until_ts:
+                    continue
+                if agent_mask is not None and not self._agent_masks[position] & agent_mask:
+                    continue
+                entry = self._read_entry(position, files)
+                if entry is None:
+                    continue
+                if needle is not None and needle not in entry.input.lower():
+                    continue
+                yield position, entry
+        finally:
+            for f in files.values():
+                f.close()
+
+    def _read_entry(self, position: int, files: Dict[int, object]) -> Optional[LogEntry]:
+        segment = self._segment_of[position]
+        if segment == 0:
+            return self._legacy_entries[self._offsets[position]]
+        f = files.get(segment)
+        if f is None:
+            try:
+                f = files[segment] = open(self._segment_paths[segment], "rb")
+            except OSError:
+                return None  # segment removed by retention
+        f.seek(self._offsets[position])
+        return entry_from_dict(json.loads(f.readline()))
+
+    def _refresh_index(self):
+        """Index entries written (by any worker) since the last refresh"""
+        with self._index_lock:
+            if not self._legacy_loaded:
+                self._legacy_loaded = True
+                self._segment_paths.append(self.legacy_path or "")
+                self._scanned.append(0)
+                if self.legacy_path and os.path.exists(self.legacy_path):
+                    with open(self.legacy_path, "r") as f:
+                        for log_data in json.load(f):
+                            entry = entry_from_dict(log_data)
+                            self._index_entry(0, len(self._legacy_entries), entry.timestamp.timestamp(),
+                                              entry.agents_called)
+                            self._legacy_entries.append(entry)
+
+            for path in self.segments():
+                closed_at = self.segment_closed_at(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # rotated away while listing
+                segment = self._segment_ids.get(stat.st_ino)
+                if segment is None:
+                    if self.index_since is not None and closed_at is not None and closed_at < self.index_since:
+                        continue
+                    segment = len(self._segment_paths)
+                    self._segment_ids[stat.st_ino] = segment
+                    self._segment_paths.append(path)
+                    self._scanned.append(0)
+                self._segment_paths[segment] = path
+                if stat.st_size > self._scanned[segment]:
+                    self._scan_segment(segment)
+
+    def _scan_segment(self, segment: int):
+        with open(self._segment_paths[segment], "rb") as f:
+            f.seek(self._scanned[segment])
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # partially written line
+                log_data = json.loads(line)
+                timestamp = datetime.fromisoformat(log_data["timestamp"]).timestamp()
+                self._index_entry(segment, offset, timestamp, log_data["agents_called"])
+                self._scanned[segment] = f.tell()
+
+    def _index_entry(self, segment: int, offset: int, timestamp: float, agents: List[str]):
+        mask = 0
+        for agent in agents:
+            bit = self._agent_bits.get(agent)
+            if bit is None:
+                bit = self._agent_bits[agent] = 1 << min(len(self._agent_bits), 63)
+            mask |= bit
+        self._timestamps.append(timestamp)
+        self._offsets.append(offset)
+        self._segment_of.append(segment)
+        self._agent_masks.append(mask)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Write whatever else is already queued in the same call
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [entry for entry in batch if entry is not _STOP]
+            try:
+                if entries:
+                    self._write(entries)
+            except Exception as e:
+                print(f"Error saving logs: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(entries) != len(batch):
+                return
+
+    def _write(self, entries: List[LogEntry]):
+        data = "".join(entry_to_line(entry) for entry in entries).encode("utf-8")
+        with self._file_lock():
+            self._rotate_if_needed()
+            with open(self.active_path, "ab") as f:
+                f.write(data)
+
+    def _rotate_if_needed(self):
+        if not os.path.exists(self.active_path):
+            return
+        stat = os.stat(self.active_path)
+        too_big = stat.st_size >= self.max_bytes
+        # st_ctime changes on writes, so age is taken from the first entry
+        too_old = self.max_age and time.time() - self._first_entry_time() >= self.max_age
+        if too_big or too_old:
+            stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+            os.replace(self.active_path, os.path.join(self.directory, f"{self.name}.{stamp}.jsonl"))
+
+    def _first_entry_time(self) -> float:
+        with open(self.active_path, "rb") as f:
+            line = f.readline()
+        if not line.endswith(b"\n"):
+            return time.time()
+        return datetime.fromisoformat(json.loads(line)["timestamp"]).timestamp()
+
+    @contextmanager
+    def _file_lock(self):
+        # Several uvicorn workers append to the same active segment
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,104 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class MemoryTTLStore:
+    """In-process key/value store with per-entry expiry and LRU eviction"""
+
+    blocking = False  # safe to call on the event loop
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTTLStore:
+    """Key/value store with per-entry expiry in a SQLite file shared by every worker on the host.
+
+    Values must be JSON-serializable. Expired rows are skipped on read and purged
+    periodically on write.
+    """
+
+    blocking = True  # disk I/O; async callers run it in a thread
+
+    def __init__(self, path: str, max_entries: int = 1000, purge_every: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS ttl_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM ttl_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO ttl_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl)
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge(now)
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM ttl_cache WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+    def _purge(self, now: float):
+        self._db.execute("DELETE FROM ttl_cache WHERE expires_at <= ?", (now,))
+        # Keep the entries that expire last when over the size limit
+        self._db.execute(
+            "DELETE FROM ttl_cache WHERE key NOT IN "
+            "(SELECT key FROM ttl_cache ORDER BY expires_at DESC LIMIT ?)", (self.max_entries,)
+        )
+
+
+def make_ttl_store(backend: str, max_entries: int = 1000, db_path: Optional[str] = None):
+    """Create the TTL store named by a setting value: "memory" or "sqlite" """
+    if backend == "memory":
+        return MemoryTTLStore(max_entries)
+    if backend == "sqlite":
+        if not db_path:
+            raise ValueError("The sqlite cache backend needs a database path")
+        return SQLiteTTLStore(db_path, max_entries)
+    raise ValueError(f"Unknown cache backend '{backend}', expected 'memory' or 'sqlite'")
@@ -0,0 +1,561 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+import faiss
+import numpy as np
+from app.config.settings import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None  # type: ignore
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+METRICS = ("l2", "ip")
+# Side-store encodings of the raw vectors: file suffix and numpy dtype
+VECTOR_STORAGES = {"float32": ("f32", "float32"), "float16": ("f16", "float16"), "int8": ("i8", "int8")}
+
+
+def index_type_of(index) -> str:
+    """Return the INDEX_TYPES name of a FAISS index"""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def metric_of(index) -> str:
+    """Return the METRICS name of a FAISS index"""
+    return "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+
+def build_index(index_type: str, dimension: int, num_vectors: int, metric: str = "l2"):
+    """Create an empty (untrained) index of the given type sized for num_vectors"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dimension) if metric == "ip" else faiss.IndexFlatL2(dimension)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, settings.HNSW_M, faiss_metric)
+        index.hnsw.efConstruction = settings.HNSW_EF_CONSTRUCTION
+        return index
+
+    # Rule of thumb: ~4*sqrt(n) lists, with at least 39 training points per list
+    nlist = settings.IVF_NLIST or int(4 * math.sqrt(num_vectors))
+    nlist = max(1, min(nlist, num_vectors // 39))
+    quantizer = faiss.IndexFlatIP(dimension) if metric == "ip" else faiss.IndexFlatL2(dimension)
+    if index_type == "ivf_flat":
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss_metric)
+    return faiss.IndexIVFPQ(quantizer, dimension, nlist, settings.PQ_M, settings.PQ_NBITS, faiss_metric)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows are left as they are)"""
+    vectors = np.array(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class VectorFile:
+    """Raw vectors appended row by row to a flat file.
+
+    float32 is lossless, float16 halves the size, and int8 quarters it using a
+    float32 scale per row (kept in a sibling ``.scale`` file). Rows are read back as
+    float32 for training, re-ranking and ground truth.
+    """
+
+    def __init__(self, directory: str, dimension: int, storage: str):
+        if storage not in VECTOR_STORAGES:
+            raise ValueError(f"Unknown vector storage '{storage}', expected one of {tuple(VECTOR_STORAGES)}")
+        suffix, dtype = VECTOR_STORAGES[storage]
+        self.storage = storage
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.path = os.path.join(directory, f"vectors.{suffix}")
+        self.scale_path = f"{self.path}.scale" if storage == "int8" else None
+
+    @property
+    def bytes_per_row(self) -> int:
+        return self.dtype.itemsize * self.dimension + (4 if self.scale_path else 0)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def rows(self) -> int:
+        if not self.exists():
+            return 0
+        rows = os.path.getsize(self.path) // (self.dtype.itemsize * self.dimension)
+        if self.scale_path:
+            scales = os.path.getsize(self.scale_path) // 4 if os.path.exists(self.scale_path) else 0
+            rows = min(rows, scales)
+        return rows
+
+    def append(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.scale_path:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            encoded = np.round(vectors / scales[:, None]).astype("int8")
+            with open(self.scale_path, "ab") as f:
+                f.write(scales.astype("float32").tobytes())
+        else:
+            encoded = vectors.astype(self.dtype)
+        with open(self.path, "ab") as f:
+            f.write(encoded.tobytes())
+
+    def truncate(self, rows: int):
+        if self.exists():
+            with open(self.path, "r+b") as f:
+                f.truncate(rows * self.dtype.itemsize * self.dimension)
+        if self.scale_path and os.path.exists(self.scale_path):
+            with open(self.scale_path, "r+b") as f:
+                f.truncate(rows * 4)
+
+    def _maps(self, rows: int):
+        data = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(rows, self.dimension))
+        scales = np.memmap(self.scale_path, dtype="float32", mode="r", shape=(rows,)) if self.scale_path else None
+        return data, scales
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Rows [start, stop) as float32 (a memory-mapped view for float32 storage)"""
+        if stop <= start:
+            return np.zeros((0, self.dimension), dtype="float32")
+        data, scales = self._maps(stop)
+        if self.storage == "float32":
+            return data[start:stop]
+        block = data[start:stop].astype("float32")
+        if scales is not None:
+            block *= scales[start:stop, None]
+        return block
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """Selected rows as float32"""
+        rows = np.asarray(rows, dtype="int64")
+        if len(rows) == 0:
+            return np.zeros((0, self.dimension), dtype="float32")
+        data, scales = self._maps(int(rows.max()) + 1)
+        block = np.asarray(data[rows], dtype="float32")
+        if scales is not None:
+            block *= np.asarray(scales[rows])[:, None]
+        return block
+
+
+class ReadWriteLock:
+    """Any number of readers or a single writer; a waiting writer holds off new readers"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class VectorStore:
+    """FAISS index persisted on disk and opened memory-mapped.
+
+    Workers open the saved index with ``IO_FLAG_MMAP_IFC``, which maps the vectors,
+    codes and graph in place, so the index pages are shared through the OS page cache
+    rather than copied into each worker; faiss releases without that flag (such as the
+    pinned 1.8.0) fall back to ``IO_FLAG_MMAP``. The first write in a process switches to a
+    private in-memory copy, and ``save`` swaps the new file in atomically so readers
+    never see a partially written index.
+
+    The raw vectors are also appended to a side store (``vectors.f32``/``.f16``/``.i8``,
+    see ``VectorFile``); they are the training data for ANN indexes, the source for
+    exact re-ranking of ANN candidates, and the ground truth for ``recall_report``.
+
+    With the "ip" metric vectors are normalized, so inner product is cosine similarity.
+    Search always reports squared L2 distances (2 - 2 * cosine for "ip"), so callers
+    see the same ordering and scale whichever metric the index uses.
+
+    FAISS indexes are not safe to search while vectors are added to them, so searches
+    hold ``index_lock`` for reading and in-place additions hold it for writing.
+    """
+
+    def __init__(self, dimension: int, directory: str, index_type: Optional[str] = None,
+                 migration_threshold: Optional[int] = None, metric: Optional[str] = None,
+                 storage: Optional[str] = None):
+        self.dimension = dimension
+        self.directory = directory
+        self.index_type = index_type or settings.INDEX_TYPE
+        self.migration_threshold = (migration_threshold if migration_threshold is not None
+                                    else settings.ANN_MIGRATION_THRESHOLD)
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}', expected one of {INDEX_TYPES}")
+        self.metric = metric or settings.VECTOR_METRIC
+        if self.metric not in METRICS:
+            raise ValueError(f"Unknown metric '{self.metric}', expected one of {METRICS}")
+        self.storage = storage or settings.VECTOR_STORAGE
+        self.index_path = os.path.join(directory, "index.faiss")
+        self.lock_path = os.path.join(directory, ".lock")
+        self.vector_file = self._open_vector_file()
+        self._thread_lock = threading.RLock()
+        self.index_lock = ReadWriteLock()
+        self._mmapped = False
+        self._signature = None
+        self._saved_rows = 0
+        self.index = self._open()
+        if self.index.ntotal and metric_of(self.index) != self.metric:
+            # Switching metric needs a rebuild; keep serving the saved index until migrate()
+            print(f"Vector index in {directory} uses the {metric_of(self.index)} metric, not "
+                  f"{self.metric}; call migrate() to switch")
+            self.metric = metric_of(self.index)
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def unsaved_rows(self) -> int:
+        """Rows added since the index was last saved or loaded"""
+        return self.ntotal - self._saved_rows
+
+    @property
+    def version(self):
+        """Identifies the saved index this store has loaded (None before the first save)"""
+        return self._signature
+
+    @property
+    def current_type(self) -> str:
+        return index_type_of(self.index)
+
+    @property
+    def vectors_path(self) -> str:
+        return self.vector_file.path
+
+    def _open_vector_file(self) -> VectorFile:
+        # An existing side store keeps its encoding until migrate() converts it
+        configured = VectorFile(self.directory, self.dimension, self.storage)
+        if configured.exists():
+            return configured
+        for storage in VECTOR_STORAGES:
+            existing = VectorFile(self.directory, self.dimension, storage)
+            if existing.exists():
+                return existing
+        return configured
+
+    def _open(self):
+        if os.path.exists(self.index_path):
+            self._signature = self._file_signature()
+            self._mmapped = True
+            # IO_FLAG_MMAP_IFC only exists in faiss releases newer than the pinned 1.8.0
+            mmap_in_place = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+            index = None
+            if mmap_in_place is not None:
+                try:
+                    index = faiss.read_index(self.index_path, mmap_in_place | faiss.IO_FLAG_READ_ONLY)
+                except RuntimeError as e:
+                    # Index types without in-place mapping support; only their inverted lists are mapped
+                    print(f"Could not map {self.index_path} in place, loading it with IO_FLAG_MMAP: {e}")
+            if index is None:
+                index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        else:
+            self._mmapped = False
+            index = build_index("flat", self.dimension, 0, self.metric)
+        self._saved_rows = index.ntotal
+        return index
+
+    def _file_signature(self):
+        # os.replace gives the saved index a new inode, so this changes on every save
+        stat = os.stat(self.index_path)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def refresh(self) -> bool:
+        """Re-open the index if another worker saved a newer version. Returns True if reloaded"""
+        if not os.path.exists(self.index_path):
+            return False
+        if self._file_signature() == self._signature:
+            return False
+        with self._thread_lock:
+            self.index = self._open()
+            self.metric = metric_of(self.index)
+            if not self.vector_file.exists():
+                self.vector_file = self._open_vector_file()
+        return True
+
+    @contextmanager
+    def write_lock(self):
+        """Serialize writers across threads and worker processes"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._thread_lock:
+            with open(self.lock_path, "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self.refresh()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _make_writable(self):
+        if self._mmapped:
+            # Memory-mapped pages are read-only, so load a private copy before mutating
+            self.index = faiss.read_index(self.index_path)
+            self._mmapped = False
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        return normalize(vectors) if self.metric == "ip" else vectors
+
+    def vectors(self) -> np.ndarray:
+        """Raw vectors of every indexed row as float32 (memory-mapped for float32 storage)"""
+        self._backfill_vectors()
+        return self.vector_file.read(0, self.ntotal)
+
+    def _stored_vector_rows(self) -> int:
+        return self.vector_file.rows()
+
+    def _backfill_vectors(self):
+        # Stores written before the side store existed only have a flat index to recover from
+        if self._stored_vector_rows() == 0 and self.ntotal > 0 and self.current_type == "flat":
+            self.vector_file.append(self.index.reconstruct_n(0, self.ntotal))
+
+    def add(self, embeddings: np.ndarray):
+        """Add embeddings to the index; call within write_lock and follow with save"""
+        embeddings = self._prepare(embeddings)
+        self._backfill_vectors()
+        # Drop vectors left behind by a writer that died before saving its index
+        if self._stored_vector_rows() > self.ntotal:
+            self.vector_file.truncate(self.ntotal)
+        self.vector_file.append(embeddings)
+
+        self._make_writable()
+        if (self.current_type == "flat" and self.index_type != "flat"
+                and self.ntotal + len(embeddings) >= self.migration_threshold):
+            self.index = self._build_from_vectors(self.index_type)
+        else:
+            with self.index_lock.write():
+                self.index.add(embeddings)
+
+    def catch_up(self, rows: int, batch_size: int = 65536) -> int:
+        """Index side-store vectors beyond the loaded index, up to rows; call within write_lock
+
+        Writers save the index only now and then, so the side store can hold vectors
+        (of rows below ``rows`` in the chunk store) that a writer appended without saving
+        yet, or before it died. They are added here rather than dropped, so the next
+        save includes them. Returns the number of index rows afterwards.
+        """
+        self._backfill_vectors()
+        stored = min(self._stored_vector_rows(), rows)
+        if stored > self.ntotal:
+            self._make_writable()
+            for start in range(self.ntotal, stored, batch_size):
+                vectors = self._prepare(self.vector_file.read(start, min(start + batch_size, stored)))
+                with self.index_lock.write():
+                    self.index.add(vectors)
+        return self.ntotal
+
+    def migrate(self, index_type: str, metric: Optional[str] = None):
+        """Rebuild the index as index_type from the stored vectors; call within write_lock
+
+        Also switches to metric (if given) and re-encodes the side store in the
+        configured storage format if it differs.
+        """
+        self._backfill_vectors()
+        if self.vector_file.storage != self.storage:
+            self._convert_vector_file()
+        self.metric = metric or self.metric
+        self.index = self._build_from_vectors(index_type)
+        self._mmapped = False
+        self.index_type = index_type
+
+    def _convert_vector_file(self, batch_size: int = 65536):
+        old = self.vector_file
+        new = VectorFile(self.directory, self.dimension, self.storage)
+        new.truncate(0)
+        total = min(old.rows(), self.ntotal)
+        for start in range(0, total, batch_size):
+            new.append(old.read(start, min(start + batch_size, total)))
+        self.vector_file = new
+        for path in (old.path, old.scale_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def _build_from_vectors(self, index_type: str, batch_size: int = 65536):
+        total = self._stored_vector_rows()
+        index = build_index(index_type, self.dimension, total, self.metric)
+        if not index.is_trained:
+            # Train on a random sample rather than the whole corpus
+            sample_size = min(total, settings.ANN_TRAIN_SAMPLE)
+            sample_rows = np.sort(np.random.default_rng(0).choice(total, sample_size, replace=False))
+            index.train(self._prepare(self.vector_file.take(sample_rows)))
+        for start in range(0, total, batch_size):
+            index.add(self._prepare(self.vector_file.read(start, min(start + batch_size, total))))
+        return index
+
+    def save(self):
+        """Write the index to a temporary file and atomically replace the saved copy"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp.{os.getpid()}"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        self._signature = self._file_signature()
+        self._saved_rows = self.ntotal
+
+    def _search_params(self, index, nprobe: Optional[int], ef_search: Optional[int]):
+        index_type = index_type_of(index)
+        if index_type in ("ivf_flat", "ivf_pq"):
+            return faiss.SearchParametersIVF(nprobe=nprobe or settings.IVF_NPROBE)
+        if index_type == "hnsw":
+            return faiss.SearchParametersHNSW(efSearch=ef_search or settings.HNSW_EF_SEARCH)
+        return None
+
+    def search(self, query_embeddings: np.ndarray, k: int, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None, rerank: Optional[int] = None):
+        """Return (squared L2 distances, indices) for the k nearest neighbours of each query.
+
+        nprobe applies to IVF indexes and ef_search to HNSW; both default to the settings.
+        IVF-PQ indexes only hold compressed codes, so they fetch rerank * k candidates
+        (RERANK_FACTOR by default) and re-rank them exactly against the side store;
+        0 or 1 disables re-ranking.
+        """
+        query_embeddings = self._prepare(query_embeddings)
+        with self.index_lock.read():
+            return self._search_index(self.index, query_embeddings, k, nprobe, ef_search, rerank)
+
+    def _search_index(self, index, query_embeddings: np.ndarray, k: int, nprobe: Optional[int],
+                      ef_search: Optional[int], rerank: Optional[int] = None):
+        rerank = settings.RERANK_FACTOR if rerank is None else rerank
+        exact = rerank > 1 and index_type_of(index) == "ivf_pq" and self._stored_vector_rows() >= index.ntotal
+        fetch = k * rerank if exact else k
+        params = self._search_params(index, nprobe, ef_search)
+        if params is None:
+            distances, indices = index.search(query_embeddings, fetch)
+        else:
+            distances, indices = index.search(query_embeddings, fetch, params=params)
+        if exact:
+            return self._rerank(query_embeddings, indices, k)
+        if metric_of(index) == "ip":
+            # Unit vectors: |q - x|^2 = 2 - 2 * q.x
+            distances = np.where(indices >= 0, 2.0 - 2.0 * distances.astype("float64"), np.inf).astype("float32")
+        return distances, indices
+
+    def _rerank(self, query_embeddings: np.ndarray, candidates: np.ndarray, k: int):
+        distances = np.full((len(query_embeddings), k), np.inf, dtype="float32")
+        indices = np.full((len(query_embeddings), k), -1, dtype="int64")
+        for i, query in enumerate(query_embeddings):
+            rows = candidates[i][candidates[i] >= 0]
+            if len(rows) == 0:
+                continue
+            vectors = self._prepare(self.vector_file.take(rows))
+            exact = ((vectors - query) ** 2).sum(axis=1)
+            order = np.argsort(exact, kind="stable")[:k]
+            distances[i, :len(order)] = exact[order]
+            indices[i, :len(order)] = rows[order]
+        return distances, indices
+
+    def memory_report(self) -> Dict[str, float]:
+        """Bytes per chunk of the index and the vector side store, against float32 flat storage
+
+        The baseline is what every chunk cost before the side store existed: an
+        ``IndexFlatL2`` row, 4 bytes per dimension. ``saved_bytes_per_chunk`` is negative
+        when the index and side store together take more than that.
+        """
+        rows = self.ntotal
+        if os.path.exists(self.index_path) and self._mmapped:
+            index_bytes = os.path.getsize(self.index_path)
+        else:
+            with self.index_lock.read():
+                index_bytes = int(faiss.serialize_index(self.index).nbytes)
+        vector_bytes = min(self.vector_file.rows(), rows) * self.vector_file.bytes_per_row
+        baseline = 4 * self.dimension
+        per_chunk = (index_bytes + vector_bytes) / rows if rows else 0.0
+        return {
+            "rows": rows,
+            "index_type": self.current_type,
+            "metric": self.metric,
+            "vector_storage": self.vector_file.storage,
+            "index_bytes": index_bytes,
+            "vector_bytes": vector_bytes,
+            "index_bytes_per_chunk": index_bytes / rows if rows else 0.0,
+            "vector_bytes_per_chunk": vector_bytes / rows if rows else 0.0,
+            "bytes_per_chunk": per_chunk,
+            "baseline_bytes_per_chunk": baseline,
+            "saved_bytes_per_chunk": baseline - per_chunk if rows else 0.0
+        }
+
+    def build_candidate(self, index_type: str):
+        """Build an in-memory index of index_type from the stored vectors without saving it"""
+        self._backfill_vectors()
+        return self._build_from_vectors(index_type)
+
+    def recall_report(self, query_embeddings: np.ndarray, k: int = 10, index=None,
+                      nprobe_values: Sequence[int] = (1, 4, 16, 64),
+                      ef_search_values: Sequence[int] = (16, 64, 256),
+                      rerank_values: Sequence[int] = (0,)) -> List[Dict]:
+        """Measure recall@k and latency against exact flat search.
+
+        Uses the live index unless another index (e.g. from build_candidate) is given.
+        rerank_values lists re-ranking factors to try (0 is the raw index).
+        """
+        index = index if index is not None else self.index
+        query_embeddings = self._prepare(query_embeddings)
+        _, exact = faiss.knn(query_embeddings, self._prepare(self.vectors()), k)
+
+        index_type = index_type_of(index)
+        if index_type in ("ivf_flat", "ivf_pq"):
+            settings_grid = [{"nprobe": value} for value in nprobe_values]
+        elif index_type == "hnsw":
+            settings_grid = [{"ef_search": value} for value in ef_search_values]
+        else:
+            settings_grid = [{}]
+        if index_type == "ivf_pq":
+            settings_grid = [{**search_settings, "rerank": factor}
+                             for search_settings in settings_grid for factor in rerank_values]
+
+        report = []
+        for search_settings in settings_grid:
+            start = time.perf_counter()
+            with self.index_lock.read():
+                _, found = self._search_index(index, query_embeddings, k, search_settings.get("nprobe"),
+                                              search_settings.get("ef_search"), search_settings.get("rerank", 0))
+            elapsed = time.perf_counter() - start
+            hits = sum(len(set(found[i]) & set(exact[i])) for i in range(len(query_embeddings)))
+            report.append({
+                "index_type": index_type,
+                **search_settings,
+                "recall_at_k": hits / float(len(query_embeddings) * k),
+                "latency_ms": 1000 * elapsed / len(query_embeddings)
+            })
+        return report
@@ -0,0 +1,63 @@
+"""
+Benchmark for page-level PDF text extraction.
+
+Generates a synthetic multi-page PDF and measures pages/sec of extract_pages with a
+process pool of 1, 2, 4, ... workers (up to the number of cores).
+
+Usage: python -m benchmarks.bench_extract [--pages 500] [--pages-per-shard 32]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from app.agents.pdf_rag import extract_pages
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 45):
+    """Write a PDF with `pages` pages of filler text"""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        text = "\n".join(
+            f"Page {number + 1} line {line}: NebulaByte multi-agent retrieval benchmark text for extraction."
+            for line in range(lines_per_page)
+        )
+        page.insert_text((40, 40), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+def run_benchmark(pages: int, pages_per_shard: int):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.pdf")
+        make_pdf(path, pages)
+
+        start = time.perf_counter()
+        extract_pages(path)
+        baseline = time.perf_counter() - start
+        print(f"{'workers':>8}{'seconds':>10}{'pages/sec':>12}{'speedup':>9}")
+        print(f"{'inline':>8}{baseline:>10.2f}{pages / baseline:>12.1f}{1.0:>9.2f}")
+
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                # Warm the pool so process start-up is not counted
+                list(executor.map(abs, range(workers)))
+                start = time.perf_counter()
+                extracted = extract_pages(path, executor, pages_per_shard=pages_per_shard)
+                elapsed = time.perf_counter() - start
+            assert len(extracted) == pages
+            results.append({"workers": workers, "seconds": elapsed, "pages_per_sec": pages / elapsed})
+            print(f"{workers:>8}{elapsed:>10.2f}{pages / elapsed:>12.1f}{baseline / elapsed:>9.2f}")
+            workers *= 2
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure PDF extraction throughput")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--pages-per-shard", type=int, default=32)
+    args = parser.parse_args()
+    run_benchmark(args.pages, args.pages_per_shard)
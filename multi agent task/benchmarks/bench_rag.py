@@ -0,0 +1,377 @@
+"""
+Microbenchmarks for PDF ingestion and retrieval.
+
+Synthesizes a corpus of PDFs (with create_pdf from generate_sample_pdfs.py) and, for
+each corpus size (a prefix of the documents), measures:
+
+- extraction: pages/sec of extract_pages
+- chunking and embedding: chunks/sec of the word-window chunker and of the model alone
+- ingestion: chunks/sec of process_pdf end to end (extract, chunk, embed, commit)
+- retrieval: per-query latency and hit@k of PDFRAGAgent.search_batch, dense and hybrid
+
+and, for each index type and corpus size, build and incremental add throughput,
+bytes per chunk, single-query latency and recall@k against exact search. Index-only
+corpora larger than the PDFs (--synthetic-sizes) are perturbed copies of the embedded
+chunks, so IVF and HNSW are also measured at the sizes they are meant for.
+
+Results are written as JSON with the git commit, the settings and a flat "summary" of
+the headline numbers, so runs on different commits can be compared with --compare.
+
+Usage: python -m benchmarks.bench_rag [--sizes 10 50] [--pages-per-doc 10] [--queries 200]
+           [--k 10] [--types flat ivf_flat ivf_pq hnsw] [--synthetic-sizes 20000] [--output results.json]
+       python -m benchmarks.bench_rag --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import faiss
+import numpy as np
+from app.config.settings import settings
+from app.agents.pdf_rag import extract_pages
+from app.storage.vector_store import INDEX_TYPES, VectorStore
+from benchmarks.stats import percentiles
+from generate_sample_pdfs import create_pdf
+
+WORDS_PER_PAGE = 550  # about one letter page in create_pdf's Normal style
+QUERY_WORDS = 12  # words of a chunk used as its query
+
+TOPICS = {
+    "infrastructure": ["cluster", "deployment", "latency", "replica", "kubernetes", "autoscaling", "gateway",
+                       "database", "failover", "throughput", "container", "monitoring", "region", "cache"],
+    "finance": ["invoice", "revenue", "quarter", "budget", "forecast", "margin", "payment", "contract",
+                "expense", "audit", "ledger", "pricing", "discount", "renewal"],
+    "research": ["transformer", "embedding", "retrieval", "benchmark", "dataset", "attention", "gradient",
+                 "evaluation", "baseline", "ablation", "encoder", "corpus", "training", "inference"],
+    "legal": ["clause", "liability", "termination", "agreement", "warranty", "jurisdiction", "indemnity",
+              "confidentiality", "obligation", "breach", "amendment", "licensee", "notice", "arbitration"],
+}
+FILLER = ["the", "a", "of", "and", "with", "for", "during", "across", "under", "while", "after", "each",
+          "team", "system", "report", "client", "review", "plan", "update", "process"]
+
+
+def _paragraph(rng: random.Random, vocabulary: List[str], reference: str) -> str:
+    sentences = []
+    for _ in range(rng.randint(4, 6)):
+        words = [rng.choice(vocabulary if rng.random() < 0.5 else FILLER) for _ in range(rng.randint(10, 16))]
+        sentences.append(" ".join(words).capitalize() + ".")
+    sentences.append(f"Reference {reference}.")
+    return " ".join(sentences)
+
+
+def synthesize_corpus(directory: str, documents: int, pages_per_doc: int, seed: int = 0) -> List[str]:
+    """Write `documents` PDFs of about pages_per_doc pages each; returns their paths.
+
+    Text is drawn from per-topic vocabularies and every paragraph carries a unique
+    reference id, so chunks are distinct and lexical search has identifiers to match.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    topics = list(TOPICS)
+    paths = []
+    for number in range(documents):
+        topic = topics[number % len(topics)]
+        paragraphs, words = [], 0
+        while words < WORDS_PER_PAGE * pages_per_doc:
+            paragraph = _paragraph(rng, TOPICS[topic], f"{topic[:3].upper()}-{number:04d}-{len(paragraphs):04d}")
+            paragraphs.append(paragraph)
+            words += len(paragraph.split())
+        path = os.path.join(directory, f"bench_{number:04d}_{topic}.pdf")
+        create_pdf("\n\n".join(paragraphs), path)
+        paths.append(path)
+    return paths
+
+
+def git_revision() -> Dict[str, object]:
+    """Commit of the working tree and whether it has uncommitted changes"""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=cwd, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def open_agent(index_dir: str):
+    """A PDFRAGAgent with an empty index in index_dir and no sample PDFs"""
+    from app.agents.pdf_rag import PDFRAGAgent
+
+    settings.INDEX_DIR = index_dir
+    settings.SAMPLE_PDF_DIR = os.path.join(index_dir, "no_sample_pdfs")
+    settings.EMBEDDING_CACHE_DB = ""
+    return PDFRAGAgent()
+
+
+def make_queries(agent, count: int, seed: int = 0) -> List[str]:
+    """Runs of QUERY_WORDS words from random chunks; a hit is a result containing the run"""
+    rng = random.Random(seed)
+    rows = rng.sample(range(len(agent.chunk_store)), min(count, len(agent.chunk_store)))
+    queries = []
+    for row in rows:
+        words = agent.chunk_store.get(row)["content"].split()
+        start = rng.randint(0, max(0, len(words) - QUERY_WORDS))
+        queries.append(" ".join(words[start:start + QUERY_WORDS]))
+    return queries
+
+
+def measure_search(agent, queries: List[str], k: int, mode: str) -> Dict[str, float]:
+    latencies, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        result = agent.search_batch([query], k, mode=mode)[0]
+        latencies.append(time.perf_counter() - start)
+        hits += any(query in document["content"] for document in result["documents"])
+    return {**percentiles(latencies), "hit_at_k": hits / len(queries) if queries else 0.0}
+
+
+def measure_corpus(paths: List[str], index_dir: str, num_queries: int, k: int) -> Dict:
+    """Extraction, chunking, embedding, ingestion and search figures for one corpus"""
+    start = time.perf_counter()
+    documents = [extract_pages(path) for path in paths]
+    extract_seconds = time.perf_counter() - start
+    pages = sum(len(document) for document in documents)
+
+    agent = open_agent(index_dir)
+    start = time.perf_counter()
+    chunks = [chunk for document in documents for chunk, _, _ in agent._chunk_pages(document)]
+    chunk_seconds = time.perf_counter() - start
+
+    # The model alone, in ingestion-sized batches and bypassing the embedding cache
+    start = time.perf_counter()
+    for i in range(0, len(chunks), settings.INGEST_EMBED_BATCH):
+        agent.model.encode(chunks[i:i + settings.INGEST_EMBED_BATCH])
+    embed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    outcomes = [agent.process_pdf(path) for path in paths]
+    ingest_seconds = time.perf_counter() - start
+    for outcome in outcomes:
+        if outcome["status"] == "error":
+            print(outcome["message"])
+    ingested = sum(outcome.get("chunks_embedded", 0) for outcome in outcomes)
+
+    queries = make_queries(agent, num_queries)
+    # Query encoding is timed on its own; search latency below uses cached query embeddings
+    encode_latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        agent.model.encode([query])
+        encode_latencies.append(time.perf_counter() - start)
+    agent.embeddings.encode(queries)
+    search = {mode: measure_search(agent, queries, k, mode) for mode in ("dense", "hybrid")}
+
+    return {
+        "documents": len(paths),
+        "pages": pages,
+        "chunks": len(chunks),
+        "extraction": {"seconds": extract_seconds, "pages_per_sec": pages / extract_seconds},
+        "chunking": {"seconds": chunk_seconds, "chunks_per_sec": len(chunks) / chunk_seconds if chunk_seconds else 0.0},
+        "embedding": {"seconds": embed_seconds, "chunks_per_sec": len(chunks) / embed_seconds if embed_seconds else 0.0,
+                      "batch_size": settings.INGEST_EMBED_BATCH},
+        "ingestion": {"seconds": ingest_seconds, "chunks": ingested, "chunks_per_sec": ingested / ingest_seconds,
+                      "pages_per_sec": pages / ingest_seconds,
+                      "errors": sum(outcome["status"] == "error" for outcome in outcomes)},
+        "query_encoding": percentiles(encode_latencies),
+        "search": search,
+        "_vectors": np.asarray(agent.vector_store.vectors(), dtype="float32"),
+        "_query_vectors": np.asarray(agent.model.encode(queries), dtype="float32"),
+    }
+
+
+def measure_index(index_type: str, vectors: np.ndarray, queries: np.ndarray, k: int, directory: str) -> Dict:
+    """Build, add, save, memory, latency and recall figures for one index type and corpus"""
+    store = VectorStore(vectors.shape[1], directory, index_type=index_type, migration_threshold=0)
+    # Most vectors arrive in one bulk build (training included); the rest are added in
+    # ingestion-sized batches to the trained index
+    split = max(1, int(len(vectors) * 0.9))
+    with store.write_lock():
+        start = time.perf_counter()
+        store.add(vectors[:split])
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(split, len(vectors), settings.INGEST_EMBED_BATCH):
+            store.add(vectors[i:i + settings.INGEST_EMBED_BATCH])
+        add_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        store.save()
+        save_seconds = time.perf_counter() - start
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+
+    grid = store.recall_report(
+        queries, k=k,
+        nprobe_values=sorted({1, 4, 16, 64, settings.IVF_NPROBE}),
+        ef_search_values=sorted({16, 64, 256, settings.HNSW_EF_SEARCH}),
+        rerank_values=sorted({0, settings.RERANK_FACTOR})
+    )
+    defaults = {"nprobe": settings.IVF_NPROBE, "ef_search": settings.HNSW_EF_SEARCH, "rerank": settings.RERANK_FACTOR}
+    default_row = next(row for row in grid if all(row[key] == value for key, value in defaults.items() if key in row))
+    added = len(vectors) - split
+    return {
+        "index_type": index_type,
+        "vectors": len(vectors),
+        "build_seconds": build_seconds,
+        "build_vectors_per_sec": split / build_seconds,
+        "add_vectors_per_sec": added / add_seconds if added and add_seconds else None,
+        "save_seconds": save_seconds,
+        "bytes_per_chunk": store.memory_report()["bytes_per_chunk"],
+        "latency": percentiles(latencies),
+        "recall_at_k": default_row["recall_at_k"],
+        "recall_grid": grid,
+    }
+
+
+def synthetic_vectors(vectors: np.ndarray, size: int, seed: int = 0) -> np.ndarray:
+    """size vectors resampled from the embedded chunks with a little noise"""
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(vectors), size)
+    return (vectors[rows] + rng.normal(0, 0.02, (size, vectors.shape[1]))).astype("float32")
+
+
+def summarize(results: Dict) -> Dict[str, float]:
+    """Headline numbers under flat keys, for comparing runs"""
+    summary = {}
+    for corpus in results["corpora"]:
+        prefix = f"corpus_{corpus['documents']}docs"
+        summary[f"{prefix}.extract_pages_per_sec"] = corpus["extraction"]["pages_per_sec"]
+        summary[f"{prefix}.chunk_chunks_per_sec"] = corpus["chunking"]["chunks_per_sec"]
+        summary[f"{prefix}.embed_chunks_per_sec"] = corpus["embedding"]["chunks_per_sec"]
+        summary[f"{prefix}.ingest_chunks_per_sec"] = corpus["ingestion"]["chunks_per_sec"]
+        for mode, row in corpus["search"].items():
+            if row["count"]:
+                summary[f"{prefix}.{mode}_search_p50_ms"] = row["p50_ms"]
+                summary[f"{prefix}.{mode}_search_p95_ms"] = row["p95_ms"]
+                summary[f"{prefix}.{mode}_hit_at_k"] = row["hit_at_k"]
+    for row in results["indexes"]:
+        if "error" in row:
+            continue
+        prefix = f"{row['index_type']}_{row['vectors']}"
+        summary[f"{prefix}.build_vectors_per_sec"] = row["build_vectors_per_sec"]
+        if row["add_vectors_per_sec"] is not None:
+            summary[f"{prefix}.add_vectors_per_sec"] = row["add_vectors_per_sec"]
+        summary[f"{prefix}.search_p50_ms"] = row["latency"]["p50_ms"]
+        summary[f"{prefix}.search_p95_ms"] = row["latency"]["p95_ms"]
+        summary[f"{prefix}.recall_at_k"] = row["recall_at_k"]
+        summary[f"{prefix}.bytes_per_chunk"] = row["bytes_per_chunk"]
+    return summary
+
+
+def compare(old_path: str, new_path: str) -> List[Dict]:
+    """Print the summaries of two result files side by side"""
+    with open(old_path, "r") as f:
+        old = json.load(f)
+    with open(new_path, "r") as f:
+        new = json.load(f)
+    print(f"old: {old['git']['commit'][:12]} ({old['started_at']})")
+    print(f"new: {new['git']['commit'][:12]} ({new['started_at']})")
+    print(f"{'metric':<48}{'old':>12}{'new':>12}{'change':>9}")
+    rows = []
+    for key in sorted(set(old["summary"]) | set(new["summary"])):
+        before, after = old["summary"].get(key), new["summary"].get(key)
+        change = (after - before) / before if before and after is not None else None
+        rows.append({"metric": key, "old": before, "new": after, "change": change})
+        print(f"{key:<48}{_format(before):>12}{_format(after):>12}"
+              f"{(f'{change:+.1%}' if change is not None else '-'):>9}")
+    return rows
+
+
+def _format(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.4g}"
+
+
+def run_benchmark(sizes: Sequence[int], pages_per_doc: int, num_queries: int, k: int,
+                  index_types: Sequence[str], synthetic_sizes: Sequence[int], output: Optional[str] = None) -> Dict:
+    results = {
+        "benchmark": "rag",
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "platform": {"python": platform.python_version(), "machine": platform.machine(),
+                     "cpus": os.cpu_count(), "faiss": faiss.__version__},
+        "parameters": {"sizes": list(sizes), "pages_per_doc": pages_per_doc, "queries": num_queries, "k": k,
+                       "index_types": list(index_types), "synthetic_sizes": list(synthetic_sizes)},
+        "settings": {name: getattr(settings, name) for name in (
+            "EMBEDDING_MODEL", "EMBEDDING_DIMENSION", "VECTOR_METRIC", "VECTOR_STORAGE", "SEARCH_MODE",
+            "INGEST_EMBED_BATCH", "INGEST_COMMIT_BATCH", "IVF_NLIST", "IVF_NPROBE", "PQ_M", "PQ_NBITS",
+            "HNSW_M", "HNSW_EF_CONSTRUCTION", "HNSW_EF_SEARCH", "RERANK_FACTOR")},
+        "corpora": [],
+        "indexes": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench_rag_") as tmp_dir:
+        start = time.perf_counter()
+        paths = synthesize_corpus(os.path.join(tmp_dir, "pdfs"), max(sizes), pages_per_doc)
+        print(f"Synthesized {len(paths)} PDFs in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'docs':>6}{'pages':>7}{'chunks':>8}{'extract p/s':>13}{'embed c/s':>11}{'ingest c/s':>12}"
+              f"{'dense p50 ms':>14}{'hybrid p50 ms':>15}{'hit@k d/h':>11}")
+        index_corpora = []
+        for size in sorted(set(sizes)):
+            corpus = measure_corpus(paths[:size], os.path.join(tmp_dir, f"index_{size}"), num_queries, k)
+            vectors, queries = corpus.pop("_vectors"), corpus.pop("_query_vectors")
+            index_corpora.append((vectors, queries))
+            results["corpora"].append(corpus)
+            dense, hybrid = corpus["search"]["dense"], corpus["search"]["hybrid"]
+            print(f"{size:>6}{corpus['pages']:>7}{corpus['chunks']:>8}{corpus['extraction']['pages_per_sec']:>13.1f}"
+                  f"{corpus['embedding']['chunks_per_sec']:>11.1f}{corpus['ingestion']['chunks_per_sec']:>12.1f}"
+                  f"{dense.get('p50_ms', 0):>14.2f}{hybrid.get('p50_ms', 0):>15.2f}"
+                  f"{dense['hit_at_k']:>6.2f}/{hybrid['hit_at_k']:.2f}")
+
+        largest, largest_queries = index_corpora[-1]
+        for size in synthetic_sizes:
+            index_corpora.append((synthetic_vectors(largest, size), largest_queries))
+
+        print(f"{'index':<10}{'vectors':>9}{'build v/s':>12}{'add v/s':>11}{'B/chunk':>9}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'recall@k':>10}")
+        for number, (vectors, queries) in enumerate(index_corpora):
+            for index_type in index_types:
+                directory = os.path.join(tmp_dir, f"vectors_{number}_{index_type}")
+                try:
+                    row = measure_index(index_type, vectors, queries, k, directory)
+                except Exception as e:
+                    print(f"{index_type:<10}{len(vectors):>9}  skipped: {e}")
+                    results["indexes"].append({"index_type": index_type, "vectors": len(vectors), "error": str(e)})
+                    continue
+                results["indexes"].append(row)
+                add_rate = f"{row['add_vectors_per_sec']:.0f}" if row["add_vectors_per_sec"] is not None else "-"
+                print(f"{index_type:<10}{len(vectors):>9}{row['build_vectors_per_sec']:>12.0f}{add_rate:>11}"
+                      f"{row['bytes_per_chunk']:>9.0f}{row['latency']['p50_ms']:>9.3f}"
+                      f"{row['latency']['p95_ms']:>9.3f}{row['recall_at_k']:>10.3f}")
+
+    results["summary"] = summarize(results)
+    output = output or f"bench_rag_{results['git']['commit'][:12]}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF ingestion and retrieval on synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50], help="corpus sizes in documents")
+    parser.add_argument("--pages-per-doc", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--synthetic-sizes", type=int, nargs="*", default=[20000],
+                        help="extra index-only corpus sizes made from the embedded chunks")
+    parser.add_argument("--output", help="JSON results file (default bench_rag_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run_benchmark(args.sizes, args.pages_per_doc, args.queries, args.k, args.types,
+                      args.synthetic_sizes, args.output)
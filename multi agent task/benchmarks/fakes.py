@@ -0,0 +1,155 @@
+"""
+Offline stand-ins for the external services, for load tests and benchmarks.
+
+FakeWebSearchAgent, FakeArxivAgent and FakeGroq answer in the same shapes as the
+real agents and Groq client, after a latency drawn from a LatencyModel, and fail at a
+configurable rate, so the controller can be exercised without API keys or network.
+"""
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class LatencyModel:
+    """Log-normal latency around a median, with a probability of failing
+
+    ``spread`` is the log-normal sigma (0 gives a constant latency); ``error_rate`` is
+    the fraction of calls that raise after their latency.
+    """
+
+    def __init__(self, median: float = 0.2, spread: float = 0.5, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.median = median
+        self.spread = spread
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Build from "median[,spread[,error_rate]]", e.g. "0.3,0.5,0.01" """
+        values = [float(value) for value in spec.split(",")]
+        return cls(*values[:3])
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.median <= 0:
+                return 0.0
+            return self.median * self._random.lognormvariate(0, self.spread) if self.spread else self.median
+
+    def fails(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class _CacheStats:
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class _FakeAgent(ABC):
+    """Shared latency, failure and call counting; subclasses build the response"""
+    source = "fake"
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel()
+        self.cache = _CacheStats()
+        self.calls = 0
+
+    def search(self, query: str, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        return self._result(query)
+
+    async def asearch(self, query: str, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample())
+        return self._result(query)
+
+    def _result(self, query: str) -> Dict[str, Any]:
+        if self.latency.fails():
+            raise RuntimeError(f"simulated {self.source} failure")
+        return self.response(query)
+
+    @abstractmethod
+    def response(self, query: str) -> Dict[str, Any]:
+        """The successful result for query, shaped like the real agent's"""
+
+
+class FakeWebSearchAgent(_FakeAgent):
+    source = "web search"
+
+    def response(self, query: str) -> Dict[str, Any]:
+        results = [{"title": f"Result {i} for {query}", "content": f"Snippet {i} about {query}.",
+                    "url": f"https://example.com/{i}"} for i in range(3)]
+        return {
+            "results": results,
+            "summary": " ".join(f"{result['title']}: {result['content'][:100]}..." for result in results[:2])
+        }
+
+
+class FakeArxivAgent(_FakeAgent):
+    source = "ArXiv"
+
+    def response(self, query: str) -> Dict[str, Any]:
+        papers = [{"title": f"Paper {i} on {query}", "content": f"Abstract {i} about {query}.",
+                   "url": f"http://arxiv.org/abs/2401.0000{i}", "authors": ["A. Author"],
+                   "published": "2024-01-01"} for i in range(3)]
+        return {
+            "papers": papers,
+            "summary": " ".join(paper["title"] for paper in papers),
+            "source": "fake"
+        }
+
+
+class FakeGroq:
+    """Mimics ``groq.Groq().chat.completions.create`` for routing and synthesis prompts
+
+    Routing prompts get a JSON decision picked by keyword; synthesis prompts get a
+    canned answer, streamed in ``tokens`` pieces when ``stream=True``. ``latency`` is
+    the time to the first token and ``token_latency`` the time between tokens.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, token_latency: float = 0.01, tokens: int = 20):
+        self.latency = latency or LatencyModel(median=0.5)
+        self.token_latency = token_latency
+        self.tokens = tokens
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages: List[Dict[str, str]], stream: bool = False, **kwargs) -> Any:
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        if self.latency.fails():
+            raise RuntimeError("simulated Groq failure")
+        prompt = messages[-1]["content"]
+        text = self._route(prompt) if "Respond with a JSON object" in prompt else self._answer()
+        if stream:
+            return self._stream(text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    def _stream(self, text: str) -> Iterator[Any]:
+        words = text.split(" ")
+        size = max(1, len(words) // self.tokens)
+        for start in range(0, len(words), size):
+            time.sleep(self.token_latency)
+            piece = " ".join(words[start:start + size]) + (" " if start + size < len(words) else "")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    @staticmethod
+    def _route(prompt: str) -> str:
+        question = prompt.split('Question: "', 1)[-1].split('"', 1)[0].lower()
+        agents = []
+        if any(word in question for word in ("pdf", "document", "report")):
+            agents.append("pdf_rag")
+        if any(word in question for word in ("paper", "research", "study")):
+            agents.append("arxiv")
+        return json.dumps({"agents": agents or ["web_search"], "rationale": "Fake LLM keyword routing"})
+
+    def _answer(self) -> str:
+        return " ".join(f"word{i}" for i in range(self.tokens * 3))
@@ -0,0 +1,210 @@
+"""
+Offline load test of the FastAPI app.
+
+Boots the app in-process under uvicorn with the web search and ArXiv agents and the
+Groq client replaced by the stand-ins in benchmarks.fakes (the PDF agent is real and
+uses INDEX_DIR), replays a question corpus at a fixed concurrency and reports
+throughput and p50/p95/p99 latency per endpoint and per request stage (from the
+stage_timings of the logged queries).
+
+The corpus is the logged questions (logs/system_logs.json or a LogStore directory),
+or a text file with one question per line. Logs written during the run go to a
+temporary directory.
+
+Usage: python -m benchmarks.load_harness [--requests 500] [--concurrency 16]
+           [--endpoints ask ask_stream] [--corpus logs/system_logs.json]
+           [--web-latency 0.3,0.5,0.01] [--arxiv-latency 0.8,0.5,0.02] [--groq-latency 0.5,0.4,0]
+           [--no-groq] [--answer-cache] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import httpx
+import uvicorn
+from app.config.settings import settings
+from app.storage.log_store import LogStore, entry_from_dict
+from benchmarks.fakes import FakeArxivAgent, FakeGroq, FakeWebSearchAgent, LatencyModel
+from benchmarks.stats import percentiles
+
+DEFAULT_QUESTIONS = [
+    "What does the NebulaByte dialog document say about pricing?",
+    "Summarize the uploaded PDF",
+    "What are the latest news about AI regulation?",
+    "What is the weather in London today?",
+    "Find recent papers on retrieval-augmented generation",
+    "What research exists on graph neural networks?",
+    "Compare the PDF findings with recent research papers",
+    "Who is the CEO of OpenAI?",
+]
+
+ENDPOINTS = {"ask": "/ask", "ask_stream": "/ask/stream?format=ndjson"}
+
+
+def load_corpus(path: Optional[str]) -> List[str]:
+    """Questions from a legacy JSON log, a LogStore directory or a text file"""
+    if not path or not os.path.exists(path):
+        return list(DEFAULT_QUESTIONS)
+    if os.path.isdir(path):
+        questions = [entry.input for entry in LogStore(path).iter_entries()]
+    elif path.endswith(".json"):
+        with open(path, "r") as f:
+            questions = [entry_from_dict(log_data).input for log_data in json.load(f)]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f]
+    return [question for question in questions if question.strip()] or list(DEFAULT_QUESTIONS)
+
+
+def build_app(args):
+    """Import the app and swap in a controller wired to the fake services"""
+    import main
+    from app.api import routes
+    from app.agents.controller import ControllerAgent
+    from app.services.answer_cache import AnswerCache
+
+    default = routes.controller
+    controller = ControllerAgent(
+        pdf_rag_agent=default.pdf_rag_agent,
+        web_search_agent=FakeWebSearchAgent(LatencyModel.parse(args.web_latency)),
+        arxiv_agent=FakeArxivAgent(LatencyModel.parse(args.arxiv_latency)),
+        groq_client=None if args.no_groq else FakeGroq(LatencyModel.parse(args.groq_latency)),
+        use_llm=not args.no_groq
+    )
+    if not args.answer_cache:
+        # Replayed questions repeat; measure the full pipeline unless asked not to
+        controller.answer_cache = AnswerCache(ttls={"default": 0})
+    routes.controller = controller
+    default.shutdown()
+    return main.app, controller
+
+
+class _Server(uvicorn.Server):
+    def install_signal_handlers(self):
+        pass  # runs in a background thread
+
+
+def start_server(app, port: int) -> _Server:
+    server = _Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _request(client: httpx.AsyncClient, endpoint: str, question: str) -> float:
+    start = time.perf_counter()
+    if endpoint == "ask_stream":
+        async with client.stream("POST", ENDPOINTS[endpoint], json={"question": question}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line and json.loads(line)["event"] == "done":
+                    break
+    else:
+        response = await client.post(ENDPOINTS[endpoint], json={"question": question})
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def replay(base_url: str, questions: List[str], endpoints: List[str], total: int, concurrency: int):
+    """Send total requests with concurrency in flight. Returns latencies and errors per endpoint"""
+    latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in endpoints}
+    errors: Dict[str, int] = {endpoint: 0 for endpoint in endpoints}
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=settings.QUERY_DEADLINE * 3) as client:
+        async def worker():
+            for number in counter:
+                endpoint = endpoints[number % len(endpoints)]
+                try:
+                    latencies[endpoint].append(await _request(client, endpoint, questions[number % len(questions)]))
+                except Exception as e:
+                    errors[endpoint] += 1
+                    if errors[endpoint] <= 3:
+                        print(f"{endpoint} request failed: {e!r}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def stage_report(controller, since: datetime) -> Dict[str, Dict[str, float]]:
+    controller.log_store.flush()
+    stages: Dict[str, List[float]] = {}
+    for entry in controller.log_store.iter_entries(since=since):
+        if entry.timestamp < since:
+            continue
+        for name, seconds in entry.stage_timings.items():
+            stages.setdefault(name, []).append(seconds)
+    return {name: percentiles(values) for name, values in sorted(stages.items())}
+
+
+def run_load_test(args) -> Dict:
+    settings.LOG_DIR = tempfile.mkdtemp(prefix="load_test_logs_")
+    questions = load_corpus(args.corpus)
+    app, controller = build_app(args)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = start_server(app, port)
+
+    try:
+        started_at = datetime.now()
+        latencies, errors, elapsed = asyncio.run(
+            replay(f"http://127.0.0.1:{port}", questions, args.endpoints, args.requests, args.concurrency)
+        )
+        completed = sum(len(values) for values in latencies.values())
+        results = {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "questions": len(questions),
+            "seconds": elapsed,
+            "rps": completed / elapsed if elapsed else 0.0,
+            "endpoints": {endpoint: {**percentiles(values), "errors": errors[endpoint]}
+                          for endpoint, values in latencies.items()},
+            "stages": stage_report(controller, started_at),
+            "pdf_search_batching": controller.pdf_search_batcher.stats()
+        }
+    finally:
+        server.should_exit = True
+        controller.shutdown()
+
+    print(f"{completed} requests in {elapsed:.1f}s at concurrency {args.concurrency}: {results['rps']:.1f} req/s")
+    print(f"{'endpoint/stage':<22}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for section in ("endpoints", "stages"):
+        for name, row in results[section].items():
+            if row["count"]:
+                print(f"{name:<22}{row['count']:>7}{row['mean_ms']:>10.1f}{row['p50_ms']:>10.1f}"
+                      f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    for endpoint, row in results["endpoints"].items():
+        if row["errors"]:
+            print(f"{endpoint}: {row['errors']} failed requests")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the API offline with fake external services")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--endpoints", nargs="+", default=["ask"], choices=list(ENDPOINTS))
+    parser.add_argument("--corpus", default="logs/system_logs.json",
+                        help="JSON log, LogStore directory or text file of questions")
+    parser.add_argument("--web-latency", default="0.3,0.5,0.01", help="median,spread,error_rate")
+    parser.add_argument("--arxiv-latency", default="0.8,0.5,0.02", help="median,spread,error_rate")
+    parser.add_argument("--groq-latency", default="0.5,0.4,0", help="median,spread,error_rate")
+    parser.add_argument("--no-groq", action="store_true", help="run without an LLM (rule-based routing, concatenated answers)")
+    parser.add_argument("--answer-cache", action="store_true", help="keep the answer cache enabled")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    run_load_test(parser.parse_args())
@@ -0,0 +1,13 @@
+"""Latency statistics shared by the load harness and the microbenchmarks."""
+from typing import Dict, List
+import numpy as np
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Count, mean and p50/p95/p99 of latencies in seconds, reported in milliseconds"""
+    if not values:
+        return {"count": 0}
+    array = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(array, [50, 95, 99])
+    return {"count": len(values), "mean_ms": float(array.mean()), "p50_ms": float(p50),
+            "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(array.max())}
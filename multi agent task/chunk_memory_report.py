@@ -0,0 +1,78 @@
+"""
+Memory per chunk of the chunk store versus the old list-of-dicts layout.
+
+Writes synthetic chunks (the size of real ones: ~1000 characters of text, a
+32-character id, a source path) to a temporary store, then measures with tracemalloc
+what the old ``documents`` / ``doc_metadata`` lists and the columnar ChunkStore hold
+in memory once loaded.
+
+Usage: python chunk_memory_report.py [--chunks 100000]
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import tracemalloc
+from app.storage.chunk_store import ChunkStore
+
+
+def _records(count: int):
+    for i in range(count):
+        content = f"chunk {i}: " + " ".join(f"word{(i * 7 + j) % 5000}" for j in range(120))[:990]
+        title = f"report_{i // 500}.pdf"
+        yield {
+            "id": hashlib.sha256(content.encode("utf-8")).hexdigest()[:32],
+            "content": content,
+            "source": os.path.join("uploads", title),
+            "title": title,
+            "chunk_index": i % 500,
+            "page_start": 1 + (i % 500) // 4,
+            "page_end": 1 + (i % 500) // 4
+        }
+
+
+def _legacy_load(path: str):
+    # The layout ChunkStore used to keep: two parallel lists of dicts plus an id lookup
+    documents, doc_metadata, id_to_row = [], [], {}
+    with open(path, "rb") as f:
+        records = [json.loads(line) for line in f]
+    for record in records:
+        documents.append({"id": record["id"], "content": record["content"], "source": record["source"]})
+        doc_metadata.append({"id": record["id"], "title": record["title"], "chunk_index": record["chunk_index"],
+                             "page_start": record.get("page_start"), "page_end": record.get("page_end")})
+        id_to_row.setdefault(record["id"], len(documents) - 1)
+    del records
+    return documents, doc_metadata, id_to_row
+
+
+def _measure(load):
+    tracemalloc.start()
+    loaded = load()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, loaded
+
+
+def run_report(num_chunks: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "chunks.jsonl")
+        ChunkStore(path).append(list(_records(num_chunks)))
+
+        legacy_bytes, _ = _measure(lambda: _legacy_load(path))
+        columnar_bytes, store = _measure(lambda: ChunkStore(path))
+        print(f"{num_chunks} chunks")
+        print(f"{'layout':<14}{'MB':>10}{'bytes/chunk':>14}")
+        for name, total in (("dicts", legacy_bytes), ("columnar", columnar_bytes)):
+            print(f"{name:<14}{total / 2 ** 20:>10.1f}{total / num_chunks:>14.0f}")
+        print(f"Saved {(legacy_bytes - columnar_bytes) / num_chunks:.0f} bytes per chunk "
+              f"({legacy_bytes / max(columnar_bytes, 1):.1f}x smaller)")
+        return {"chunks": num_chunks, "dicts_bytes": legacy_bytes, "columnar_bytes": columnar_bytes,
+                "estimated_columnar_bytes": store.memory_bytes()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare chunk store memory per chunk")
+    parser.add_argument("--chunks", type=int, default=100000)
+    args = parser.parse_args()
+    run_report(args.chunks)
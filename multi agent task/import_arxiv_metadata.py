@@ -0,0 +1,26 @@
+"""
+Bulk-import the ArXiv metadata dump into the local ArXiv store.
+
+The dump (arxiv-metadata-oai-snapshot.json, one JSON record per line, optionally
+gzipped) is published on Kaggle and the arXiv bulk-data pages. Imported papers are
+searchable offline, so academic questions matching them skip the ArXiv API.
+
+Usage: python import_arxiv_metadata.py path/to/arxiv-metadata-oai-snapshot.json [--store cache/arxiv.sqlite]
+"""
+import argparse
+import time
+from app.config.settings import settings
+from app.storage.arxiv_store import ArxivStore
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the ArXiv metadata dump into the local store")
+    parser.add_argument("dump")
+    parser.add_argument("--store", default=settings.ARXIV_STORE_PATH or "cache/arxiv.sqlite")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = ArxivStore(args.store)
+    imported = store.import_dump(args.dump, batch_size=args.batch_size)
+    print(f"Imported {imported} papers into {args.store} in {time.perf_counter() - start:.1f}s "
+          f"({len(store)} papers stored)")
@@ -1,26 +1,64 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import time
 
-from app.api.routes import router
+from app.services.http_client import close_http_client
+from app.services.metrics import HTTP_REQUESTS, HTTP_SECONDS
 
-app = FastAPI(title="Multi-Agent AI System")
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app() -> FastAPI:
+    """Build the API; importing the routes creates the ControllerAgent"""
+    from app.api import routes
 
-# Include routes
-app.include_router(router)
+    app = FastAPI(title="Multi-Agent AI System")
 
-@app.get("/")
-async def root():
-    return {"message": "Multi-Agent AI System API"}
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Include routes
+    app.include_router(routes.router)
+
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        # Streaming responses are timed to their first byte
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Label by route template (e.g. /jobs/{job_id}) to keep the series count bounded
+            route = request.scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(request.method, path, str(status))
+            HTTP_SECONDS.observe(time.perf_counter() - start, request.method, path)
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        # Close pooled keep-alive connections to the external APIs
+        await close_http_client()
+        # Stop the ingestion process pool and worker threads, and flush queued log entries
+        routes.controller.shutdown()
+
+    @app.get("/")
+    async def root():
+        return {"message": "Multi-Agent AI System API"}
+
+    return app
+
+
+# Ingestion workers are spawned processes, which re-run the script that started the
+# server (`python main.py`) as __mp_main__; they must not build an API and controller
+if __name__ != "__mp_main__":
+    app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.agents.arxiv import ArxivAgent
+from app.agents.controller import ControllerAgent
+from app.agents.web_search import WebSearchAgent
+from app.config.settings import settings
+from app.models.query import QueryRequest
+from app.services.answer_cache import AnswerCache, normalize_question
+from app.services.http_client import close_http_client
+
+TTLS = {"pdf_rag": 60, "web_search": 0.1, "default": 60}
+
+
+def bag_of_words(texts):
+    """Tiny deterministic encoder: one dimension per known word"""
+    vocabulary = ["what", "is", "nebulabyte", "the", "latest", "news", "on", "ai", "about"]
+    return np.array([[text.split().count(word) for word in vocabulary] for text in texts], dtype="float32")
+
+
+def test_exact_hits_expiry_and_pdf_invalidation():
+    cache = AnswerCache(max_entries=10, ttls=TTLS)
+    assert normalize_question("  What is NebulaByte? ") == "what is nebulabyte"
+
+    cache.put("What is NebulaByte?", "answer-1", ["pdf_rag"], pdf_version=1)
+    assert cache.get("what is   nebulabyte", pdf_version=1) == "answer-1"
+    # A new index version invalidates answers that searched the PDFs
+    assert cache.get("What is NebulaByte?", pdf_version=2) is None
+
+    # The web TTL is shorter, and the shortest TTL of the agents used wins
+    cache.put("latest AI news", "answer-2", ["pdf_rag", "web_search"], pdf_version=2)
+    assert cache.get("latest AI news", pdf_version=2) == "answer-2"
+    time.sleep(0.15)
+    assert cache.get("latest AI news", pdf_version=2) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["invalidated"]) == (2, 2, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_semantic_hits_and_eviction():
+    cache = AnswerCache(max_entries=2, ttls=TTLS, similarity_threshold=0.85, encode=bag_of_words)
+    cache.put("what is nebulabyte", "answer-1", ["pdf_rag"], pdf_version=1)
+    assert cache.get("what is the nebulabyte", pdf_version=1) == "answer-1"
+    assert cache.get("latest news on ai", pdf_version=1) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+    cache.put("latest news on ai", "answer-2", ["arxiv"])
+    cache.put("news about ai", "answer-3", ["arxiv"])
+    assert cache.stats()["entries"] == 2
+    assert cache.get("what is nebulabyte", pdf_version=1) is None
+
+
+@pytest.mark.asyncio
+async def test_answers_from_failed_searches_are_not_cached(tmp_path, monkeypatch):
+    """Unreachable APIs make the agents fail in the fan-out instead of answering with the error"""
+    monkeypatch.setattr(settings, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(settings, "INGEST_JOB_DB", "")
+    monkeypatch.setattr(settings, "ARXIV_STORE_PATH", "")
+    monkeypatch.setattr(settings, "WEB_SEARCH_CACHE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "SERPAPI_URL", "http://127.0.0.1:9/search")
+    monkeypatch.setattr(settings, "ARXIV_API_URL", "http://127.0.0.1:9/api/query")
+    monkeypatch.chdir(tmp_path)
+    pdf_agent = SimpleNamespace(
+        search_batch=lambda queries, **kwargs: [{"documents": [], "summary": ""} for _ in queries],
+        embeddings=SimpleNamespace(encode=lambda texts: np.ones((len(texts), 4), dtype="float32")),
+        process_pdf=lambda path, executor=None: {"status": "success"},
+        index_version=lambda: 0
+    )
+    controller = ControllerAgent(pdf_rag_agent=pdf_agent, web_search_agent=WebSearchAgent(),
+                                 arxiv_agent=ArxivAgent(), use_llm=False)
+    controller._decide_agents = lambda question: (["web_search", "arxiv"], {"web_search": "w", "arxiv": "a"})
+    try:
+        for _ in range(2):
+            response = await controller.process_query(QueryRequest(question="latest attention papers"))
+            assert "Error during" not in response.answer
+            assert all("failed" in agent.rationale for agent in response.agents_used)
+        assert controller.answer_cache.stats()["hits"] == 0
+    finally:
+        controller.shutdown()
+        await close_http_client()
@@ -0,0 +1,57 @@
+import json
+import pytest
+from app.agents.arxiv import ArxivAgent
+from app.storage.arxiv_store import ArxivStore
+
+DUMP = [
+    {"id": "1706.03762", "title": "Attention Is All You Need", "abstract": "The dominant sequence transduction models...",
+     "authors": "Ashish Vaswani, Noam Shazeer", "authors_parsed": [["Vaswani", "Ashish", ""], ["Shazeer", "Noam", ""]],
+     "versions": [{"version": "v1", "created": "Mon, 12 Jun 2017 17:57:34 GMT"}], "update_date": "2023-08-02"},
+    {"id": "1810.04805", "title": "BERT: Pre-training of Deep Bidirectional Transformers",
+     "abstract": "We introduce a new language representation model using attention.",
+     "authors": "Jacob Devlin and Ming-Wei Chang", "versions": [], "update_date": "2019-05-24"},
+    {"id": "1512.03385", "title": "Deep Residual Learning for Image Recognition",
+     "abstract": "Deeper neural networks are more difficult to train.",
+     "authors": "Kaiming He", "versions": [], "update_date": "2015-12-10"},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    dump = tmp_path / "arxiv-metadata.json"
+    dump.write_text("\n".join(json.dumps(record) for record in DUMP))
+    store = ArxivStore(str(tmp_path / "arxiv.sqlite"))
+    assert store.import_dump(str(dump), batch_size=2) == 3
+    return store
+
+
+def test_dump_import_and_full_text_search(store):
+    papers = store.search("recent papers on attention", limit=5)
+    assert [paper["url"] for paper in papers] == ["http://arxiv.org/abs/1706.03762", "http://arxiv.org/abs/1810.04805"]
+    assert papers[0]["authors"] == ["Ashish Vaswani", "Noam Shazeer"]
+    assert papers[0]["published"] == "2017-06-12"
+    assert store.search("residual networks", limit=5, match_all=True)[0]["title"].startswith("Deep Residual")
+    # Stemming: "training" matches "train"
+    assert len(store.search("training deeper", limit=5)) == 1
+    assert store.search('"; DROP TABLE papers; --', limit=5) == []
+
+
+def test_agent_answers_from_local_store_before_the_api(store, monkeypatch):
+    agent = ArxivAgent()
+    agent.store = store
+
+    def no_api(search):
+        raise AssertionError("the API should not be called")
+
+    monkeypatch.setattr(agent.client, "results", no_api)
+    result = agent.search("papers about attention", max_results=2)
+    assert result["source"] == "local"
+    assert len(result["papers"]) == 2
+
+    # A query fetched from the API before is answered with the same papers
+    api_papers = [{"title": "Quantum Widgets", "content": "Widgets.", "url": "http://arxiv.org/abs/2401.00001v2",
+                   "authors": ["A. Author"], "published": "2024-01-01"}]
+    store.record_query("Quantum widgets", api_papers)
+    result = agent.search("quantum   widgets")
+    assert result["source"] == "local"
+    assert result["papers"][0]["url"] == "http://arxiv.org/abs/2401.00001"
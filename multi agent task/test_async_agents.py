@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from app.agents.arxiv import ArxivAgent
+from app.agents.web_search import WebSearchAgent
+from app.services.http_client import close_http_client
+
+ATOM_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/2401.00001v1</id>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>Attention Is
+      Still All You Need</title>
+    <summary>  We revisit attention.  </summary>
+    <author><name>Ada Lovelace</name></author>
+    <author><name>Alan Turing</name></author>
+  </entry>
+</feed>"""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers like SerpAPI on /search and like the ArXiv API on /api/query"""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = set()
+    requests = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        StubHandler.connections.add(self.client_address)
+        StubHandler.requests.append(url.path)
+        if url.path == "/search":
+            query = parse_qs(url.query)["q"][0]
+            body = json.dumps({"organic_results": [{"title": query, "snippet": "stub", "link": "http://stub"}]})
+            content_type = "application/json"
+        else:
+            body = ATOM_FEED
+            content_type = "application/atom+xml"
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    StubHandler.connections = set()
+    StubHandler.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_agents_search_through_one_pooled_connection(stub_server):
+    web = WebSearchAgent()
+    web.base_url = f"{stub_server}/search"
+    arxiv_agent = ArxivAgent()
+    arxiv_agent.api_url = f"{stub_server}/api/query"
+    arxiv_agent.store = None
+    try:
+        for i in range(5):
+            result = await web.asearch(f"question {i}")
+            assert result["results"][0]["title"] == f"question {i}"
+        papers = (await arxiv_agent.asearch("attention"))["papers"]
+    finally:
+        await close_http_client()
+
+    assert papers == [{
+        "title": "Attention Is Still All You Need",
+        "content": "We revisit attention.",
+        "url": "http://arxiv.org/abs/2401.00001v1",
+        "authors": ["Ada Lovelace", "Alan Turing"],
+        "published": "2024-01-01"
+    }]
+    # Sequential requests reuse the kept-alive connection
+    assert len(StubHandler.requests) == 6
+    assert len(StubHandler.connections) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_web_searches_are_coalesced(stub_server):
+    web = WebSearchAgent()
+    web.base_url = f"{stub_server}/search"
+    try:
+        results = await asyncio.gather(*(web.asearch("same question") for _ in range(10)))
+    finally:
+        await close_http_client()
+
+    assert all(result == results[0] for result in results)
+    assert StubHandler.requests == ["/search"]
@@ -0,0 +1,70 @@
+import asyncio
+import time
+import pytest
+from app.services.batcher import MicroBatcher
+from app.agents.fanout import FanOutExecutor
+from app.services.metrics import current_trace, stage, start_trace
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_batch():
+    """Calls arriving together should reach the batch function as one list"""
+    calls = []
+
+    def search_batch(queries):
+        calls.append(list(queries))
+        return [f"result for {query}" for query in queries]
+
+    batcher = MicroBatcher(search_batch, max_batch=32, max_wait=0.02)
+    results = await asyncio.gather(*(batcher.submit(f"q{i}") for i in range(10)))
+
+    assert results == [f"result for q{i}" for i in range(10)]
+    assert calls == [[f"q{i}" for i in range(10)]]
+    assert batcher.stats()["mean_batch_size"] == 10
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_and_errors_reach_every_caller():
+    calls = []
+
+    def search_batch(queries):
+        calls.append(len(queries))
+        return list(queries)
+
+    batcher = MicroBatcher(search_batch, max_batch=4, max_wait=0.02)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+    assert results == list(range(10))
+    assert sorted(calls) == [2, 4, 4]
+
+    def broken_batch(queries):
+        raise RuntimeError("index unavailable")
+
+    broken = MicroBatcher(broken_batch, max_batch=4, max_wait=0.01)
+    results = await asyncio.gather(broken.submit("a"), broken.submit("b"), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_stage_timings_inside_a_batch_reach_each_caller():
+    def search_batch(queries):
+        with stage("faiss_search"):
+            time.sleep(0.02)
+        return list(queries)
+
+    batcher = MicroBatcher(search_batch, max_batch=32, max_wait=0.01)
+    fanout = FanOutExecutor(agent_timeout=1, deadline=2)
+
+    async def request(question):
+        start_trace()
+        responses, _ = await fanout.run([("pdf_rag", batcher.submit, (question,))])
+        return responses, current_trace()
+
+    (first, first_timings), (second, second_timings) = await asyncio.gather(request("a"), request("b"))
+    fanout.shutdown()
+    batcher.shutdown()
+
+    assert first == [("pdf_rag", "a")] and second == [("pdf_rag", "b")]
+    assert batcher.stats()["batches"] == 1
+    for timings in (first_timings, second_timings):
+        assert set(timings) == {"agent_pdf_rag", "faiss_search"}
+        assert timings["agent_pdf_rag"] >= timings["faiss_search"] >= 0.02
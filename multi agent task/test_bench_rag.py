@@ -0,0 +1,37 @@
+import json
+import numpy as np
+from app.agents.pdf_rag import extract_pages
+from benchmarks.bench_rag import compare, measure_index, summarize, synthesize_corpus
+
+
+def test_synthesized_pdfs_have_distinct_referenced_pages(tmp_path):
+    paths = synthesize_corpus(str(tmp_path), documents=2, pages_per_doc=2)
+    assert len(paths) == 2
+    pages = extract_pages(paths[1])
+    assert len(pages) >= 2
+    text = " ".join(page for _, page in pages)
+    assert "Reference" in text and "-0001-0000" in text
+    # Same seed, same corpus: smaller sizes are prefixes of larger ones
+    again = synthesize_corpus(str(tmp_path / "again"), documents=1, pages_per_doc=2)
+    assert extract_pages(again[0]) == extract_pages(paths[0])
+
+
+def test_index_figures_and_comparison(tmp_path, capsys):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype("float32")
+    row = measure_index("flat", vectors, vectors[:20], k=5, directory=str(tmp_path / "flat"))
+    assert row["vectors"] == 300 and row["recall_at_k"] == 1.0
+    assert row["latency"]["count"] == 20 and row["add_vectors_per_sec"] > 0
+
+    results = {"corpora": [], "indexes": [row, {"index_type": "ivf_pq", "vectors": 300, "error": "too few"}]}
+    summary = summarize(results)
+    assert summary["flat_300.recall_at_k"] == 1.0
+    assert not any(key.startswith("ivf_pq") for key in summary)
+
+    for name, scale in (("old.json", 1.0), ("new.json", 2.0)):
+        with open(tmp_path / name, "w") as f:
+            json.dump({"git": {"commit": name}, "started_at": "now",
+                       "summary": {"flat_300.build_vectors_per_sec": 100.0 * scale}}, f)
+    rows = compare(str(tmp_path / "old.json"), str(tmp_path / "new.json"))
+    assert rows == [{"metric": "flat_300.build_vectors_per_sec", "old": 100.0, "new": 200.0, "change": 1.0}]
+    assert "+100.0%" in capsys.readouterr().out
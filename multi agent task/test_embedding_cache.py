@@ -0,0 +1,44 @@
+import numpy as np
+from app.storage.embedding_cache import EmbeddingCache
+
+
+class CountingModel:
+    """Stand-in for SentenceTransformer that records how many texts it encoded"""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return np.array([[len(text), text.count(" ")] for text in texts], dtype="float32")
+
+
+def test_repeated_texts_skip_the_model():
+    model = CountingModel()
+    cache = EmbeddingCache(model, "test-model", max_entries=10)
+
+    first = cache.encode(["what is RAG", "hello  world"])
+    second = cache.encode(["what is RAG", "hello world", "new text"])
+
+    assert model.encoded == 3
+    assert np.array_equal(first[0], second[0])
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 3
+
+
+def test_lru_is_bounded_and_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "embeddings.sqlite")
+    model = CountingModel()
+    cache = EmbeddingCache(model, "test-model", max_entries=2, db_path=db_path)
+    cache.encode(["a", "b", "c"])
+    assert cache.stats()["entries"] == 2
+
+    restarted_model = CountingModel()
+    restarted = EmbeddingCache(restarted_model, "test-model", max_entries=2, db_path=db_path)
+    restarted.encode(["a", "b", "c"])
+    assert restarted_model.encoded == 0
+    assert restarted.stats()["disk_hits"] == 3
+
+    other_model = EmbeddingCache(CountingModel(), "other-model", db_path=db_path)
+    other_model.encode(["a"])
+    assert other_model.stats()["misses"] == 1
@@ -0,0 +1,84 @@
+import asyncio
+import time
+import pytest
+from app.agents.fanout import FanOutExecutor
+
+
+def slow_search(query: str, delay: float) -> dict:
+    time.sleep(delay)
+    return {"summary": f"{query} after {delay}s"}
+
+
+async def async_search(query: str) -> dict:
+    await asyncio.sleep(0.05)
+    return {"summary": f"async {query}"}
+
+
+def broken_search(query: str) -> dict:
+    raise RuntimeError("backend unavailable")
+
+
+@pytest.mark.asyncio
+async def test_agents_run_concurrently():
+    """Three blocking agents should cost roughly the slowest one, not the sum"""
+    executor = FanOutExecutor(agent_timeout=5, deadline=5)
+    calls = [
+        ("pdf_rag", slow_search, ("q", 0.3)),
+        ("web_search", slow_search, ("q", 0.3)),
+        ("arxiv", async_search, ("q",)),
+    ]
+    start = time.perf_counter()
+    responses, failures = await executor.run(calls)
+    elapsed = time.perf_counter() - start
+
+    assert [name for name, _ in responses] == ["pdf_rag", "web_search", "arxiv"]
+    assert failures == {}
+    assert elapsed < 0.55
+
+
+@pytest.mark.asyncio
+async def test_slow_agent_returns_partial_results():
+    """An agent that misses its timeout is dropped and reported, the rest are kept"""
+    executor = FanOutExecutor(agent_timeout=0.2, deadline=1)
+    calls = [
+        ("pdf_rag", slow_search, ("q", 0.01)),
+        ("web_search", slow_search, ("q", 1.0)),
+        ("arxiv", broken_search, ("q",)),
+    ]
+    responses, failures = await executor.run(calls)
+
+    assert [name for name, _ in responses] == ["pdf_rag"]
+    assert failures["web_search"] == "timed out"
+    assert failures["arxiv"].startswith("failed")
+
+
+@pytest.mark.asyncio
+async def test_global_deadline():
+    """The global deadline caps the fan-out even when per-agent timeouts are longer"""
+    executor = FanOutExecutor(agent_timeout=5, deadline=0.2)
+    start = time.perf_counter()
+    responses, failures = await executor.run([("arxiv", slow_search, ("q", 1.0))])
+
+    assert responses == []
+    assert failures == {"arxiv": "missed query deadline"}
+    assert time.perf_counter() - start < 0.5
+
+
+@pytest.mark.asyncio
+async def test_as_completed_yields_fastest_first():
+    """Streaming callers get each agent's result as soon as it is ready"""
+    executor = FanOutExecutor(agent_timeout=5, deadline=0.5)
+    calls = [
+        ("web_search", slow_search, ("q", 0.3)),
+        ("pdf_rag", slow_search, ("q", 0.01)),
+        ("arxiv", slow_search, ("q", 2.0)),
+    ]
+    start = time.perf_counter()
+    events = []
+    async for name, response, reason in executor.as_completed(calls):
+        events.append((name, reason, time.perf_counter() - start))
+
+    assert [(name, reason) for name, reason, _ in events] == [
+        ("pdf_rag", None), ("web_search", None), ("arxiv", "missed query deadline")
+    ]
+    assert events[0][2] < 0.2
\ No newline at end of file
@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import fitz
+import pytest
+from app.agents.pdf_rag import extract_pages
+from app.services.jobs import IngestionJobQueue, QueueFullError
+
+
+def test_jobs_report_their_outcome():
+    def process_pdf(file_path, executor=None):
+        if file_path == "broken.pdf":
+            return {"status": "error", "message": "Error processing PDF: broken"}
+        return {"status": "success", "chunks_processed": 3}
+
+    jobs = IngestionJobQueue(process_pdf, workers=1, processes=0)
+    ok = jobs.submit("good.pdf")
+    bad = jobs.submit("broken.pdf")
+    jobs.join()
+
+    assert jobs.get(ok.job_id).status == "succeeded"
+    assert jobs.get(ok.job_id).result["chunks_processed"] == 3
+    assert jobs.get(bad.job_id).status == "failed"
+    assert jobs.get("unknown") is None
+
+
+def test_job_status_is_shared_between_workers(tmp_path):
+    """A job accepted by one worker can be polled on another through the job store"""
+    def process_pdf(file_path, executor=None):
+        return {"status": "success", "chunks_processed": 2}
+
+    db_path = str(tmp_path / "jobs.sqlite")
+    accepting = IngestionJobQueue(process_pdf, workers=1, processes=0, db_path=db_path)
+    polled = IngestionJobQueue(process_pdf, workers=1, processes=0, db_path=db_path)
+    job = accepting.submit("a.pdf")
+    accepting.join()
+
+    shared = polled.get(job.job_id)
+    assert shared.status == "succeeded" and shared.result["chunks_processed"] == 2
+    assert shared.finished_at is not None
+    assert polled.get("unknown") is None
+
+
+def test_full_queue_applies_backpressure():
+    started = threading.Event()
+    release = threading.Event()
+
+    def process_pdf(file_path, executor=None):
+        started.set()
+        release.wait(5)
+        return {"status": "success"}
+
+    jobs = IngestionJobQueue(process_pdf, workers=1, processes=0, max_queued=1)
+    jobs.submit("a.pdf")
+    # Wait until the worker holds the first job
+    assert started.wait(5)
+    jobs.submit("b.pdf")
+    with pytest.raises(QueueFullError):
+        jobs.submit("c.pdf")
+    release.set()
+    jobs.join()
+
+
+class _CountingPool(ThreadPoolExecutor):
+    """Thread pool recording the most shards submitted but not yet collected"""
+
+    def __init__(self, max_workers):
+        super().__init__(max_workers=max_workers)
+        self.pending = 0
+        self.peak = 0
+
+    def submit(self, fn, *args):
+        self.pending += 1
+        self.peak = max(self.peak, self.pending)
+        future = super().submit(fn, *args)
+        original = future.result
+
+        def result(timeout=None):
+            self.pending -= 1
+            return original(timeout)
+
+        future.result = result
+        return future
+
+
+def test_extraction_keeps_every_worker_busy(tmp_path):
+    path = str(tmp_path / "long.pdf")
+    doc = fitz.open()
+    for number in range(60):
+        doc.new_page().insert_text((40, 40), f"page {number + 1}")
+    doc.save(path)
+    doc.close()
+
+    with _CountingPool(max_workers=6) as pool:
+        pages = extract_pages(path, pool, pages_per_shard=2)
+    assert [number for number, _ in pages] == list(range(1, 61))
+    # Shards in flight scale with the pool (twice its workers) instead of a fixed cap
+    assert pool.peak == 12
+
+    with _CountingPool(max_workers=6) as pool:
+        extract_pages(path, pool, pages_per_shard=2, max_in_flight=3)
+    assert pool.peak == 3
@@ -0,0 +1,113 @@
+import threading
+import pytest
+from app.agents.pdf_rag import PDFRAGAgent
+from app.storage.chunk_store import ChunkStore
+from app.storage.lexical_index import LexicalIndex
+
+DOCUMENTS = [
+    {"content": "The deployment uses Kubernetes and a managed Postgres database."},
+    {"content": "Invoice INV-20931 was issued to NebulaByte for the consultation."},
+    {"content": "Kubernetes autoscaling keeps latency low; Kubernetes also restarts failed pods."},
+    {"content": "The consultation covered the data pipeline and model monitoring."},
+]
+
+
+def test_bm25_finds_exact_identifiers_and_ranks_by_frequency():
+    index = LexicalIndex()
+    index.sync(DOCUMENTS)
+
+    assert index.search("what about INV-20931?", k=3)[0][0] == 1
+    rows = [row for row, _ in index.search("kubernetes", k=5)]
+    assert rows == [2, 0]
+    assert index.search("unrelated words", k=5) == []
+    # 6 bytes per posting plus 4 per document length
+    postings = sum(len(rows) for rows in index._rows)
+    assert index.memory_bytes() == 6 * postings + 4 * len(DOCUMENTS)
+
+
+def test_sync_is_incremental_and_rebuilds_after_truncation():
+    index = LexicalIndex()
+    index.sync(DOCUMENTS[:2], generation=0)
+    index.sync(DOCUMENTS, generation=0)
+    assert len(index) == 4
+    # Same term frequency, so the shorter chunk ranks first
+    assert [row for row, _ in index.search("consultation", k=5)] == [3, 1]
+
+    # Rows 2-3 were truncated and replaced by a different chunk
+    replaced = DOCUMENTS[:2] + [{"content": "Quarterly Kubernetes cost report"}]
+    index.sync(replaced, generation=1)
+    assert len(index) == 3
+    assert [row for row, _ in index.search("kubernetes", k=5)] == [2, 0]
+
+
+def test_failed_rows_leave_no_postings_behind():
+    index = LexicalIndex()
+    index.sync(DOCUMENTS[:2])
+    before = index.search("kubernetes consultation", k=5)
+    # Row ids past uint32 fail on the first posting, after a new term was created
+    with pytest.raises(OverflowError):
+        index._add(2 ** 32, "kubernetes brandnewterm")
+    assert len(index) == 2 and "brandnewterm" not in index.vocabulary
+    assert len(index._rows) == len(index.vocabulary) == len(index._freqs)
+    assert index.search("kubernetes consultation", k=5) == before
+
+
+def test_searches_run_alongside_sync():
+    index = LexicalIndex()
+    documents = [{"content": f"kubernetes node {i} consultation"} for i in range(3000)]
+    done = threading.Event()
+    errors = []
+
+    def searcher():
+        while not done.is_set():
+            try:
+                index.search("kubernetes consultation", k=3)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=searcher, daemon=True) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        for end in range(10, 3001, 10):
+            index.sync(documents[:end])
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+
+    assert errors == [] and len(index) == 3000
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = PDFRAGAgent._fuse([[5, 1, 2], [2, 7]])
+    rows = [row for row, _ in fused]
+    # Row 2 is found by both rankings, so it beats rows ranked first by only one
+    assert rows[0] == 2
+    assert set(rows) == {1, 2, 5, 7}
+
+
+def test_saved_postings_are_reused_while_the_chunk_store_matches(tmp_path):
+    chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    chunks.append([{"id": f"chunk-{i}", "content": document["content"], "source": "doc.pdf",
+                    "title": "doc.pdf", "chunk_index": i} for i, document in enumerate(DOCUMENTS[:3])])
+    index = LexicalIndex()
+    index.sync(chunks.documents, chunks.generation)
+    path = str(tmp_path / "lexical.npz")
+    index.save(path, chunks.fingerprint(len(index)))
+
+    # One more chunk arrives after the save; only it needs tokenizing on restart
+    chunks.append([{"id": "chunk-3", "content": DOCUMENTS[3]["content"], "source": "doc.pdf",
+                    "title": "doc.pdf", "chunk_index": 3}])
+    restored = LexicalIndex()
+    assert restored.load(path, chunks.fingerprint, chunks.generation)
+    assert len(restored) == 3
+    restored.sync(chunks.documents, chunks.generation)
+    expected = LexicalIndex()
+    expected.sync(chunks.documents, chunks.generation)
+    for query in ("kubernetes", "consultation INV-20931", "postgres"):
+        assert restored.search(query, k=5) == expected.search(query, k=5)
+
+    # Rows the snapshot covers were truncated: it no longer applies
+    chunks.truncate(2)
+    assert not LexicalIndex().load(path, chunks.fingerprint, chunks.generation)
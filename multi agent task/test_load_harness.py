@@ -0,0 +1,76 @@
+import json
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.agents import controller as controller_module
+from app.config.settings import settings
+from benchmarks.fakes import FakeArxivAgent, FakeGroq, FakeWebSearchAgent, LatencyModel
+from benchmarks.load_harness import load_corpus
+from benchmarks.stats import percentiles
+
+
+def test_fake_groq_routes_and_streams_like_groq():
+    groq = FakeGroq(LatencyModel(median=0), token_latency=0, tokens=5)
+    routing = groq.chat.completions.create(
+        messages=[{"role": "user", "content": 'Question: "Recent research on PDF parsing"\nRespond with a JSON object'}]
+    )
+    assert json.loads(routing.choices[0].message.content)["agents"] == ["pdf_rag", "arxiv"]
+
+    answer = groq.chat.completions.create(messages=[{"role": "user", "content": "Synthesize"}]).choices[0].message.content
+    pieces = [chunk.choices[0].delta.content
+              for chunk in groq.chat.completions.create(messages=[{"role": "user", "content": "Synthesize"}], stream=True)]
+    assert len(pieces) == 5 and "".join(pieces) == answer
+
+
+@pytest.mark.asyncio
+async def test_fake_agents_fail_at_the_configured_rate():
+    agent = FakeWebSearchAgent(LatencyModel.parse("0,0,0.5"))
+    agent.latency._random.seed(0)
+    failures = 0
+    for _ in range(200):
+        try:
+            assert "summary" in await agent.asearch("question")
+        except RuntimeError:
+            failures += 1
+    assert 70 < failures < 130
+
+
+def test_corpus_and_percentiles(tmp_path):
+    corpus = tmp_path / "questions.txt"
+    corpus.write_text("first question\n\nsecond question\n")
+    assert load_corpus(str(corpus)) == ["first question", "second question"]
+    assert len(load_corpus(str(tmp_path / "missing.json"))) > 0
+
+    report = percentiles([0.001 * i for i in range(1, 101)])
+    assert report["count"] == 100
+    assert report["p50_ms"] == pytest.approx(50.5)
+    assert report["p99_ms"] == pytest.approx(99.01)
+
+
+def test_offline_controller_never_builds_a_groq_client(tmp_path, monkeypatch):
+    built = []
+    monkeypatch.setattr(controller_module, "GROQ_AVAILABLE", True)
+    monkeypatch.setattr(controller_module, "Groq", lambda **kwargs: built.append(kwargs))
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "key-from-the-environment")
+    monkeypatch.setattr(settings, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.chdir(tmp_path)
+    pdf_agent = SimpleNamespace(
+        search_batch=lambda queries, **kwargs: [{"documents": [], "summary": ""} for _ in queries],
+        embeddings=SimpleNamespace(encode=lambda texts: np.ones((len(texts), 4), dtype="float32")),
+        process_pdf=lambda path, executor=None: {"status": "success"}
+    )
+
+    controller = controller_module.ControllerAgent(
+        pdf_rag_agent=pdf_agent, web_search_agent=FakeWebSearchAgent(), arxiv_agent=FakeArxivAgent(),
+        groq_client=None, use_llm=False
+    )
+    try:
+        assert controller.groq_client is None and built == []
+    finally:
+        controller.shutdown()
+
+
+def test_fake_web_results_use_the_real_agent_keys():
+    response = FakeWebSearchAgent(LatencyModel(median=0)).search("vector databases")
+    assert all(set(result) == {"title", "content", "url"} for result in response["results"])
+    assert response["summary"].startswith("Result 0 for vector databases: ")
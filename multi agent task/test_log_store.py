@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from app.models.log import LogEntry
+from app.storage.log_store import LogStore
+
+
+def _entry(question: str, timestamp: datetime) -> LogEntry:
+    return LogEntry(
+        input=question,
+        decision="{}",
+        agents_called=["web_search"],
+        documents_retrieved=[],
+        final_answer="answer",
+        timestamp=timestamp
+    )
+
+
+def test_entries_are_appended_and_streamed_back(tmp_path):
+    store = LogStore(str(tmp_path))
+    now = datetime.now()
+    for i in range(5):
+        store.append(_entry(f"question {i}", now))
+    store.flush()
+
+    assert [entry.input for entry in store.iter_entries()] == [f"question {i}" for i in range(5)]
+    store.close()
+
+
+def test_rotation_and_skipping_old_segments(tmp_path):
+    store = LogStore(str(tmp_path), max_bytes=1)
+    old = datetime.now() - timedelta(days=3)
+    store.append(_entry("old question", old))
+    store.flush()
+    store.append(_entry("new question", datetime.now()))
+    store.flush()
+
+    assert len(store.segments()) == 2
+    recent = list(store.iter_entries(since=datetime.now() - timedelta(days=1)))
+    assert [entry.input for entry in recent] == ["new question"]
+    store.close()
+
+
+def test_query_pages_and_filters(tmp_path):
+    store = LogStore(str(tmp_path), max_bytes=300)
+    now = datetime.now()
+    for i in range(10):
+        entry = _entry(f"question {i}", now + timedelta(seconds=i))
+        if i % 2:
+            entry.agents_called = ["arxiv"]
+        store.append(entry)
+        store.flush()
+
+    page, cursor = store.query(limit=3)
+    assert [entry.input for entry in page] == ["question 9", "question 8", "question 7"]
+    page, cursor = store.query(limit=3, cursor=cursor)
+    assert [entry.input for entry in page] == ["question 6", "question 5", "question 4"]
+
+    arxiv_only, _ = store.query(limit=10, agent="arxiv", since=now + timedelta(seconds=4))
+    assert [entry.input for entry in arxiv_only] == ["question 9", "question 7", "question 5"]
+
+    matches, cursor = store.query(limit=10, order="asc", text="QUESTION 3")
+    assert [entry.input for entry in matches] == ["question 3"]
+    assert cursor is None
+    store.close()
@@ -1,24 +1,24 @@
 import os
 import json
-from datetime import datetime
+from app.config.settings import settings
+from app.storage.log_store import LogStore
 
 def test_logging():
     """Test that logging works correctly"""
-    # Check if log file exists
-    log_file = "logs/system_logs.json"
+    # Logs are stored as JSONL segments; the old single-file log is still read
+    store = LogStore(settings.LOG_DIR, legacy_path="logs/system_logs.json")
+    logs = list(store.iter_entries())
     
-    if os.path.exists(log_file):
-        with open(log_file, "r") as f:
-            logs = json.load(f)
-            print(f"Found {len(logs)} log entries")
-            
-            # Print the first log entry if it exists
-            if logs:
-                first_log = logs[0]
-                print("First log entry:")
-                print(json.dumps(first_log, indent=2))
+    if logs:
+        print(f"Found {len(logs)} log entries in {len(store.segments())} segment(s)")
+        
+        # Print the first log entry
+        first_log = logs[0]
+        print("First log entry:")
+        print(json.dumps(first_log.dict(), indent=2, default=str))
     else:
-        print("No log file found")
+        print("No log entries found")
+    store.close()
 
 if __name__ == "__main__":
-    test_logging()
\ No newline at end of file
+    test_logging()
@@ -0,0 +1,57 @@
+import time
+import pytest
+from app.agents.fanout import FanOutExecutor
+from app.services.metrics import MetricsRegistry, STAGE_SECONDS, current_trace, observe_stage, stage, start_trace
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram("demo_seconds", "Demo latency", ["stage"], buckets=(0.1, 1.0))
+    errors = registry.counter("demo_errors_total", "Demo errors", ["stage"])
+    latency.observe(0.05, "routing")
+    latency.observe(0.5, "routing")
+    errors.inc('say "hi"')
+
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_seconds histogram" in lines
+    assert 'demo_seconds_bucket{stage="routing",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="routing",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="routing",le="+Inf"} 2' in lines
+    assert 'demo_seconds_count{stage="routing"} 2' in lines
+    assert 'demo_errors_total{stage="say \\"hi\\""} 1' in lines
+
+
+@pytest.mark.asyncio
+async def test_stage_timings_follow_the_request_into_agent_threads():
+    fanout = FanOutExecutor(agent_timeout=1, deadline=2)
+    before = STAGE_SECONDS.count("agent_slow")
+
+    def slow(question):
+        with stage("inner"):
+            time.sleep(0.05)
+        return {"summary": question}
+
+    start_trace()
+    with stage("routing"):
+        pass
+    responses, failures = await fanout.run([("slow", slow, ("q",))])
+    timings = current_trace()
+    fanout.shutdown()
+
+    assert responses == [("slow", {"summary": "q"})] and not failures
+    assert set(timings) == {"routing", "inner", "agent_slow"}
+    assert timings["agent_slow"] >= timings["inner"] >= 0.05
+    assert STAGE_SECONDS.count("agent_slow") == before + 1
+
+
+def test_repeated_stage_is_observed_once_per_request():
+    before = STAGE_SECONDS.count("tokens")
+    start_trace()
+    for _ in range(5):
+        with stage("tokens", observe=False):
+            time.sleep(0.01)
+    assert STAGE_SECONDS.count("tokens") == before
+    observe_stage("tokens")
+
+    assert STAGE_SECONDS.count("tokens") == before + 1
+    assert current_trace()["tokens"] >= 0.05
@@ -0,0 +1,53 @@
+import hashlib
+from datetime import datetime
+import numpy as np
+from app.agents.router import EmbeddingRouter
+from app.models.log import LogEntry
+
+
+def bag_of_words(texts):
+    vectors = np.zeros((len(texts), 256), dtype="float32")
+    for row, text in enumerate(texts):
+        for word in text.lower().replace("?", " ").split():
+            vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 256] += 1
+    return vectors
+
+
+EXEMPLARS = {
+    "pdf_rag": ["what does the uploaded pdf say about pricing", "summarize the uploaded contract document"],
+    "web_search": ["latest news about the election today", "current weather in paris today"],
+    "arxiv": ["recent research papers on graph neural networks", "arxiv papers about diffusion models"],
+}
+
+
+def _entry(question, agents, decision="{}"):
+    return LogEntry(input=question, decision=decision, agents_called=agents, documents_retrieved=[],
+                    final_answer="", timestamp=datetime.now())
+
+
+def test_routes_by_similarity_with_confidence():
+    router = EmbeddingRouter(bag_of_words, EXEMPLARS, top_k=1, min_similarity=0.2)
+    agents, rationale, confidence = router.route("What does the uploaded PDF say about refunds?")
+    assert agents == ["pdf_rag"]
+    assert confidence > 0.9
+    assert "pdf_rag" in rationale
+
+    # Nothing like any example: zero confidence, so the caller escalates
+    assert router.route("zebra xylophone quokka")[2] == 0.0
+
+
+def test_trains_from_logged_decisions():
+    router = EmbeddingRouter(bag_of_words, EXEMPLARS, top_k=1, min_similarity=0.2, max_exemplars=3)
+    question = "compare transformer benchmarks across vendors"
+    assert router.route(question)[2] == 0.0
+
+    used = router.train([
+        _entry("compare transformer benchmarks across vendors and papers", ["arxiv", "web_search"]),
+        _entry("compare transformer benchmarks", ["pdf_rag"], decision="Answered from cache: {}"),
+    ])
+    assert used == 1
+    agents, _, confidence = router.route(question)
+    # Logged with two agents, so both are selected together
+    assert sorted(agents) == ["arxiv", "web_search"]
+    assert confidence > 0.9
+    assert router.exemplar_counts() == {"pdf_rag": 2, "web_search": 3, "arxiv": 3}
@@ -0,0 +1,47 @@
+import json
+from app.agents.rules import RoutingCache, RuleEngine
+from app.config.settings import settings
+
+
+def test_rules_match_in_one_pass_in_rule_order():
+    rules = RuleEngine(settings.ROUTING_RULES)
+    agents, rationale = rules.decide("Today's RESEARCH on the PDF documents")
+    assert agents == ["pdf_rag", "arxiv", "web_search"]
+    assert rationale["pdf_rag"] == "Question relates to PDF/document content"
+    assert rules.decide("Any recent papers on transformers?")[0] == ["arxiv"]
+
+
+def test_rules_keep_substring_semantics():
+    rules = RuleEngine(settings.ROUTING_RULES)
+    assert rules.decide("Find papers on arxiv.org")[0] == ["arxiv"]
+    assert rules.decide("What does the newspaper say?")[0] == ["arxiv"]
+    assert rules.decide("Summarize the PDFs")[0] == ["pdf_rag"]
+    # Overlapping phrases from different rules are all found
+    overlapping = RuleEngine([{"agent": "a", "phrases": ["research paper"]}, {"agent": "b", "phrases": ["paper"]},
+                              {"agent": "c", "phrases": ["papers"]}])
+    assert overlapping.decide("new research papers")[0] == ["a", "b", "c"]
+    assert overlapping.matching_rules("nothing here") == []
+
+
+def test_rules_load_from_config_file(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([{"agent": "arxiv", "phrases": ["preprint"], "rationale": "Mentions preprints"}]))
+    monkeypatch.setattr(settings, "ROUTING_RULES_FILE", str(path))
+    rules = RuleEngine.from_settings()
+    assert rules.decide("Is there a preprint about this?") == (["arxiv"], {"arxiv": "Mentions preprints"})
+    assert rules.decide("What is a PDF?")[0] == [settings.ROUTING_DEFAULT_AGENT]
+
+
+def test_routing_cache_is_keyed_by_normalized_question_and_bounded():
+    cache = RoutingCache(max_entries=2)
+    cache.put("What is RAG?", ["arxiv"], {"arxiv": "LLM: research topic"})
+    decision = cache.get("  what is rag ")
+    assert decision == (["arxiv"], {"arxiv": "LLM: research topic"})
+    decision[0].append("web_search")  # callers get copies
+    assert cache.get("what is rag")[0] == ["arxiv"]
+
+    cache.put("second", ["pdf_rag"], {})
+    cache.put("third", ["web_search"], {})
+    assert cache.get("What is RAG?") is None
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["hits"] == 2
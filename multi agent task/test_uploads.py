@@ -0,0 +1,91 @@
+import hashlib
+import os
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from app.config.settings import settings
+from app.services.uploads import receive_upload
+
+BOUNDARY = "bench-boundary"
+
+
+def _body(content: bytes, filename: str = "report.pdf") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nignored\r\n"
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def _request(body: bytes, piece: int = 1000, content_length: bool = True):
+    """A request whose body arrives in pieces; also returns how many pieces were read"""
+    pieces = [body[i:i + piece] for i in range(0, len(body), piece)]
+    received = []
+
+    async def receive():
+        received.append(1)
+        index = len(received) - 1
+        return {"type": "http.request", "body": pieces[index] if index < len(pieces) else b"",
+                "more_body": index < len(pieces) - 1}
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    scope = {"type": "http", "method": "POST", "path": "/upload_pdf", "headers": headers}
+    return Request(scope, receive), received
+
+
+@pytest.mark.asyncio
+async def test_upload_is_streamed_to_disk_and_hashed(tmp_path):
+    content = b"%PDF-1.4 " + bytes(range(256)) * 40
+    request, _ = _request(_body(content, "../escape.pdf"))
+    upload_path, file_path, filename, file_hash = await receive_upload(request, str(tmp_path))
+
+    assert filename == "escape.pdf" and file_path == str(tmp_path / "escape.pdf")
+    with open(upload_path, "rb") as f:
+        assert f.read() == content
+    assert file_hash == hashlib.sha256(content).hexdigest()
+    assert [path.name for path in tmp_path.iterdir()] == [os.path.basename(upload_path)]
+
+
+@pytest.mark.asyncio
+async def test_uploads_with_the_same_name_get_their_own_files(tmp_path):
+    """A second upload must not overwrite the first before its job has read it"""
+    first, _ = _request(_body(b"%PDF-1.4 version 1"))
+    second, _ = _request(_body(b"%PDF-1.4 version 2"))
+    first_path, first_target, _, _ = await receive_upload(first, str(tmp_path))
+    second_path, second_target, _, _ = await receive_upload(second, str(tmp_path))
+
+    assert first_target == second_target == str(tmp_path / "report.pdf")
+    assert first_path != second_path
+    with open(first_path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 version 1"
+
+
+@pytest.mark.asyncio
+async def test_oversized_uploads_are_refused_before_the_body_is_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 5000)
+    monkeypatch.setattr(settings, "UPLOAD_FORM_OVERHEAD", 1000)
+    body = _body(b"x" * 50000)
+
+    # Declared too large: nothing is read
+    request, received = _request(body)
+    with pytest.raises(HTTPException) as error:
+        await receive_upload(request, str(tmp_path))
+    assert error.value.status_code == 413 and received == []
+
+    # No Content-Length: stops shortly after the limit instead of reading all 50 pieces
+    request, received = _request(body, content_length=False)
+    with pytest.raises(HTTPException) as error:
+        await receive_upload(request, str(tmp_path))
+    assert error.value.status_code == 413 and len(received) <= 7
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_missing_file_field_is_rejected(tmp_path):
+    body = f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhi\r\n--{BOUNDARY}--\r\n".encode()
+    request, _ = _request(body)
+    with pytest.raises(HTTPException) as error:
+        await receive_upload(request, str(tmp_path))
+    assert error.value.status_code == 422
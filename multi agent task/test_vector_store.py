@@ -0,0 +1,295 @@
+import json
+import os
+import threading
+import numpy as np
+from app.config.settings import settings
+from app.storage.chunk_store import ChunkStore
+from app.storage.vector_store import VectorStore
+
+
+def _records(start: int, count: int):
+    return [
+        {"id": f"chunk-{i}", "content": f"text {i}", "source": "doc.pdf", "title": "doc.pdf", "chunk_index": i}
+        for i in range(start, start + count)
+    ]
+
+
+def test_index_and_chunks_persist_across_restarts(tmp_path):
+    """A reopened store is memory-mapped and returns the same rows"""
+    vectors = np.random.rand(10, 8).astype("float32")
+    store = VectorStore(8, str(tmp_path))
+    chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    with store.write_lock():
+        chunks.append(_records(0, 10))
+        store.add(vectors)
+        store.save()
+
+    reopened = VectorStore(8, str(tmp_path))
+    reopened_chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    if os.path.exists("/proc/self/maps"):
+        with open("/proc/self/maps") as f:
+            assert str(tmp_path / "index.faiss") in f.read()
+    assert reopened.ntotal == 10
+    assert len(reopened_chunks) == 10
+    _, indices = reopened.search(vectors[3:4], 1)
+    assert reopened_chunks.documents[indices[0][0]]["id"] == "chunk-3"
+
+
+def test_saved_index_opens_without_in_place_mapping_flag(tmp_path, monkeypatch):
+    """faiss-cpu 1.8.0 (the pinned release) has no IO_FLAG_MMAP_IFC; opening falls back to IO_FLAG_MMAP"""
+    import faiss
+    vectors = np.random.rand(10, 8).astype("float32")
+    store = VectorStore(8, str(tmp_path))
+    with store.write_lock():
+        store.add(vectors)
+        store.save()
+
+    monkeypatch.delattr(faiss, "IO_FLAG_MMAP_IFC", raising=False)
+    reopened = VectorStore(8, str(tmp_path))
+    assert reopened.ntotal == 10
+    _, indices = reopened.search(vectors[3:4], 1)
+    assert indices[0][0] == 3
+
+
+def test_reader_picks_up_writes_from_another_worker(tmp_path):
+    """A second store instance sees chunks and vectors saved by the first after refresh"""
+    writer = VectorStore(8, str(tmp_path))
+    writer_chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    with writer.write_lock():
+        writer_chunks.append(_records(0, 2))
+        writer.add(np.random.rand(2, 8).astype("float32"))
+        writer.save()
+
+    reader = VectorStore(8, str(tmp_path))
+    reader_chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+
+    with writer.write_lock():
+        writer_chunks.append(_records(2, 3))
+        writer.add(np.random.rand(3, 8).astype("float32"))
+        writer.save()
+
+    assert reader.refresh()
+    reader_chunks.refresh()
+    assert reader.ntotal == 5
+    assert [doc["id"] for doc in reader_chunks.documents] == [f"chunk-{i}" for i in range(5)]
+
+
+def test_unsaved_rows_of_another_writer_are_caught_up_not_dropped(tmp_path):
+    """Rows committed without saving the index are indexed by the next writer; chunks
+    whose vectors were never written are discarded"""
+    vectors = np.random.rand(6, 8).astype("float32")
+    first = VectorStore(8, str(tmp_path))
+    first_chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    with first.write_lock():
+        first_chunks.append(_records(0, 2))
+        first.add(vectors[:2])
+        first.save()
+        # Committed mid-document, index not saved yet
+        first_chunks.append(_records(2, 2))
+        first.add(vectors[2:4])
+    assert first.unsaved_rows == 2
+
+    second = VectorStore(8, str(tmp_path))
+    second_chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    # A chunk appended by a writer that died before writing its vector
+    second_chunks.append(_records(4, 1))
+    with second.write_lock():
+        assert second.ntotal == 2
+        assert second.catch_up(len(second_chunks)) == 4
+        second_chunks.truncate(second.ntotal)
+        second_chunks.append(_records(5, 1))
+        second.add(vectors[5:6])
+        second.save()
+
+    assert [doc["id"] for doc in second_chunks.documents] == ["chunk-0", "chunk-1", "chunk-2", "chunk-3", "chunk-5"]
+    _, indices = second.search(vectors[3:4], 1)
+    assert indices[0][0] == 3
+    with first.write_lock():
+        assert first.ntotal == 5 and first.unsaved_rows == 0
+
+
+def test_flat_index_migrates_to_ann_past_threshold(tmp_path):
+    """Crossing the threshold rebuilds the flat index as the configured ANN type"""
+    vectors = np.random.rand(600, 8).astype("float32")
+    store = VectorStore(8, str(tmp_path), index_type="hnsw", migration_threshold=500)
+    with store.write_lock():
+        store.add(vectors[:400])
+        store.save()
+    assert store.current_type == "flat"
+
+    with store.write_lock():
+        store.add(vectors[400:])
+        store.save()
+    assert store.current_type == "hnsw"
+    assert store.ntotal == 600
+
+    report = store.recall_report(vectors[:20], k=5, ef_search_values=(256,))
+    assert report[0]["index_type"] == "hnsw"
+    assert report[0]["recall_at_k"] > 0.9
+
+
+def test_replaced_document_chunks_are_tombstoned(tmp_path):
+    """Re-ingesting a title keeps shared chunks live and retires the ones it dropped"""
+    chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    chunks.append(_records(0, 3))
+    chunks.set_file("doc.pdf", "hash-v1", ["chunk-0", "chunk-1", "chunk-2"])
+    chunks.append(_records(3, 1))
+    chunks.set_file("doc.pdf", "hash-v2", ["chunk-0", "chunk-3"])
+
+    reopened = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    assert [reopened.is_live(row) for row in range(4)] == [True, False, False, True]
+    assert reopened.find_file_hash("hash-v2") == "doc.pdf"
+    assert reopened.find_file_hash("hash-v1") is None
+
+
+def test_documents_with_the_same_name_in_different_folders_are_separate(tmp_path):
+    """An upload named like a sample PDF must not tombstone the sample, before or after a restart"""
+    chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    chunks.append(_records(0, 3))
+    chunks.set_file("sample_pdfs/doc.pdf", "hash-sample", ["chunk-0", "chunk-1"])
+    chunks.set_file("./uploads/doc.pdf", "hash-upload", ["chunk-2"])
+
+    reopened = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    assert [reopened.is_live(row) for row in range(3)] == [True, True, True]
+    assert reopened.find_file_hash("hash-sample") == os.path.normpath("sample_pdfs/doc.pdf")
+    assert reopened.find_file_hash("hash-upload") == os.path.normpath("uploads/doc.pdf")
+    assert reopened.doc_metadata[2]["title"] == "doc.pdf"
+
+
+def test_title_keyed_documents_are_taken_over_by_path(tmp_path):
+    """Document events written before path keys are replaced by the first path-keyed version"""
+    path = tmp_path / "chunks.jsonl"
+    chunks = ChunkStore(str(path))
+    chunks.append(_records(0, 3))
+    with open(tmp_path / "files.jsonl", "w") as f:
+        f.write(json.dumps({"title": "doc.pdf", "file_hash": "hash-v1", "chunk_ids": ["chunk-0", "chunk-1"]}) + "\n")
+    chunks.refresh()
+    assert chunks.find_file_hash("hash-v1") == "doc.pdf"
+
+    chunks.set_file("sample_pdfs/doc.pdf", "hash-v2", ["chunk-0", "chunk-2"])
+    reopened = ChunkStore(str(path))
+    assert [reopened.is_live(row) for row in range(3)] == [True, False, True]
+    assert reopened.find_file_hash("hash-v1") is None
+
+
+def test_inner_product_index_with_compact_side_store_reranks(tmp_path, monkeypatch):
+    """An int8 side store re-ranks IVF-PQ candidates back to near-exact cosine results"""
+    vectors = np.random.default_rng(1).normal(size=(2000, 16)).astype("float32")
+    store = VectorStore(16, str(tmp_path), index_type="flat", metric="ip", storage="int8")
+    with store.write_lock():
+        store.add(vectors)
+        store.save()
+    assert store.vectors_path.endswith("vectors.i8")
+    # Scale does not matter for cosine: a stretched copy finds its own row at distance ~0
+    distances, indices = store.search(vectors[5:6] * 10, 1)
+    assert indices[0][0] == 5 and abs(distances[0][0]) < 1e-4
+
+    monkeypatch.setattr(settings, "PQ_M", 4)
+    candidate = store.build_candidate("ivf_pq")
+    report = store.recall_report(vectors[:50], k=10, index=candidate, nprobe_values=(64,), rerank_values=(0, 4))
+    raw, reranked = report
+    assert reranked["rerank"] == 4
+    assert reranked["recall_at_k"] > raw["recall_at_k"]
+    assert reranked["recall_at_k"] > 0.9
+
+    memory = store.memory_report()
+    # Flat index (4 bytes per dimension) plus int8 side store (1 byte per dimension + scale)
+    assert memory["vector_bytes_per_chunk"] == 16 + 4
+    # Against the old float32 flat index alone, so the side store makes this negative
+    assert memory["saved_bytes_per_chunk"] == 4 * 16 - memory["bytes_per_chunk"] < 0
+
+
+def test_existing_float32_store_keeps_metric_until_migrated(tmp_path):
+    """A saved L2 store opened with ip/float16 settings keeps working, and migrate converts it"""
+    vectors = np.random.rand(50, 8).astype("float32")
+    old = VectorStore(8, str(tmp_path), metric="l2", storage="float32")
+    with old.write_lock():
+        old.add(vectors)
+        old.save()
+
+    store = VectorStore(8, str(tmp_path), metric="ip", storage="float16")
+    assert store.metric == "l2"
+    assert store.vectors_path.endswith("vectors.f32")
+    with store.write_lock():
+        store.migrate("flat", metric="ip")
+        store.save()
+    assert store.metric == "ip"
+    assert store.vectors_path.endswith("vectors.f16")
+    assert not (tmp_path / "vectors.f32").exists()
+    assert np.allclose(store.vectors(), vectors, atol=1e-3)
+    assert store.search(vectors[7:8], 1)[1][0][0] == 7
+
+
+def test_columnar_chunk_store_reads_rows_from_the_file(tmp_path):
+    """Rows are looked up by FAISS row id from the mapped file; truncation drops their ids"""
+    chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    chunks.append(_records(0, 3))
+    chunks.append([{**_records(3, 1)[0], "content": "naïve text ✓", "page_start": 2, "page_end": 3}])
+
+    assert chunks.get(3)["content"] == "naïve text ✓"
+    assert chunks.doc_metadata[3] == {"id": "chunk-3", "title": "doc.pdf", "chunk_index": 3,
+                                      "page_start": 2, "page_end": 3}
+    assert chunks.doc_metadata[0]["page_start"] is None
+    assert [doc["content"] for doc in chunks.documents[1:3]] == ["text 1", "text 2"]
+    assert chunks.row_of("chunk-2") == 2 and "chunk-9" not in chunks
+    assert chunks.sources == ["doc.pdf"]
+
+    chunks.truncate(2)
+    assert len(chunks) == 2 and "chunk-2" not in chunks
+    chunks.append(_records(7, 1))
+    assert chunks.get(2)["id"] == "chunk-7"
+    assert ChunkStore(str(tmp_path / "chunks.jsonl")).documents[2]["id"] == "chunk-7"
+    # Row columns plus the id lookup, with no per-row dicts or strings
+    assert chunks.memory_bytes() < 200 * len(chunks)
+
+
+def test_concurrent_refreshes_do_not_duplicate_rows(tmp_path):
+    """One appender and two refreshing threads leave memory row-aligned with the file"""
+    chunks = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    done = threading.Event()
+
+    def refresher():
+        while not done.is_set():
+            chunks.refresh()
+
+    threads = [threading.Thread(target=refresher) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for start in range(0, 1500, 10):
+        chunks.append(_records(start, 10))
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(chunks) == 1500
+    assert [chunks.get(row)["id"] for row in (0, 750, 1499)] == ["chunk-0", "chunk-750", "chunk-1499"]
+
+
+def test_searches_run_safely_alongside_additions(tmp_path):
+    """Searching threads never see an index while vectors are added to it in place"""
+    store = VectorStore(16, str(tmp_path), index_type="flat")
+    with store.write_lock():
+        store.add(np.random.rand(100, 16).astype("float32"))
+        store.save()
+    store = VectorStore(16, str(tmp_path))
+    done = threading.Event()
+    errors = []
+
+    def searcher():
+        query = np.random.rand(4, 16).astype("float32")
+        while not done.is_set():
+            _, indices = store.search(query, 5)
+            if (indices < 0).any():
+                errors.append(indices)
+
+    threads = [threading.Thread(target=searcher) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for _ in range(100):
+        with store.write_lock():
+            store.add(np.random.rand(200, 16).astype("float32"))
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    assert store.ntotal == 20100 and errors == []
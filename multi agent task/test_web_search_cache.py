@@ -0,0 +1,101 @@
+import threading
+import time
+import pytest
+from app.agents import web_search
+from app.agents.web_search import WebSearchAgent
+from app.services.result_cache import ResultCache
+from app.storage.ttl_cache import MemoryTTLStore, SQLiteTTLStore
+
+
+def test_concurrent_identical_queries_share_one_call():
+    cache = ResultCache(MemoryTTLStore(), ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"summary": "result"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("q", compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"summary": "result"}] * 8
+    assert cache.get_or_compute("q", compute) == {"summary": "result"}
+    assert cache.stats()["hits"] == 1 and cache.stats()["coalesced"] == 7
+
+
+def test_failures_are_not_cached():
+    cache = ResultCache(MemoryTTLStore(), ttl=60)
+
+    def broken():
+        raise RuntimeError("quota exceeded")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("q", broken)
+    assert cache.get_or_compute("q", lambda: {"summary": "ok"}) == {"summary": "ok"}
+
+
+def test_sqlite_store_is_shared_and_expires(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    writer = SQLiteTTLStore(path)
+    reader = SQLiteTTLStore(path)
+    writer.set("fresh", {"summary": "a"}, ttl=60)
+    writer.set("stale", {"summary": "b"}, ttl=0.05)
+    time.sleep(0.1)
+    assert reader.get("fresh") == {"summary": "a"}
+    assert reader.get("stale") is None
+
+
+@pytest.mark.asyncio
+async def test_async_path_keeps_sqlite_io_off_the_event_loop(tmp_path):
+    loop_thread = threading.get_ident()
+    threads = []
+
+    class RecordingStore(SQLiteTTLStore):
+        def get(self, key):
+            threads.append(("get", threading.get_ident()))
+            return super().get(key)
+
+        def set(self, key, value, ttl):
+            threads.append(("set", threading.get_ident()))
+            super().set(key, value, ttl)
+
+    async def compute():
+        return {"summary": "fresh"}
+
+    cache = ResultCache(RecordingStore(str(tmp_path / "cache.sqlite")), ttl=60)
+    assert await cache.aget_or_compute("q", compute) == {"summary": "fresh"}
+    assert await cache.aget_or_compute("q", compute) == {"summary": "fresh"}
+    assert [call for call, _ in threads] == ["get", "set", "get"]
+    assert all(thread != loop_thread for _, thread in threads)
+    assert cache.stats()["hits"] == 1
+
+
+def test_web_search_agent_reuses_results(monkeypatch):
+    calls = []
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"organic_results": [{"title": "Result", "snippet": "snippet", "link": "http://example.com"}]}
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(timeout)
+        return FakeResponse()
+
+    monkeypatch.setattr(web_search.requests, "get", fake_get)
+    agent = WebSearchAgent()
+    first = agent.search("Latest AI news")
+    second = agent.search("latest  ai news")
+
+    assert first == second and first["results"][0]["url"] == "http://example.com"
+    assert len(calls) == 1
+    assert calls[0] is not None  # requests always carry a timeout